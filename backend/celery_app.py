@@ -1,5 +1,6 @@
 from celery import Celery
 from dotenv import load_dotenv
+from fnmatch import fnmatch
 import os
 
 
@@ -11,21 +12,98 @@ celery_app = Celery(
     backend="redis://127.0.0.1:6380/1",
     include=[
         "backend.master_agent.orchestration.conductor",
+        "backend.master_agent.synthesis.engine",
         "backend.workers.clinical_trials.worker",
+        "backend.workers.patent_worker.worker",
+        "backend.workers.market_worker.worker",
         "backend.workers.report.worker"
     ]
 )
 
+def _queue_profile(queue: str, pool: str, concurrency: int, prefetch_multiplier: int) -> dict:
+    # worker settings for a queue, overridable via CELERY_<QUEUE>_POOL / _CONCURRENCY / _PREFETCH
+    prefix = f"CELERY_{queue.upper()}"
+    return {
+        "pool": os.getenv(f"{prefix}_POOL", pool),
+        "concurrency": int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+        "prefetch_multiplier": int(os.getenv(f"{prefix}_PREFETCH", prefetch_multiplier)),
+    }
+
+# worker profiles per queue
+# - orchestrator: conductor tasks, light and mostly waiting
+# - llm: discovery + synthesis, I/O bound on Groq / DuckDuckGo -> threads, high concurrency
+# - report: matplotlib / reportlab / python-pptx rendering, CPU bound -> prefork, one per core
+# stage queues have a *_bulk twin for the bulk lane (batch jobs), so background
+# sweeps get their own capacity and never queue in front of interactive jobs
+QUEUE_PROFILES = {
+    "orchestrator": _queue_profile("orchestrator", "threads", 8, 1),
+    "llm": _queue_profile("llm", "threads", 32, 4),
+    "llm_bulk": _queue_profile("llm_bulk", "threads", 16, 4),
+    "report": _queue_profile("report", "prefork", os.cpu_count() or 2, 1),
+    "report_bulk": _queue_profile("report_bulk", "prefork", max(1, (os.cpu_count() or 2) // 2), 1),
+}
+
+TASK_ROUTES = {
+    "orchestration.*": {"queue": "orchestrator"},
+    "workers.clinical_trials.*": {"queue": "llm"},
+    "workers.patent_worker.*": {"queue": "llm"},
+    "workers.market_worker.*": {"queue": "llm"},
+    "master_agent.synthesis.*": {"queue": "llm"},
+    "workers.report.*": {"queue": "report"},
+}
+
+LANES = ("interactive", "bulk")
+
+def queue_for(task_name: str, lane: str = "interactive") -> str:
+    # routed queue for a task, switched to its *_bulk twin for the bulk lane
+    queue = next(
+        (route["queue"] for pattern, route in TASK_ROUTES.items() if fnmatch(task_name, pattern)),
+        "orchestrator"
+    )
+    if lane == "bulk" and f"{queue}_bulk" in QUEUE_PROFILES:
+        return f"{queue}_bulk"
+    return queue
+
+# how often celery beat releases deferred / waiting bulk jobs
+RELEASE_SWEEP_SECONDS = float(os.getenv("RELEASE_SWEEP_SECONDS", "30"))
+
 # queue routing
 celery_app.conf.update(
-    # task_routes={
-    #     "workers.clinical_trials.worker.*": {"queue": "clinical_trials"},
-    #     "workers.report.worker.*": {"queue": "report"},
-    #     "orchestration.conductor.*": {"queue": "orchestrator"},
-    # },
+    task_routes=TASK_ROUTES,
+    task_default_queue="orchestrator",
     task_serializer="json",
     accept_content=["json"],
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-)
\ No newline at end of file
+    beat_schedule={
+        "release-waiting-jobs": {
+            "task": "orchestration.conductor.release_waiting_jobs",
+            "schedule": RELEASE_SWEEP_SECONDS,
+        },
+    },
+)
+
+def worker_argv(queue: str) -> list[str]:
+    # celery worker command line for a queue's profile
+    profile = QUEUE_PROFILES[queue]
+    return [
+        "worker",
+        "--loglevel=info",
+        f"--queues={queue}",
+        f"--hostname={queue}@%h",
+        f"--pool={profile['pool']}",
+        f"--concurrency={profile['concurrency']}",
+        f"--prefetch-multiplier={profile['prefetch_multiplier']}",
+    ]
+
+if __name__ == "__main__":
+    # python -m backend.celery_app <orchestrator|llm|llm_bulk|report|report_bulk|beat>
+    import sys
+
+    if len(sys.argv) != 2 or sys.argv[1] not in (*QUEUE_PROFILES, "beat"):
+        sys.exit(f"usage: python -m backend.celery_app <{'|'.join(QUEUE_PROFILES)}|beat>")
+    if sys.argv[1] == "beat":
+        celery_app.start(["beat", "--loglevel=info"])
+    else:
+        celery_app.worker_main(worker_argv(sys.argv[1]))
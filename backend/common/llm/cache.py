@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, UTC
+from typing import Type
+
+from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.database import SessionLocal
+from backend.common.llm.prompt_budget import schema_text
+from backend.common.storage.redis_client import redis_client
+from backend.master_agent.models.llm_cache import LLMCacheEntry
+
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | redis | postgres | none
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def make_cache_key(model: str, instructions: str, prompt: str, schema: Type[BaseModel]) -> str:
+    # content address of a structured call. temperature=0, so same inputs -> same answer.
+    payload = json.dumps(
+        {
+            "model": model,
+            "instructions": instructions,
+            "prompt": prompt,
+            "schema": schema.__name__,
+            "schema_json": schema_text(schema),
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: int) -> None: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    # in-process LRU, bounded by entry count and total bytes
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+
+class RedisCacheBackend(CacheBackend):
+    # shared across processes. entries expire via TTL; a sorted set of insert
+    # times trims the oldest entries beyond max_entries. index entries whose
+    # value has expired are dropped on write so they don't count toward the cap.
+
+    INDEX_KEY = "llm_cache:index"
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.redis = redis_client
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> str | None:
+        return self.redis.get(f"llm_cache:{key}")
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(f"llm_cache:{key}", value, ex=ttl)
+        pipe.zremrangebyscore(self.INDEX_KEY, "-inf", now - ttl)
+        pipe.zadd(self.INDEX_KEY, {key: now})
+        pipe.zcard(self.INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        overflow = size - self.max_entries
+        if overflow > 0:
+            oldest = [k for k, _ in self.redis.zpopmin(self.INDEX_KEY, overflow)]
+            self.redis.delete(*[f"llm_cache:{k}" for k in oldest])
+
+
+class PostgresCacheBackend(CacheBackend):
+    # durable cache in the llm_cache table; expired and oldest rows are pruned on write
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> str | None:
+        db = SessionLocal()
+        try:
+            row = (
+                db.query(LLMCacheEntry)
+                .filter(LLMCacheEntry.key == key, LLMCacheEntry.expires_at > datetime.now(UTC))
+                .first()
+            )
+            return row.response if row else None
+        finally:
+            db.close()
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        now = datetime.now(UTC)
+        row = {
+            "key": key,
+            "response": value,
+            "size_bytes": len(value.encode("utf-8")),
+            "expires_at": now + timedelta(seconds=ttl),
+        }
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(LLMCacheEntry)
+                .values(**row)
+                .on_conflict_do_update(index_elements=["key"], set_=row)
+            )
+            db.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at <= now).delete()
+
+            overflow = db.query(LLMCacheEntry).count() - self.max_entries
+            if overflow > 0:
+                oldest = (
+                    db.query(LLMCacheEntry.key)
+                    .order_by(LLMCacheEntry.created_at)
+                    .limit(overflow)
+                    .subquery()
+                )
+                db.query(LLMCacheEntry).filter(LLMCacheEntry.key.in_(oldest)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class LLMCache:
+    # backend + hit/miss counters. backend errors count as misses and never fail the call.
+
+    def __init__(self, backend: CacheBackend | None, ttl: int = LLM_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> str | None:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"[LLMCache] get failed: {e}")
+            self._count("errors")
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+            self._count("sets")
+        except Exception as e:
+            print(f"[LLMCache] set failed: {e}")
+            self._count("errors")
+
+
+def _backend_from_env() -> CacheBackend | None:
+    backends = {
+        "memory": MemoryCacheBackend,
+        "redis": RedisCacheBackend,
+        "postgres": PostgresCacheBackend,
+    }
+    if LLM_CACHE_BACKEND == "none":
+        return None
+    if LLM_CACHE_BACKEND not in backends:
+        raise RuntimeError(f"Unknown LLM_CACHE_BACKEND '{LLM_CACHE_BACKEND}'. Use one of: {', '.join(backends)}, none")
+    return backends[LLM_CACHE_BACKEND]()
+
+
+llm_cache = LLMCache(_backend_from_env())
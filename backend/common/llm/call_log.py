@@ -0,0 +1,148 @@
+import atexit
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, UTC
+
+import uuid6
+from celery.signals import worker_process_shutdown, worker_shutdown
+from sqlalchemy import insert
+
+from backend.database import SessionLocal
+from backend.master_agent.models.llm_call import LLMCall
+
+
+# rows waiting to be written; beyond this new rows are dropped, never blocking a request
+LLM_LOG_BUFFER_SIZE = int(os.getenv("LLM_LOG_BUFFER_SIZE", "10000"))
+LLM_LOG_BATCH_SIZE = int(os.getenv("LLM_LOG_BATCH_SIZE", "200"))
+LLM_LOG_FLUSH_INTERVAL = float(os.getenv("LLM_LOG_FLUSH_INTERVAL", "2.0"))
+
+
+class LLMCallLogger:
+    """
+    Buffered writer for llm_calls.
+    record() only enqueues; a background thread inserts the rows in batches
+    (one executemany INSERT + commit per batch) with a short-lived session,
+    so no DB connection is held across LLM requests or retries.
+    """
+
+    def __init__(
+            self,
+            buffer_size: int = LLM_LOG_BUFFER_SIZE,
+            batch_size: int = LLM_LOG_BATCH_SIZE,
+            flush_interval: float = LLM_LOG_FLUSH_INTERVAL
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"written": 0, "dropped": 0, "failed": 0}
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=buffer_size)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+
+    def record(
+            self,
+            *,
+            job_id: uuid.UUID,
+            stage: str,
+            model: str,
+            prompt: str,
+            response: str,
+            prompt_tokens: int,
+            completion_tokens: int,
+            latency_ms: int | None = None
+    ) -> None:
+        self._ensure_thread()
+        row = {
+            "id": uuid6.uuid7(),
+            "job_id": job_id,
+            "stage": stage,
+            "model": model,
+            "prompt": prompt,
+            "response": response,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "created_at": datetime.now(UTC),
+        }
+        try:
+            self._queue.put_nowait(row)
+            if self._queue.qsize() >= self.batch_size:
+                self._wake.set()
+        except queue.Full:
+            self.stats["dropped"] += 1
+            if self.stats["dropped"] % 100 == 1:
+                print(f"[LLMCallLog] Buffer full, dropped {self.stats['dropped']} rows so far")
+
+    def flush(self) -> int:
+        # write everything buffered right now; returns the number of rows written
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def _drain(self, limit: int) -> list[dict]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]) -> int:
+        db = SessionLocal()
+        try:
+            db.execute(insert(LLMCall), batch)
+            db.commit()
+            self.stats["written"] += len(batch)
+            return len(batch)
+        except Exception as e:
+            db.rollback()
+            self.stats["failed"] += len(batch)
+            print(f"[LLMCallLog] Failed to write {len(batch)} rows: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _ensure_thread(self) -> None:
+        # started lazily and restarted after fork (prefork children don't inherit threads)
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # a lock held by the parent's flush thread at fork time would never be released here
+                self._flush_lock = threading.Lock()
+                self._wake = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="llm-call-log", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        # flush every interval, or as soon as a full batch is waiting
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+llm_call_logger = LLMCallLogger()
+
+
+def _flush_on_shutdown(*args, **kwargs) -> None:
+    written = llm_call_logger.flush()
+    if written:
+        print(f"[LLMCallLog] Flushed {written} rows on shutdown")
+
+
+atexit.register(_flush_on_shutdown)
+worker_shutdown.connect(_flush_on_shutdown, weak=False)
+worker_process_shutdown.connect(_flush_on_shutdown, weak=False)
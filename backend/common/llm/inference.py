@@ -1,22 +1,69 @@
+import asyncio
 import json
 import os
 import re
+import threading
+import time
 import uuid
-import uuid6
-from typing import Type, TypeVar
+import weakref
+from typing import Any, Callable, Type, TypeVar
 
-from groq import Groq
 from pydantic import BaseModel, ValidationError
 
-from backend.database import SessionLocal
-from backend.master_agent.models.llm_call import LLMCall
+from backend.common.llm.call_log import llm_call_logger
+from backend.common.llm.cache import llm_cache, make_cache_key
+from backend.common.llm.prompt_budget import schema_text
+from backend.common.llm.providers import ProviderRateLimitError, Usage, get_provider
+from backend.common.llm.routing import LLM_TIMEOUT_SECONDS, LatencyTracker, StageRoute, model_router
+from backend.common.llm.streaming import IncrementalJSONParser, StreamAbort
+from backend.common.llm.repair import REPAIR_INSTRUCTIONS, apply_local_fixes, build_repair_prompt
+from backend.common.llm.rate_limiter import (
+    rate_limiter, estimate_tokens, LLM_EST_COMPLETION_TOKENS
+)
+from backend.common.storage.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.common.storage.singleflight import SingleFlight
 
 class LLMResponseFormatError(Exception): pass
 class LLMServiceError(Exception): pass
 
+class LLMSchemaError(LLMResponseFormatError):
+    # parsed JSON that failed schema validation; carries what a repair round-trip needs
+    def __init__(self, json_text: str, error: ValidationError):
+        super().__init__(str(error))
+        self.json_text = json_text
+        self.error = error
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-MODEL_NAME = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+
+# backend chosen by LLM_PROVIDER (see providers.py); models per stage come from routing.py
+
+# max in-flight provider requests per event loop
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+# 429s wait on the shared rate limiter and do not use up max_retries; this caps them
+LLM_MAX_RATE_LIMIT_RETRIES = int(os.getenv("LLM_MAX_RATE_LIMIT_RETRIES", "10"))
+
+# hedged requests: if a call is slower than the stage's recent latency percentile,
+# race a duplicate (on the stage's first fallback model unless GROQ_HEDGE_MODEL is set)
+# and keep the first valid answer
+HEDGE_ENABLED = os.getenv("LLM_HEDGING", "false").lower() == "true"
+HEDGE_MODEL = os.getenv("GROQ_HEDGE_MODEL")
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "15.0"))
+
+# stream calls that report progress (on_progress), so finished fields reach the UI early.
+# off by default: streamed calls can't use the provider's JSON mode, so a model that
+# prefixes prose aborts the stream and costs another attempt. without streaming,
+# on_progress gets every field once the validated answer is in.
+LLM_STREAMING = os.getenv("LLM_STREAMING", "false").lower() == "true"
+
+# waiters give up on an identical in-flight call after this and call the LLM themselves
+LLM_SINGLEFLIGHT_TIMEOUT = float(os.getenv("LLM_SINGLEFLIGHT_TIMEOUT", "300"))
+llm_singleflight = SingleFlight("llm", lock_ttl=LLM_SINGLEFLIGHT_TIMEOUT)
+
+# shared across workers: once the provider is down, calls fail fast instead of
+# each job sitting through its retries and timeouts
+llm_breaker = CircuitBreaker(get_provider().name, probe_timeout=LLM_TIMEOUT_SECONDS)
 
 # generic type for schema
 T = TypeVar("T", bound=BaseModel)
@@ -52,45 +99,360 @@ def _extract_json_block(text: str) -> str:
 
     raise LLMResponseFormatError(f"Could not extract JSON from LLM output. Partial Output: {text[:200]}...")
 
-def _log_llm_call(
-        db,
-        *,
-        job_id: uuid.UUID,
-        stage: str,
+# per-stage latency history for adaptive hedge thresholds
+latency_tracker = LatencyTracker(min_samples=HEDGE_MIN_SAMPLES)
+
+# one semaphore per event loop (asyncio primitives are bound to their loop)
+_loop_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _loop_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
+def _messages(instructions: str, input_text: str) -> list[dict]:
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": input_text}
+    ]
+
+# background loop that serves the sync wrapper, so every thread of a worker
+# process shares one connection pool and one concurrency limit
+_sync_loop: asyncio.AbstractEventLoop | None = None
+_sync_loop_lock = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return _sync_loop
+
+def run_sync(coro):
+    # run a coroutine on the shared background loop and wait for it (for sync callers)
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+async def _generate(
         model: str,
-        prompt: str,
-        response: str,
-        prompt_tokens: int,
-        completion_tokens: int
+        instructions: str,
+        input_text: str,
+        schema: Type[T],
+        route: StageRoute,
+        started: asyncio.Event | None = None
 ):
-    call = LLMCall(
-        id = uuid6.uuid7(),
-        job_id = job_id,
-        stage = stage,
-        model = model,
-        prompt = prompt,
-        response = response,
-        prompt_tokens = prompt_tokens,
-        response_tokens = completion_tokens
-    )
+    # one completion -> (validated, json_text, usage, model, seconds). raises on API or format errors.
+    # seconds is the provider request alone; `started` is set when it goes out, after
+    # any wait on the breaker, rate limiter or concurrency limit.
+    estimated = estimate_tokens(instructions) + estimate_tokens(input_text) + LLM_EST_COMPLETION_TOKENS
+    probing = await asyncio.to_thread(llm_breaker.before)
+
+    try:
+        await rate_limiter.acquire(model, estimated)
+        async with _semaphore():
+            if started:
+                started.set()
+            start = time.perf_counter()
+            resp = await asyncio.wait_for(
+                get_provider().complete(
+                    model,
+                    _messages(instructions, input_text),
+                    json_mode=True,
+                    schema=schema.model_json_schema(),
+                    max_tokens=route.max_tokens
+                ),
+                timeout=route.timeout
+            )
+            seconds = time.perf_counter() - start
+    except ProviderRateLimitError as e:
+        # a 429 is an answer; the limiter handles it, not the breaker
+        await asyncio.to_thread(llm_breaker.success)
+        await asyncio.to_thread(rate_limiter.on_rate_limited, model, e.retry_after)
+        raise
+    except Exception:
+        await asyncio.to_thread(llm_breaker.failure)
+        raise
+    except asyncio.CancelledError:
+        # e.g. the losing hedge: no outcome, but don't leave the breaker half-open
+        if probing:
+            await asyncio.to_thread(llm_breaker.release_probe)
+        raise
+    await asyncio.to_thread(llm_breaker.success)
 
-    db.add(call)
-    db.commit()
+    actual = resp.usage.total_tokens if resp.usage else 0
+    await asyncio.to_thread(rate_limiter.on_success, model, estimated, actual)
 
-def llm_structured(
+    # extract json
+    json_text = _extract_json_block(resp.text)
+
+    # validate
+    validated, json_text = _validate(json_text, schema)
+
+    return validated, json_text, resp.usage, model, seconds
+
+def _validate(json_text: str, schema: Type[T], max_passes: int = 3) -> tuple[T, str]:
+    # validate, applying local fixes first; raises LLMSchemaError if the LLM must repair it
+    parsed = json.loads(json_text)
+    for attempt in range(max_passes):
+        try:
+            validated = schema.model_validate(parsed)
+        except ValidationError as e:
+            if attempt == max_passes - 1 or not apply_local_fixes(parsed, e):
+                raise LLMSchemaError(json_text, e)
+            continue
+        if attempt:
+            print(f"[LLM] Repaired {schema.__name__} locally")
+            # re-serialize from the model so unknown keys are dropped
+            json_text = validated.model_dump_json()
+        return validated, json_text
+
+async def _generate_streaming(
+        model: str,
+        instructions: str,
+        input_text: str,
+        schema: Type[T],
+        route: StageRoute,
+        on_progress: Callable[[str, Any], None] | None = None,
+        started: asyncio.Event | None = None
+):
+    # streamed completion, parsed as it arrives. aborts as soon as the output can't
+    # be a JSON object, reports each finished top-level field to on_progress.
+    # returns and sets `started` like _generate.
+    estimated = estimate_tokens(instructions) + estimate_tokens(input_text) + LLM_EST_COMPLETION_TOKENS
+    probing = await asyncio.to_thread(llm_breaker.before)
+
+    parser = IncrementalJSONParser()
+    usage = None
+    try:
+        await rate_limiter.acquire(model, estimated)
+        async with _semaphore():
+            if started:
+                started.set()
+            start = time.perf_counter()
+            # no json mode while streaming; the parser enforces the shape instead
+            stream = get_provider().stream(
+                model,
+                _messages(instructions, input_text),
+                schema=schema.model_json_schema(),
+                max_tokens=route.max_tokens
+            )
+            try:
+                async with asyncio.timeout(route.timeout):
+                    async for chunk in stream:
+                        usage = chunk.usage or usage
+                        for field, value in parser.feed(chunk.text):
+                            if on_progress:
+                                await asyncio.to_thread(on_progress, field, value)
+                        if parser.done:
+                            break
+            except StreamAbort as e:
+                raise LLMResponseFormatError(f"Aborted stream: {e}")
+            finally:
+                await stream.aclose()
+            seconds = time.perf_counter() - start
+    except (ProviderRateLimitError, LLMResponseFormatError) as e:
+        # the provider answered (429 or bad output): not a breaker failure
+        await asyncio.to_thread(llm_breaker.success)
+        if isinstance(e, ProviderRateLimitError):
+            await asyncio.to_thread(rate_limiter.on_rate_limited, model, e.retry_after)
+        raise
+    except Exception:
+        await asyncio.to_thread(llm_breaker.failure)
+        raise
+    except asyncio.CancelledError:
+        if probing:
+            await asyncio.to_thread(llm_breaker.release_probe)
+        raise
+    await asyncio.to_thread(llm_breaker.success)
+
+    if usage is None:
+        # stopped before the final chunk carried usage; estimate it
+        completion_tokens = estimate_tokens(parser.buffer)
+        prompt_tokens = estimated - LLM_EST_COMPLETION_TOKENS
+        usage = Usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+    await asyncio.to_thread(rate_limiter.on_success, model, estimated, usage.total_tokens)
+
+    if not parser.done:
+        raise LLMResponseFormatError(f"Stream ended before the JSON object closed: {parser.buffer[-200:]!r}")
+
+    validated, json_text = _validate(parser.text, schema)
+    return validated, json_text, usage, model, seconds
+
+async def _report_fields(validated: BaseModel, on_progress: Callable[[str, Any], None] | None) -> None:
+    # report every top-level field of a finished answer (non-streamed, cached or coalesced)
+    if on_progress:
+        for field, value in validated.model_dump(mode="json").items():
+            await asyncio.to_thread(on_progress, field, value)
+
+async def _generate_hedged(
+        stage: str,
+        models: list[str],
+        instructions: str,
+        input_text: str,
+        schema: Type[T],
+        route: StageRoute,
+        use_stream: bool = False,
+        on_progress: Callable[[str, Any], None] | None = None
+):
+    # primary request, plus a duplicate once the primary's provider request has run
+    # longer than the stage's latency percentile
+    def attempt(model: str, progress: Callable[[str, Any], None] | None, started: asyncio.Event | None = None):
+        if use_stream:
+            return _generate_streaming(model, instructions, input_text, schema, route, progress, started)
+        return _generate(model, instructions, input_text, schema, route, started)
+
+    delay = latency_tracker.percentile(stage, HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+
+    # only the primary streams progress, so two models' fields don't interleave
+    started = asyncio.Event()
+    primary = asyncio.create_task(attempt(models[0], on_progress, started))
+    # the hedge clock starts when the request goes out: time spent waiting on the rate
+    # limiter means the budget is empty, and a hedge would only spend more of it
+    waiting = asyncio.create_task(started.wait())
+    try:
+        await asyncio.wait({primary, waiting}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiting.cancel()
+    if not primary.done():
+        await asyncio.wait({primary}, timeout=delay)
+    if primary.done():
+        return primary.result()
+
+    hedge_model = HEDGE_MODEL or models[min(1, len(models) - 1)]
+    print(f"[LLM] {stage} slower than {delay:.1f}s, hedging on {hedge_model}")
+    hedge = asyncio.create_task(attempt(hedge_model, None))
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    # first valid answer wins
+                    if fut is hedge and use_stream:
+                        # replaces whatever the primary streamed so far
+                        await _report_fields(fut.result()[0], on_progress)
+                    return fut.result()
+                error = fut.exception()
+        raise error
+    finally:
+        # cancel the loser (closes its in-flight request)
+        for fut in pending:
+            fut.cancel()
+
+async def _call_with_retries(
+        schema: Type[T],
+        job_id: uuid.UUID,
+        stage: str,
+        instructions: str,
+        input_text: str,
+        max_retries: int,
+        use_hedge: bool,
+        use_stream: bool,
+        on_progress: Callable[[str, Any], None] | None
+) -> tuple[T, str, str]:
+    # generation + repair/retry loop -> (validated, json_text, model)
+    # API failures and 429s move on to the next model in the stage's chain
+    route = model_router.route(stage)
+    models = model_router.models(stage, overloaded=_semaphore().locked())
+    attempt = 0
+    rate_limited = 0
+    invalid: LLMSchemaError | None = None
+    while attempt < max_retries:
+        try:
+            # api call: repair round-trip, hedged, streamed or single
+            call_prompt = input_text
+            if invalid is not None:
+                # send only the invalid object + errors, not the whole task again
+                call_prompt = build_repair_prompt(invalid.json_text, invalid.error, schema)
+                validated, json_text, usage, model, seconds = await _generate(
+                    models[0], REPAIR_INSTRUCTIONS, call_prompt, schema, route
+                )
+            elif use_hedge:
+                validated, json_text, usage, model, seconds = await _generate_hedged(
+                    stage, models, instructions, input_text, schema, route, use_stream, on_progress
+                )
+            elif use_stream:
+                validated, json_text, usage, model, seconds = await _generate_streaming(
+                    models[0], instructions, input_text, schema, route, on_progress
+                )
+            else:
+                validated, json_text, usage, model, seconds = await _generate(models[0], instructions, input_text, schema, route)
+            prompt_tokens = usage.prompt_tokens if usage else 0
+            completion_tokens = usage.completion_tokens if usage else 0
+            if invalid is None:
+                # repairs are much shorter calls; keep them out of the hedge/SLO thresholds.
+                # seconds is the provider request only, not limiter/queue waits
+                latency_tracker.record(stage, seconds)
+                model_router.record(stage, model, seconds, prompt_tokens, completion_tokens)
+
+            # log success (buffered, written in batches off the request path)
+            llm_call_logger.record(
+                job_id=job_id,
+                stage=stage,
+                model=model,
+                prompt=call_prompt,
+                response=json_text,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency_ms=int(seconds * 1000)
+            )
+
+            return validated, json_text, model
+
+        except (ValidationError, json.JSONDecodeError, LLMResponseFormatError) as e:
+            print(f"[LLM] JSON validation failed ({attempt+1}/{max_retries}): {e}")
+            if attempt == max_retries - 1:
+                raise LLMResponseFormatError(f"Failed to get valid JSON: {e}")
+            # parsed-but-invalid output gets repaired; unparseable output is regenerated
+            invalid = e if isinstance(e, LLMSchemaError) else None
+            attempt += 1
+
+        except ProviderRateLimitError as e:
+            # the limiter has already backed off; try again without spending an attempt
+            rate_limited += 1
+            if rate_limited > LLM_MAX_RATE_LIMIT_RETRIES:
+                raise LLMServiceError(f"LLM rate limit persisted after {rate_limited} retries: {e}")
+            if len(models) > 1:
+                print(f"[LLM] {models[0]} rate limited, falling back to {models[1]}")
+                models = models[1:]
+
+        except CircuitOpenError as e:
+            # provider known to be down; retrying would only fail fast again
+            raise LLMServiceError(f"LLM provider unavailable: {e}")
+
+        except Exception as e:
+            # Actual API/network problems (including the route's timeout)
+            print(f"[LLM] API Error on {models[0]} ({attempt+1}/{max_retries}): {e!r}")
+            if attempt == max_retries - 1:
+                raise LLMServiceError(f"LLM API failed: {e!r}")
+            if len(models) > 1:
+                models = models[1:]
+            attempt += 1
+
+async def llm_structured_async(
         *,
         prompt: str,
         schema: Type[T],
         job_id: uuid.UUID,
         stage: str,
         max_retries: int = 3,
+        hedge: bool | None = None,
+        use_cache: bool = True,
+        stream: bool = False,
+        on_progress: Callable[[str, Any], None] | None = None,
 ) -> T:
-    # structured llm caller
+    # structured llm caller (async)
     # inject schema definition, enforce json, log history, handle retries.
+    # identical (model, instructions, prompt, schema) calls are served from llm_cache and
+    # coalesced with identical in-flight calls (llm_singleflight) unless use_cache=False.
+    # stream=True parses the completion as it arrives and aborts bad output early.
+    # on_progress(field, value) is called for each finished top-level field: as it
+    # streams in when stream=True (or LLM_STREAMING is on), else once the answer is in.
 
-    db = SessionLocal()
-
-    schema_json = json.dumps(schema.model_json_schema(), indent=2)
+    schema_json = schema_text(schema)
     instructions = (
         "You are a strict JSON generator.\n"
         "Return ONLY valid JSON (json) with NO text before or after.\n"
@@ -99,58 +461,76 @@ def llm_structured(
         "If you cannot satisfy the schema, return an empty JSON object {}."
     )
     input_text = f"Task:\n{prompt}\nReturn ONLY JSON."
+    use_hedge = HEDGE_ENABLED if hedge is None else hedge
+    use_stream = stream or (on_progress is not None and LLM_STREAMING)
 
-    try:        
-        for attempt in range(max_retries):
+    primary_model = model_router.route(stage).model
+    cache_key = make_cache_key(primary_model, instructions, input_text, schema)
+    if use_cache:
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
             try:
-                # api call
-                resp = client.chat.completions.create(
-                    model=MODEL_NAME,
-                    messages=[
-                        {"role": "system", "content": instructions},
-                        {"role": "user", "content": input_text}
-                    ],
-                    temperature=0,
-                    response_format={"type": "json_object"}
-                )
+                validated = schema.model_validate_json(cached)
+                print(f"[LLM] Cache hit for {stage}")
+                await _report_fields(validated, on_progress)
+                return validated
+            except ValidationError:
+                pass  # entry no longer matches the schema; regenerate
 
-                raw_text = resp.choices[0].message.content
-
-                # extract json
-                json_text = _extract_json_block(raw_text)
-                parsed = json.loads(json_text)
-
-                # validate
-                validated = schema.model_validate(parsed)
-
-                usage = resp.usage
-                prompt_tokens = usage.prompt_tokens if usage else 0
-                completion_tokens = usage.completion_tokens if usage else 0
-
-                # log success
-                _log_llm_call(
-                    db,
-                    job_id=job_id,
-                    stage=stage,
-                    model=MODEL_NAME,
-                    prompt=input_text,
-                    response=json_text,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens
-                )
+    if not use_cache:
+        validated, _, _ = await _call_with_retries(
+            schema, job_id, stage, instructions, input_text, max_retries, use_hedge, use_stream, on_progress
+        )
+        if not use_stream:
+            await _report_fields(validated, on_progress)
+        return validated
 
-                return validated
-                       
-            except (ValidationError, json.JSONDecodeError, LLMResponseFormatError) as e:
-                print(f"[LLM] JSON validation failed ({attempt+1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    raise LLMResponseFormatError(f"Failed to get valid JSON: {e}")
-
-            except Exception as e:
-                # Actual API/network problems
-                print(f"[LLM] API Error ({attempt+1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    raise LLMServiceError(f"GROQ API failed: {e}")
-                
-    finally:
-        db.close()
\ No newline at end of file
+    answers: list[T] = []
+
+    async def lead() -> str:
+        validated, json_text, model = await _call_with_retries(
+            schema, job_id, stage, instructions, input_text, max_retries, use_hedge, use_stream, on_progress
+        )
+        answers.append(validated)
+        if model == primary_model:
+            # downgraded / fallback answers are used once but not cached as the stage's answer
+            await asyncio.to_thread(llm_cache.set, cache_key, json_text)
+        return json_text
+
+    # identical calls in flight anywhere (other jobs, other workers) share one upstream request
+    json_text = await llm_singleflight.do_async(cache_key, lead)
+    if answers:
+        if not use_stream:
+            await _report_fields(answers[0], on_progress)
+        return answers[0]
+
+    print(f"[LLM] Coalesced {stage} with an identical in-flight call")
+    validated = schema.model_validate_json(json_text)
+    await _report_fields(validated, on_progress)
+    return validated
+
+def llm_structured(
+        *,
+        prompt: str,
+        schema: Type[T],
+        job_id: uuid.UUID,
+        stage: str,
+        max_retries: int = 3,
+        hedge: bool | None = None,
+        use_cache: bool = True,
+        stream: bool = False,
+        on_progress: Callable[[str, Any], None] | None = None,
+) -> T:
+    # sync wrapper around llm_structured_async, run on the shared background loop
+    coro = llm_structured_async(
+        prompt=prompt,
+        schema=schema,
+        job_id=job_id,
+        stage=stage,
+        max_retries=max_retries,
+        hedge=hedge,
+        use_cache=use_cache,
+        stream=stream,
+        on_progress=on_progress
+    )
+    return run_sync(coro)
@@ -0,0 +1,120 @@
+import json
+import os
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Type
+
+from pydantic import BaseModel
+
+from backend.common.llm.rate_limiter import estimate_tokens
+
+
+# prompt token budget per llm stage (prompt + injected schema, completion excluded)
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "12000"))
+PROMPT_TOKEN_BUDGETS = {
+    "synthesis": int(os.getenv("SYNTHESIS_PROMPT_TOKEN_BUDGET", str(DEFAULT_PROMPT_TOKEN_BUDGET))),
+    # each decomposed synthesis section carries its own copy of the evidence
+    "synthesis_section": int(os.getenv("SYNTHESIS_SECTION_TOKEN_BUDGET", "8000")),
+    # map-reduce chunk summaries: smaller prompts -> more, faster parallel calls
+    "synthesis_map": int(os.getenv("SYNTHESIS_MAP_TOKEN_BUDGET", "6000")),
+}
+
+
+def budget_for(stage: str) -> int:
+    return PROMPT_TOKEN_BUDGETS.get(stage, DEFAULT_PROMPT_TOKEN_BUDGET)
+
+
+@lru_cache(maxsize=None)
+def schema_text(schema: Type[BaseModel]) -> str:
+    # compact JSON schema, built once per model class
+    return json.dumps(schema.model_json_schema(), separators=(",", ":"))
+
+
+def _prune(value: Any, key_map: dict[str, str]) -> Any:
+    # drop nulls / empty values, rename keys
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = _prune(v, key_map)
+            if v is None or v == "" or v == [] or v == {}:
+                continue
+            out[key_map.get(k, k)] = v
+        return out
+    if isinstance(value, (list, tuple)):
+        return [v for v in (_prune(v, key_map) for v in value) if v is not None]
+    return value
+
+
+def compact_json(value: Any, key_map: dict[str, str] | None = None) -> str:
+    # no indentation, short keys, nulls omitted
+    return json.dumps(_prune(value, key_map or {}), separators=(",", ":"), default=str)
+
+
+def key_legend(key_map: dict[str, str]) -> str:
+    return ", ".join(f"{short}={full}" for full, short in key_map.items())
+
+
+def fit_records(
+        records: Iterable[Any],
+        budget: int,
+        key_map: dict[str, str] | None = None,
+        rank: Callable[[Any], Any] | None = None
+) -> tuple[str, int, int]:
+    """
+    Compact JSON list of as many records as fit in `budget` tokens.
+    If everything fits the original order is kept; otherwise the highest
+    ranked records are kept (ranked truncation).
+    Returns (json_text, kept, total).
+    """
+    records = list(records)
+    rows = [compact_json(r, key_map) for r in records]
+    full = "[" + ",".join(rows) + "]"
+    if estimate_tokens(full) <= budget:
+        return full, len(rows), len(rows)
+
+    order = sorted(range(len(records)), key=lambda i: rank(records[i]), reverse=True) if rank else range(len(records))
+    kept, used = [], 1
+    for i in order:
+        cost = estimate_tokens(rows[i]) + 1
+        if used + cost > budget:
+            continue
+        kept.append(i)
+        used += cost
+    kept.sort()  # back to source order for the prompt
+    return "[" + ",".join(rows[i] for i in kept) + "]", len(kept), len(rows)
+
+
+def chunk_records(records: Iterable[Any], budget: int, key_map: dict[str, str] | None = None) -> list[list[Any]]:
+    """
+    Split records into consecutive chunks of at most `budget` tokens (compact JSON).
+    Chunks are evened out, so 1.1 budgets of records become two ~0.55 chunks
+    rather than a full one and a sliver.
+    """
+    records = list(records)
+    if not records:
+        return []
+    sizes = [estimate_tokens(compact_json(r, key_map)) + 1 for r in records]
+    count = max(1, -(-sum(sizes) // max(1, budget)))
+    target = min(budget, -(-sum(sizes) // count))
+
+    # close a chunk once it reaches the target (never past the budget); closing
+    # before the target would leave a sliver of leftovers at the end
+    chunks, current, used = [], [], 0
+    for record, size in zip(records, sizes):
+        if current and (used >= target or used + size > budget):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(record)
+        used += size
+    chunks.append(current)
+    return chunks
+
+
+def report_tokens(stage: str, sections: dict[str, int], budget: int | None = None) -> dict[str, int]:
+    # per-stage token accounting, logged with every prompt build
+    total = sum(sections.values())
+    budget = budget if budget is not None else budget_for(stage)
+    parts = " ".join(f"{name}={tokens}" for name, tokens in sections.items())
+    print(f"[Prompt] {stage}: {parts} total={total}/{budget}")
+    return {**sections, "total": total, "budget": budget}
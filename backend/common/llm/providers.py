@@ -0,0 +1,365 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import httpx
+import openai
+from groq import AsyncGroq, RateLimitError
+
+from backend.common.llm.rate_limiter import estimate_tokens, retry_after_seconds
+
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # groq | openai | fake
+
+# connection pool limits for http-based providers
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+
+class ProviderError(Exception): pass
+
+class ProviderRateLimitError(ProviderError):
+    # the provider rejected the request for rate limits (HTTP 429)
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+
+@dataclass
+class Completion:
+    text: str
+    usage: Usage | None = None
+
+
+@dataclass
+class StreamChunk:
+    text: str = ""
+    usage: Usage | None = None  # set on the final chunk when the provider reports it
+
+
+class LLMProvider(ABC):
+    """
+    Chat-completion backend used by llm_structured.
+    `schema` is the JSON schema of the expected answer. It is already part of
+    the system message; providers may use it directly (e.g. to fake answers).
+    """
+
+    name: str
+    default_model: str  # fast tier
+    strong_model: str | None = None  # opt-in model for the harder stages, see routing.py
+
+    @abstractmethod
+    async def complete(
+            self,
+            model: str,
+            messages: list[dict],
+            *,
+            json_mode: bool = True,
+            schema: dict | None = None,
+            max_tokens: int | None = None
+    ) -> Completion: ...
+
+    @abstractmethod
+    def stream(
+            self,
+            model: str,
+            messages: list[dict],
+            *,
+            schema: dict | None = None,
+            max_tokens: int | None = None
+    ) -> AsyncIterator[StreamChunk]:
+        # async generator; callers aclose() it to abort the request
+        ...
+
+
+def _http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS
+        ),
+        timeout=LLM_TIMEOUT_SECONDS
+    )
+
+
+def _api_usage(usage) -> Usage | None:
+    # usage object of an openai-style response (groq's SDK uses the same shape)
+    if usage is None:
+        return None
+    return Usage(usage.prompt_tokens, usage.completion_tokens, usage.total_tokens)
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+    default_model = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+    strong_model = os.getenv("GROQ_STRONG_MODEL")  # e.g. llama-3.3-70b-versatile
+
+    def __init__(self):
+        # one client (and pooled httpx connections) per event loop: httpx pools
+        # are bound to the loop that created them
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = weakref.WeakKeyDictionary()
+
+    def _client(self) -> AsyncGroq:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            # retries (including 429s) are handled by llm_structured_async + rate_limiter
+            client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=_http_client(), max_retries=0)
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _options(max_tokens: int | None) -> dict:
+        return {"max_tokens": max_tokens} if max_tokens else {}
+
+    async def complete(self, model, messages, *, json_mode=True, schema=None, max_tokens=None) -> Completion:
+        try:
+            resp = await self._client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                response_format={"type": "json_object"} if json_mode else None,
+                **self._options(max_tokens)
+            )
+        except RateLimitError as e:
+            raise ProviderRateLimitError(str(e), retry_after_seconds(e.response.headers))
+        return Completion(resp.choices[0].message.content, _api_usage(resp.usage))
+
+    async def stream(self, model, messages, *, schema=None, max_tokens=None):
+        try:
+            # groq's json mode can't be streamed; callers enforce the shape
+            stream = await self._client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                stream=True,
+                **self._options(max_tokens)
+            )
+        except RateLimitError as e:
+            raise ProviderRateLimitError(str(e), retry_after_seconds(e.response.headers))
+        try:
+            async for chunk in stream:
+                usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                yield StreamChunk(delta or "", _api_usage(usage))
+        finally:
+            await stream.close()
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any OpenAI-compatible chat completions API: OpenAI itself, or another host
+    (Together, Fireworks, a self-hosted vLLM, ...) via LLM_BASE_URL, so traffic
+    can move off Groq with configuration alone.
+    """
+
+    name = "openai"
+    default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    strong_model = os.getenv("OPENAI_STRONG_MODEL")  # e.g. gpt-4o
+
+    def __init__(self):
+        self.base_url = os.getenv("LLM_BASE_URL")  # None = api.openai.com
+        self.api_key = os.getenv("LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+    def _client(self) -> openai.AsyncOpenAI:
+        # per event loop, like GroqProvider
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=_http_client(),
+                max_retries=0
+            )
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _options(json_mode: bool, max_tokens: int | None) -> dict:
+        options = {}
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        return options
+
+    async def complete(self, model, messages, *, json_mode=True, schema=None, max_tokens=None) -> Completion:
+        try:
+            resp = await self._client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                **self._options(json_mode, max_tokens)
+            )
+        except openai.RateLimitError as e:
+            raise ProviderRateLimitError(str(e), retry_after_seconds(e.response.headers))
+        return Completion(resp.choices[0].message.content, _api_usage(resp.usage))
+
+    async def stream(self, model, messages, *, schema=None, max_tokens=None):
+        try:
+            stream = await self._client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._options(False, max_tokens)
+            )
+        except openai.RateLimitError as e:
+            raise ProviderRateLimitError(str(e), retry_after_seconds(e.response.headers))
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                yield StreamChunk(delta or "", _api_usage(chunk.usage))
+        finally:
+            await stream.close()
+
+
+# fake provider: offline load tests and benchmarks of the full pipeline
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "200"))
+LLM_FAKE_JITTER_MS = float(os.getenv("LLM_FAKE_JITTER_MS", "100"))
+LLM_FAKE_MS_PER_TOKEN = float(os.getenv("LLM_FAKE_MS_PER_TOKEN", "0"))
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+LLM_FAKE_RATE_LIMIT_RATE = float(os.getenv("LLM_FAKE_RATE_LIMIT_RATE", "0"))
+LLM_FAKE_INVALID_RATE = float(os.getenv("LLM_FAKE_INVALID_RATE", "0"))
+LLM_FAKE_RETRY_AFTER = float(os.getenv("LLM_FAKE_RETRY_AFTER", "1.0"))
+# JSONL of {"prompt": <user message>, "response": <raw completion>}, e.g. exported from llm_calls
+LLM_FAKE_RECORDINGS = os.getenv("LLM_FAKE_RECORDINGS")
+
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic stand-in: replays recorded responses by prompt, otherwise
+    generates JSON that satisfies the requested schema (same prompt -> same answer).
+    Latency, errors, 429s and invalid output are injected at the configured rates.
+    """
+
+    name = "fake"
+    default_model = "fake-model"
+
+    def __init__(self, recordings_path: str | None = LLM_FAKE_RECORDINGS):
+        self.recordings: dict[str, str] = {}
+        if recordings_path:
+            with open(recordings_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self.recordings[_prompt_key(row["prompt"])] = row["response"]
+            print(f"[FakeLLM] Loaded {len(self.recordings)} recorded responses")
+        self._faults = random.Random()
+
+    def _answer(self, messages: list[dict], schema: dict | None, max_tokens: int | None) -> str:
+        prompt = messages[-1]["content"]
+        if self._faults.random() < LLM_FAKE_INVALID_RATE:
+            return "Sure! Here is the analysis you asked for, without any JSON."
+        text = self.recordings.get(_prompt_key(prompt))
+        if text is None:
+            rng = random.Random(_prompt_key(prompt))
+            text = json.dumps(fake_json(schema or {"type": "object"}, rng))
+        if max_tokens and estimate_tokens(text) > max_tokens:
+            # cut off like a real completion hitting max_tokens
+            text = text[:max_tokens * 4]
+        return text
+
+    async def _inject_faults(self) -> None:
+        roll = self._faults.random()
+        if roll < LLM_FAKE_RATE_LIMIT_RATE:
+            raise ProviderRateLimitError("fake provider: injected 429", LLM_FAKE_RETRY_AFTER)
+        if roll < LLM_FAKE_RATE_LIMIT_RATE + LLM_FAKE_ERROR_RATE:
+            await asyncio.sleep(self._latency(0) / 2)
+            raise ProviderError("fake provider: injected failure")
+
+    def _latency(self, tokens: int) -> float:
+        jitter = self._faults.uniform(-LLM_FAKE_JITTER_MS, LLM_FAKE_JITTER_MS)
+        return max(0.0, LLM_FAKE_LATENCY_MS + jitter + tokens * LLM_FAKE_MS_PER_TOKEN) / 1000
+
+    @staticmethod
+    def _usage(messages: list[dict], text: str) -> Usage:
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = estimate_tokens(text)
+        return Usage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens)
+
+    async def complete(self, model, messages, *, json_mode=True, schema=None, max_tokens=None) -> Completion:
+        await self._inject_faults()
+        text = self._answer(messages, schema, max_tokens)
+        await asyncio.sleep(self._latency(estimate_tokens(text)))
+        return Completion(text, self._usage(messages, text))
+
+    async def stream(self, model, messages, *, schema=None, max_tokens=None):
+        await self._inject_faults()
+        text = self._answer(messages, schema, max_tokens)
+        step = 16
+        delay = self._latency(estimate_tokens(text)) / max(1, -(-len(text) // step))
+        for i in range(0, len(text), step):
+            await asyncio.sleep(delay)
+            yield StreamChunk(text[i:i + step])
+        yield StreamChunk(usage=self._usage(messages, text))
+
+
+def fake_json(schema: dict, rng: random.Random, name: str = "value", defs: dict | None = None) -> Any:
+    # value that validates against a pydantic-generated JSON schema
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_json(defs[schema["$ref"].split("/")[-1]], rng, name, defs)
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"] or schema["anyOf"]
+        return fake_json(options[0], rng, name, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type", "object")
+    if kind == "object":
+        if "properties" in schema:
+            return {key: fake_json(sub, rng, key, defs) for key, sub in schema["properties"].items()}
+        values = schema.get("additionalProperties")
+        if isinstance(values, dict):
+            return {f"{name}_{i}": fake_json(values, rng, name, defs) for i in range(1, 3)}
+        return {}
+    if kind == "array":
+        return [fake_json(schema.get("items", {}), rng, name, defs) for _ in range(rng.randint(1, 3))]
+    if kind in ("number", "integer"):
+        low = schema.get("minimum", schema.get("exclusiveMinimum", 0))
+        high = schema.get("maximum", schema.get("exclusiveMaximum", max(low, 1) if kind == "number" else low + 100))
+        return rng.randint(int(low), int(high)) if kind == "integer" else round(rng.uniform(low, high), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    return f"fake {name.replace('_', ' ')} #{rng.randint(1, 999)}"
+
+
+_PROVIDERS = {
+    "groq": GroqProvider,
+    "openai": OpenAICompatibleProvider,
+    "fake": FakeProvider,
+}
+
+_provider: LLMProvider | None = None
+
+def get_provider() -> LLMProvider:
+    # selected by LLM_PROVIDER, one instance per process
+    global _provider
+    if _provider is None:
+        if LLM_PROVIDER not in _PROVIDERS:
+            raise RuntimeError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Use one of: {', '.join(_PROVIDERS)}")
+        _provider = _PROVIDERS[LLM_PROVIDER]()
+    return _provider
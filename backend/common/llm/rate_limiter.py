@@ -0,0 +1,231 @@
+import asyncio
+import math
+import os
+import time
+from contextvars import ContextVar
+
+import redis
+from celery.signals import task_prerun
+
+from backend.common.storage.redis_client import redis_client
+
+
+# groq account limits per model (requests/minute, tokens/minute). every worker
+# process draws from the same redis buckets, so these are global limits.
+LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+LLM_RPM_LIMIT = int(os.getenv("GROQ_RPM_LIMIT", "30"))
+LLM_TPM_LIMIT = int(os.getenv("GROQ_TPM_LIMIT", "6000"))
+
+# tokens reserved for the completion when estimating a request's cost
+LLM_EST_COMPLETION_TOKENS = int(os.getenv("LLM_EST_COMPLETION_TOKENS", "512"))
+
+# AIMD: halve the effective limits on a 429, grow back a little on every success
+LLM_RATE_AIMD_DECREASE = float(os.getenv("LLM_RATE_AIMD_DECREASE", "0.5"))
+LLM_RATE_AIMD_INCREASE = float(os.getenv("LLM_RATE_AIMD_INCREASE", "0.02"))  # fraction of the configured limit
+LLM_RATE_MIN_FRACTION = float(os.getenv("LLM_RATE_MIN_FRACTION", "0.1"))
+
+# share of the rpm/tpm budget the bulk lane may use; the rest is held back for
+# interactive calls, so a large batch can't make interactive jobs wait
+LLM_RATE_BULK_FRACTION = float(os.getenv("LLM_RATE_BULK_FRACTION", "0.5"))
+
+# pause after a 429 that carried no Retry-After header
+LLM_RATE_DEFAULT_BACKOFF = float(os.getenv("LLM_RATE_DEFAULT_BACKOFF", "2.0"))
+LLM_RATE_MAX_WAIT_SECONDS = float(os.getenv("LLM_RATE_MAX_WAIT_SECONDS", "120"))
+
+
+# two token buckets (rpm, tpm) refilled continuously at limit/60 per second.
+# takes from both or neither; returns 0 on success, else seconds to wait.
+# a caller with a reserve may only take while reserve * limit stays in the bucket.
+# KEYS: rpm bucket, tpm bucket, limits hash, blocked-until key
+# ARGV: tokens, default rpm, default tpm, reserve fraction
+_ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+-- blocked-until is a key whose TTL is the remaining Retry-After
+local blocked = redis.call('PTTL', KEYS[4])
+if blocked > 0 then
+    return tostring(blocked / 1000)
+end
+
+local rpm = tonumber(redis.call('HGET', KEYS[3], 'rpm') or ARGV[2])
+local tpm = tonumber(redis.call('HGET', KEYS[3], 'tpm') or ARGV[3])
+local reserve = tonumber(ARGV[4] or 0)
+local tokens = math.min(tonumber(ARGV[1]), tpm * (1 - reserve))
+
+local function level(key, limit)
+    local b = redis.call('HMGET', key, 'level', 'ts')
+    local lvl = tonumber(b[1] or limit)
+    local ts = tonumber(b[2] or now)
+    return math.min(limit, lvl + (now - ts) * limit / 60)
+end
+
+local r = level(KEYS[1], rpm)
+local k = level(KEYS[2], tpm)
+
+local r_need = 1 + rpm * reserve
+local k_need = tokens + tpm * reserve
+local wait = 0
+if r < r_need then wait = math.max(wait, (r_need - r) * 60 / rpm) end
+if k < k_need then wait = math.max(wait, (k_need - k) * 60 / tpm) end
+if wait > 0 then
+    return tostring(wait)
+end
+
+redis.call('HSET', KEYS[1], 'level', r - 1, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', k - tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+redis.call('EXPIRE', KEYS[2], 120)
+return '0'
+"""
+
+# return (or charge) the difference between estimated and actual token usage
+# KEYS: tpm bucket. ARGV: delta
+_SETTLE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'level', ARGV[1])
+end
+return 1
+"""
+
+# scale the effective limits: factor < 1 on 429 (multiplicative decrease),
+# additive step on success, clamped to [min, max]
+# KEYS: limits hash. ARGV: factor, step, default rpm, default tpm, min fraction
+_ADJUST = """
+local out = {}
+for i, field in ipairs({'rpm', 'tpm'}) do
+    local max = tonumber(ARGV[2 + i])
+    local cur = tonumber(redis.call('HGET', KEYS[1], field) or max)
+    local nxt = cur * tonumber(ARGV[1]) + max * tonumber(ARGV[2])
+    nxt = math.max(max * tonumber(ARGV[5]), math.min(max, nxt))
+    redis.call('HSET', KEYS[1], field, nxt)
+    out[i] = tostring(nxt)
+end
+redis.call('EXPIRE', KEYS[1], 3600)
+return out
+"""
+
+
+# lane of the job the current celery task works for; set from params["lane"]
+# (see scheduler._dispatch) and read when acquiring, so bulk calls stay in their share
+llm_lane: ContextVar[str] = ContextVar("llm_lane", default="interactive")
+
+
+@task_prerun.connect
+def _set_lane(kwargs=None, **_):
+    # set for every task, so a reused worker thread never keeps the previous lane
+    params = (kwargs or {}).get("params") or {}
+    llm_lane.set(params.get("lane", "interactive"))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for english/json; no tokenizer dependency
+    return math.ceil(len(text) / 4)
+
+
+class RateLimiter:
+    """
+    Redis-backed RPM + TPM token buckets shared by every process calling Groq.
+    - acquire() waits until both buckets allow the request; bulk-lane calls
+      leave (1 - bulk_fraction) of both buckets to interactive calls
+    - on_success() corrects the token estimate with the real usage and
+      grows the effective limits back towards the configured ones
+    - on_rate_limited() honors Retry-After and halves the effective limits (AIMD)
+    Redis errors fail open: the request is sent and Groq stays the final arbiter.
+    """
+
+    def __init__(
+            self,
+            rpm: int = LLM_RPM_LIMIT,
+            tpm: int = LLM_TPM_LIMIT,
+            enabled: bool = LLM_RATE_LIMIT_ENABLED,
+            bulk_fraction: float = LLM_RATE_BULK_FRACTION
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.enabled = enabled
+        self.bulk_fraction = bulk_fraction
+        self.redis = redis_client
+        self._acquire = self.redis.register_script(_ACQUIRE)
+        self._settle = self.redis.register_script(_SETTLE)
+        self._adjust = self.redis.register_script(_ADJUST)
+
+    @staticmethod
+    def _keys(model: str) -> list[str]:
+        prefix = f"llm_rate:{model}"
+        return [f"{prefix}:rpm", f"{prefix}:tpm", f"{prefix}:limits", f"{prefix}:blocked_until"]
+
+    def try_acquire(self, model: str, tokens: int, lane: str = "interactive") -> float:
+        # 0 when the request may go now, else seconds to wait before trying again
+        if not self.enabled:
+            return 0.0
+        reserve = 1 - self.bulk_fraction if lane == "bulk" else 0
+        try:
+            return float(self._acquire(keys=self._keys(model), args=[tokens, self.rpm, self.tpm, reserve]))
+        except redis.RedisError as e:
+            print(f"[RateLimiter] acquire failed, allowing request: {e}")
+            return 0.0
+
+    async def acquire(self, model: str, tokens: int, lane: str | None = None) -> None:
+        # waits without holding a connection or a concurrency slot
+        lane = lane or llm_lane.get()
+        deadline = time.monotonic() + LLM_RATE_MAX_WAIT_SECONDS
+        while (wait := await asyncio.to_thread(self.try_acquire, model, tokens, lane)) > 0:
+            # bulk calls keep waiting: sending them anyway would spend the interactive reserve
+            if lane != "bulk" and time.monotonic() + wait > deadline:
+                print(f"[RateLimiter] {model} still limited after {LLM_RATE_MAX_WAIT_SECONDS}s, sending anyway")
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self, model: str, estimated: int, actual: int) -> None:
+        if not self.enabled:
+            return
+        if actual > 0:
+            try:
+                self._settle(keys=self._keys(model)[1:2], args=[estimated - actual])
+            except redis.RedisError as e:
+                print(f"[RateLimiter] settle failed: {e}")
+        self._adjust_limits(model, 1.0, LLM_RATE_AIMD_INCREASE)
+
+    def on_rate_limited(self, model: str, retry_after: float | None) -> None:
+        if not self.enabled:
+            return
+        rpm, tpm = self._adjust_limits(model, LLM_RATE_AIMD_DECREASE, 0.0) or (None, None)
+        print(f"[RateLimiter] 429 on {model}, retry after {retry_after}s, limits now rpm={rpm} tpm={tpm}")
+        pause = retry_after or LLM_RATE_DEFAULT_BACKOFF
+        try:
+            # every process waits out the pause before its next acquire
+            self.redis.set(self._keys(model)[3], 1, px=max(1, math.ceil(pause * 1000)))
+        except redis.RedisError as e:
+            print(f"[RateLimiter] could not record Retry-After: {e}")
+
+    def _adjust_limits(self, model: str, factor: float, step: float) -> tuple[float, float] | None:
+        if not self.enabled:
+            return None
+        try:
+            rpm, tpm = self._adjust(
+                keys=self._keys(model)[2:3],
+                args=[factor, step, self.rpm, self.tpm, LLM_RATE_MIN_FRACTION]
+            )
+            return round(float(rpm), 1), round(float(tpm), 1)
+        except redis.RedisError as e:
+            print(f"[RateLimiter] limit adjustment failed: {e}")
+            return None
+
+
+def retry_after_seconds(headers) -> float | None:
+    # groq sends retry-after (seconds); some responses also carry retry-after-ms
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) / scale)
+        except ValueError:
+            continue
+    return None
+
+
+rate_limiter = RateLimiter()
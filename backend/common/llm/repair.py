@@ -0,0 +1,130 @@
+import json
+import re
+from typing import Any, Type
+
+from pydantic import BaseModel, ValidationError
+
+from backend.common.llm.prompt_budget import schema_text
+
+
+REPAIR_INSTRUCTIONS = (
+    "You fix JSON objects that failed schema validation.\n"
+    "Return ONLY the corrected JSON object with NO text before or after.\n"
+    "Change only what the listed errors require; keep every other value as is."
+)
+
+# error types that local fixes can resolve without another LLM call
+_NUMBER_ERRORS = {"float_parsing", "int_parsing", "float_type", "int_type", "int_from_float"}
+# inclusive bounds only: the bound itself is valid. exclusive (lt/gt) bounds have no
+# obvious nearest value for a float, so those go to the LLM
+_BOUND_ERRORS = {"less_than_equal", "greater_than_equal"}
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+MAX_ERRORS_IN_PROMPT = 20
+MAX_INPUT_CHARS = 80
+
+
+def _coerce_number(value: Any, error_type: str) -> Any:
+    # "0.8", " 85% ", "approx. 3" -> number; None when there is no number to take
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    if isinstance(value, float) and error_type == "int_from_float":
+        return round(value)
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = float(match.group(0))
+    if isinstance(value, str) and "%" in value:
+        number /= 100
+    if error_type.startswith("int"):
+        return round(number)
+    return number
+
+
+def _clamp(value: Any, ctx: dict) -> Any:
+    # bounded numbers (e.g. confidence_score in [0, 1]) are clamped into range
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if "le" in ctx:
+        return min(value, ctx["le"])
+    if "ge" in ctx:
+        return max(value, ctx["ge"])
+    return None
+
+
+def _fix(error: dict) -> tuple[bool, Any]:
+    # (fixable, replacement value) for one validation error
+    error_type = error["type"]
+    value = error.get("input")
+    if error_type == "extra_forbidden":
+        return True, None
+    if error_type in _NUMBER_ERRORS:
+        fixed = _coerce_number(value, error_type)
+    elif error_type in _BOUND_ERRORS:
+        fixed = _clamp(value, error.get("ctx", {}))
+    elif error_type == "string_type" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        fixed = str(value)
+    else:
+        return False, None
+    return fixed is not None, fixed
+
+
+def apply_local_fixes(data: Any, error: ValidationError) -> bool:
+    """
+    Fix what can be fixed without the LLM, in place: coerce numeric strings,
+    clamp out-of-range bounded numbers, stringify numbers in string fields
+    and drop keys the schema forbids.
+    Returns True only if every error was fixed (worth validating again).
+    """
+    for err in error.errors():
+        loc = err["loc"]
+        if not loc:
+            return False
+        fixable, value = _fix(err)
+        if not fixable:
+            return False
+
+        parent = data
+        try:
+            for key in loc[:-1]:
+                parent = parent[key]
+            if err["type"] == "extra_forbidden":
+                del parent[loc[-1]]
+            else:
+                parent[loc[-1]] = value
+        except (KeyError, IndexError, TypeError):
+            return False
+    return True
+
+
+def format_errors(error: ValidationError) -> str:
+    # concise "path: message (got ...)" lines for the repair prompt
+    lines = []
+    for err in error.errors(include_url=False)[:MAX_ERRORS_IN_PROMPT]:
+        path = ".".join(str(p) for p in err["loc"]) or "<root>"
+        if err["type"] == "missing":
+            # input is the whole parent object; the path says enough
+            lines.append(f"- {path}: {err['msg']}")
+            continue
+        got = json.dumps(err.get("input"), default=str)
+        if len(got) > MAX_INPUT_CHARS:
+            got = got[:MAX_INPUT_CHARS] + "..."
+        lines.append(f"- {path}: {err['msg']} (got {got})")
+    hidden = error.error_count() - len(lines)
+    if hidden > 0:
+        lines.append(f"- ... and {hidden} more errors")
+    return "\n".join(lines)
+
+
+def build_repair_prompt(json_text: str, error: ValidationError, schema: Type[BaseModel] | None = None) -> str:
+    # a missing field can't be filled in from its name alone: send the schema with it
+    schema_part = ""
+    if schema is not None and any(err["type"] == "missing" for err in error.errors()):
+        schema_part = f"Schema:\n{schema_text(schema)}\n\n"
+    return (
+        f"Invalid JSON:\n{json_text}\n\n"
+        f"Validation errors:\n{format_errors(error)}\n\n"
+        f"{schema_part}"
+        "Return ONLY the corrected JSON."
+    )
@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, replace
+
+from backend.common.llm.providers import get_provider
+
+
+# model tiers; LLM_MODEL keeps overriding the provider's default (fast) model.
+# the strong tier is opt-in: unless LLM_MODEL_STRONG (or the provider's strong
+# model, e.g. GROQ_STRONG_MODEL) is set, every stage runs on the configured default
+LLM_MODEL_FAST = os.getenv("LLM_MODEL") or os.getenv("LLM_MODEL_FAST") or get_provider().default_model
+LLM_MODEL_STRONG = os.getenv("LLM_MODEL_STRONG") or get_provider().strong_model or LLM_MODEL_FAST
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+# while a stage breaches its latency SLO, this share of calls still goes to the
+# primary model so the router notices when it recovers
+LLM_ROUTE_PROBE_RATE = float(os.getenv("LLM_ROUTE_PROBE_RATE", "0.1"))
+LLM_ROUTE_SLO_PERCENTILE = float(os.getenv("LLM_ROUTE_SLO_PERCENTILE", "0.95"))
+LLM_ROUTE_MIN_SAMPLES = int(os.getenv("LLM_ROUTE_MIN_SAMPLES", "10"))
+
+
+@dataclass(frozen=True)
+class StageRoute:
+    model: str
+    fallbacks: tuple[str, ...] = ()  # tried in order when the model fails; fallbacks[0] is the downgrade target
+    max_tokens: int | None = None
+    timeout: float = LLM_TIMEOUT_SECONDS
+    latency_slo: float | None = None  # seconds at LLM_ROUTE_SLO_PERCENTILE; None = never downgrade for latency
+
+    @property
+    def chain(self) -> list[str]:
+        return [self.model, *self.fallbacks]
+
+
+DEFAULT_ROUTE = StageRoute(model=LLM_MODEL_FAST)
+
+
+def _strong_route(**options) -> StageRoute:
+    # strong model with the fast one as fallback; just the fast model when no strong tier is configured
+    fallbacks = (LLM_MODEL_FAST,) if LLM_MODEL_STRONG != LLM_MODEL_FAST else ()
+    return StageRoute(LLM_MODEL_STRONG, fallbacks, **options)
+
+
+# stage -> route. discovery recalls trials/patents from the model's knowledge and
+# synthesis reasons over all evidence, so both get the strong tier when one is
+# configured; summarizing search results and map chunks is easy enough for the fast one.
+DEFAULT_ROUTES: dict[str, StageRoute] = {
+    "clinical_trial_discovery": _strong_route(max_tokens=4096, timeout=90, latency_slo=45),
+    "patent_discovery": _strong_route(max_tokens=4096, timeout=90, latency_slo=45),
+    "market_analysis": StageRoute(LLM_MODEL_FAST, max_tokens=2048, timeout=60),
+    "synthesis": _strong_route(max_tokens=4096, timeout=120, latency_slo=60),
+    "synthesis_map": StageRoute(LLM_MODEL_FAST, max_tokens=1024, timeout=60),
+}
+
+
+def _routes_from_env() -> dict[str, StageRoute]:
+    # LLM_ROUTES='{"synthesis": {"model": "...", "fallbacks": ["..."], "max_tokens": 4096, "timeout": 90}}'
+    # fields not given keep their default; "fast"/"strong" name the model tiers
+    tiers = {"fast": LLM_MODEL_FAST, "strong": LLM_MODEL_STRONG}
+    routes = dict(DEFAULT_ROUTES)
+    for stage, overrides in json.loads(os.getenv("LLM_ROUTES", "{}")).items():
+        if "model" in overrides:
+            overrides["model"] = tiers.get(overrides["model"], overrides["model"])
+        if "fallbacks" in overrides:
+            overrides["fallbacks"] = tuple(tiers.get(m, m) for m in overrides["fallbacks"])
+        routes[stage] = replace(routes.get(stage, DEFAULT_ROUTE), **overrides)
+    return routes
+
+
+class LatencyTracker:
+    # rolling latency history (seconds) per key, e.g. a stage or stage@model
+
+    def __init__(self, window: int = 200, min_samples: int = LLM_ROUTE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key: str, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples[key])
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+    downgraded: int = 0
+    models: dict[str, int] = field(default_factory=dict)
+
+
+class ModelRouter:
+    """
+    Picks the model chain for each llm_structured stage.
+    Stage names fall back to their prefix ("synthesis_swot" -> "synthesis").
+    A stage is downgraded to its first fallback while the process is saturated
+    or while the primary model's latency breaches the stage SLO.
+    """
+
+    def __init__(self, routes: dict[str, StageRoute]):
+        self.routes = routes
+        self.latency = LatencyTracker()
+        self.stats: dict[str, StageStats] = defaultdict(StageStats)
+        self._downgraded: set[str] = set()
+        self._lock = threading.Lock()
+
+    def route(self, stage: str) -> StageRoute:
+        name = stage
+        while name not in self.routes and "_" in name:
+            name = name.rsplit("_", 1)[0]
+        return self.routes.get(name, DEFAULT_ROUTE)
+
+    def models(self, stage: str, overloaded: bool = False) -> list[str]:
+        route = self.route(stage)
+        chain = route.chain
+        if len(chain) < 2:
+            return chain
+
+        reason = None
+        if overloaded:
+            reason = "load"
+        elif route.latency_slo is not None:
+            p = self.latency.percentile(f"{stage}@{route.model}", LLM_ROUTE_SLO_PERCENTILE)
+            if p is not None and p > route.latency_slo:
+                reason = f"p{int(LLM_ROUTE_SLO_PERCENTILE * 100)} {p:.1f}s > SLO {route.latency_slo:g}s"
+
+        with self._lock:
+            if reason and stage not in self._downgraded:
+                print(f"[Router] Downgrading {stage} to {chain[1]} ({reason})")
+                self._downgraded.add(stage)
+            elif not reason and stage in self._downgraded:
+                print(f"[Router] {stage} back on {route.model}")
+                self._downgraded.discard(stage)
+
+        # an SLO downgrade still probes the primary now and then to see it recover
+        probe = reason and not overloaded and random.random() < LLM_ROUTE_PROBE_RATE
+        if not reason or probe:
+            return chain
+        with self._lock:
+            self.stats[stage].downgraded += 1
+        return chain[1:]
+
+    def record(self, stage: str, model: str, seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+        self.latency.record(f"{stage}@{model}", seconds)
+        with self._lock:
+            stats = self.stats[stage]
+            stats.calls += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.latency_seconds += seconds
+            stats.models[model] = stats.models.get(model, 0) + 1
+
+
+model_router = ModelRouter(_routes_from_env())
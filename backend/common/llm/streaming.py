@@ -0,0 +1,110 @@
+import json
+from typing import Any
+
+
+class StreamAbort(Exception):
+    # the partial output can no longer become a valid object for the schema
+    pass
+
+
+# markdown fences the model sometimes puts around the object
+_FENCE_PREFIXES = ("```json", "```")
+
+
+class IncrementalJSONParser:
+    """
+    Consumes a streamed JSON object chunk by chunk.
+    - raises StreamAbort as soon as the output cannot be a single JSON object
+      (prose before the opening brace, a top-level array/string/number)
+    - feed() returns the top-level fields completed by the chunk, in order
+    - `done` is set once the top-level object has closed; the rest of the
+      stream can be dropped
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._pos = 0            # next buffer index to scan
+        self._started = False    # opening brace seen
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = 0   # start of the current top-level "key": value
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        if self.done or not chunk:
+            return []
+        self.buffer += chunk
+        if not self._started and not self._find_start():
+            return []
+        return self._scan()
+
+    @property
+    def text(self) -> str:
+        # the object text seen so far (complete once `done`)
+        return self.buffer[self._object_start:] if self._started else ""
+
+    def _find_start(self) -> bool:
+        head = self.buffer.lstrip()
+        for fence in _FENCE_PREFIXES:
+            if head.startswith(fence):
+                head = head[len(fence):].lstrip()
+                break
+            if fence.startswith(head):
+                return False  # could still become a fence; wait for more
+        if not head:
+            return False
+        if head[0] != "{":
+            kind = "array" if head[0] == "[" else "text"
+            raise StreamAbort(f"expected a JSON object, got {kind}: {head[:60]!r}")
+
+        self._started = True
+        self._object_start = len(self.buffer) - len(head)
+        self._pos = self._object_start
+        return True
+
+    def _scan(self) -> list[tuple[str, Any]]:
+        fields = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    fields.extend(self._member(buf[self._member_start:i]))
+                    self.done = True
+                    self._pos = i + 1
+                    self.buffer = buf[:i + 1]
+                    return fields
+            elif ch == "," and self._depth == 1:
+                fields.extend(self._member(buf[self._member_start:i]))
+                self._member_start = i + 1
+
+        self._pos = len(buf)
+        return fields
+
+    @staticmethod
+    def _member(text: str) -> list[tuple[str, Any]]:
+        # one complete top-level `"key": value`
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError:
+            # malformed member; final validation reports it
+            return []
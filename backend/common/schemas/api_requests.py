@@ -1,10 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
 
 
 class ResearchRequest(BaseModel):
     prompt: str
     molecule: str
+    deadline_seconds: int | None = Field(None, gt=0)
+    user_id: int | None = None
+
+class BatchResearchRequest(BaseModel):
+    prompt: str
+    molecules: list[str]
+    user_id: int | None = None
 
 class ResearchStatusResponse(BaseModel):
     job_id: uuid.UUID
@@ -38,6 +38,13 @@ class CanonicalResult(BaseModel):
     
     synthesis_version: str = "0.2.0"
 
+class EvidenceDigest(BaseModel):
+    # intermediate summary of one chunk of trials or patents (map-reduce synthesis)
+    summary: str
+    key_findings: List[str] = Field(default_factory=list)
+    risks: List[str] = Field(default_factory=list)
+    notable_records: List[str] = Field(default_factory=list, description="IDs of the most significant records")
+
 class SynthesisOutput(BaseModel):
     # The pure analysis part generated by LLM
     trial_summary: str
@@ -49,3 +56,23 @@ class SynthesisOutput(BaseModel):
     risk_assessment: str
     market_data: Optional[Dict[str, Any]] = None
     patent_data: Optional[Dict[str, Any]] = None
+
+
+# sub-schemas for decomposed synthesis: each section is its own smaller call,
+# merged field by field into SynthesisOutput
+class TrialSummarySection(BaseModel):
+    trial_summary: str
+    key_findings: List[str]
+
+class SwotSection(BaseModel):
+    swot_analysis: Dict[str, List[str]] = Field(description="Keys: strengths, weaknesses, opportunities, threats")
+
+class RiskSection(BaseModel):
+    risk_assessment: str
+
+class ScoresSection(BaseModel):
+    data_completeness_score: float = Field(ge=0.0, le=1.0)
+    confidence_overall: float = Field(ge=0.0, le=1.0)
+
+class FollowUpSection(BaseModel):
+    suggested_follow_up: List[str]
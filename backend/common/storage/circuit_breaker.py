@@ -0,0 +1,205 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable
+
+import redis
+
+from backend.common.storage.redis_client import redis_client
+
+
+# consecutive failures (within the window) that open a breaker
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_FAILURE_WINDOW_SECONDS = float(os.getenv("CIRCUIT_FAILURE_WINDOW_SECONDS", "60"))
+# how long an open breaker fails fast before letting a probe through
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception): pass
+
+
+# KEYS: open, tripped, probe. ARGV: probe ttl ms.
+# -> 0 reject, 1 allow, 2 allow as the half-open probe
+_ALLOW = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    if redis.call('SET', KEYS[3], '1', 'NX', 'PX', ARGV[1]) then
+        return 2
+    end
+    return 0
+end
+return 1
+"""
+
+# KEYS: failures, open, tripped, probe. ARGV: success (1/0), threshold, window ms, open ms.
+# -> new state when it changed ('open' / 'closed'), else ''
+_RECORD = """
+if ARGV[1] == '1' then
+    redis.call('DEL', KEYS[1])
+    if redis.call('EXISTS', KEYS[3]) == 1 and redis.call('EXISTS', KEYS[2]) == 0 then
+        redis.call('DEL', KEYS[3], KEYS[4])
+        return 'closed'
+    end
+    return ''
+end
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    -- failed while open or half-open: (re)open for another period
+    local reopened = redis.call('EXISTS', KEYS[2]) == 0
+    redis.call('SET', KEYS[2], '1', 'PX', ARGV[4])
+    redis.call('DEL', KEYS[4])
+    if reopened then
+        return 'open'
+    end
+    return ''
+end
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+if failures >= tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[2], '1', 'PX', ARGV[4])
+    redis.call('SET', KEYS[3], '1')
+    redis.call('DEL', KEYS[1])
+    return 'open'
+end
+return ''
+"""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker with its state shared in Redis, so every
+    worker stops calling a dependency once it is known to be down.
+    closed    - calls go through; threshold consecutive failures open it
+    open      - calls fail fast with CircuitOpenError for open_seconds
+    half_open - one probe call at a time; success closes, failure re-opens
+    Exceptions in `ignore` mean the dependency answered (e.g. 429, 404) and
+    count as success. A call abandoned without an outcome (cancelled) must
+    release_probe() if it was the probe. If Redis is unavailable the breaker
+    lets everything through.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+            failure_window: float = CIRCUIT_FAILURE_WINDOW_SECONDS,
+            open_seconds: float = CIRCUIT_OPEN_SECONDS,
+            probe_timeout: float = 60.0,
+            ignore: tuple[type[BaseException], ...] = ()
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        self.ignore = ignore
+        self.redis = redis_client
+        self._allow = self.redis.register_script(_ALLOW)
+        self._record = self.redis.register_script(_RECORD)
+
+    def _keys(self) -> list[str]:
+        prefix = f"circuit:{self.name}"
+        return [f"{prefix}:failures", f"{prefix}:open", f"{prefix}:tripped", f"{prefix}:probe"]
+
+    def before(self) -> bool:
+        # raises CircuitOpenError instead of letting the call through.
+        # returns True if this call is the half-open probe.
+        failures, opened, tripped, probe = self._keys()
+        try:
+            allowed = self._allow(keys=[opened, tripped, probe], args=[int(self.probe_timeout * 1000)])
+        except redis.RedisError as e:
+            print(f"[Circuit] {self.name}: state unavailable, allowing call: {e}")
+            return False
+        if allowed == 0:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if allowed == 2:
+            print(f"[Circuit] {self.name}: half-open, probing")
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        # the probe call was abandoned (e.g. a cancelled hedge): let another call probe
+        # now instead of rejecting everything until the probe key expires
+        try:
+            self.redis.delete(self._keys()[3])
+        except redis.RedisError as e:
+            print(f"[Circuit] {self.name}: could not release probe: {e}")
+
+    def _report(self, success: bool) -> None:
+        try:
+            changed = self._record(
+                keys=self._keys(),
+                args=[
+                    "1" if success else "0",
+                    self.failure_threshold,
+                    int(self.failure_window * 1000),
+                    int(self.open_seconds * 1000)
+                ]
+            )
+        except redis.RedisError as e:
+            print(f"[Circuit] {self.name}: could not record result: {e}")
+            return
+        if changed == "open":
+            print(f"[Circuit] {self.name}: OPEN, failing fast for {self.open_seconds:g}s")
+        elif changed == "closed":
+            print(f"[Circuit] {self.name}: closed, dependency recovered")
+
+    def success(self) -> None:
+        self._report(True)
+
+    def failure(self) -> None:
+        self._report(False)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        probing = self.before()
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignore:
+            self.success()
+            raise
+        except Exception:
+            self.failure()
+            raise
+        except BaseException:
+            if probing:
+                self.release_probe()
+            raise
+        self.success()
+        return result
+
+    async def call_async(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        # redis round-trips run in a worker thread to keep the event loop free
+        probing = await asyncio.to_thread(self.before)
+        try:
+            result = await fn(*args, **kwargs)
+        except self.ignore:
+            await asyncio.to_thread(self.success)
+            raise
+        except Exception:
+            await asyncio.to_thread(self.failure)
+            raise
+        except BaseException:
+            # cancelled: no outcome to record
+            if probing:
+                await asyncio.to_thread(self.release_probe)
+            raise
+        await asyncio.to_thread(self.success)
+        return result
+
+    def state(self) -> dict[str, Any]:
+        failures, opened, tripped, _ = self._keys()
+        try:
+            pipe = self.redis.pipeline()
+            pipe.get(failures)
+            pipe.pttl(opened)
+            pipe.exists(tripped)
+            count, open_ms, is_tripped = pipe.execute()
+        except redis.RedisError:
+            return {"state": "unknown"}
+        if open_ms > 0:
+            return {"state": "open", "retry_in_seconds": round(open_ms / 1000, 1)}
+        if is_tripped:
+            return {"state": "half_open"}
+        return {"state": "closed", "recent_failures": int(count or 0)}
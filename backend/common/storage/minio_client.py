@@ -3,6 +3,8 @@ from minio.error import S3Error
 import os
 from dotenv import load_dotenv
 
+from backend.common.storage.circuit_breaker import CircuitBreaker
+
 load_dotenv()
 
 def _required(key: str) -> str:
@@ -24,6 +26,9 @@ minio_client = Minio(
     secure= MINIO_SECURE
 )
 
+# connection failures / timeouts trip it; S3 error responses (e.g. missing object) mean MinIO is up
+minio_breaker = CircuitBreaker("minio", ignore=(S3Error,))
+
 # buckets
 REQUIRED_BUCKETS = [
     "artifacts",
@@ -51,7 +56,8 @@ def upload_file(bucket: str, object_name: str, file_path: str) -> dict:
         raise ValueError(f"Bucket '{bucket}' is not recognized. Must be one of : {REQUIRED_BUCKETS}")
     
     try:
-        minio_client.fput_object(
+        minio_breaker.call(
+            minio_client.fput_object,
             bucket_name= bucket,
             object_name= object_name,
             file_path= file_path
@@ -67,6 +73,10 @@ def upload_file(bucket: str, object_name: str, file_path: str) -> dict:
         print(f"[MinIO] Failed to upload '{file_path}' to bucket '{bucket}': {e}")
         raise
 
+# object download (stream; caller closes it)
+def get_object(bucket: str, object_name: str):
+    return minio_breaker.call(minio_client.get_object, bucket, object_name)
+
 # pre signed url for downloads
 def presigned_url(bucket: str, object_name: str, expires: int = 3600) -> str:
     # return signed temp url for downloading files.
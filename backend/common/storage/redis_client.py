@@ -0,0 +1,11 @@
+import redis
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# configuration (static). db 0/1 are the celery broker/backend; app state lives in its own db.
+REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6380/2")
+
+# connections are opened lazily, so importing this module never touches the network
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
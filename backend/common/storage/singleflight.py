@@ -0,0 +1,197 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+import redis
+
+from backend.common.storage.redis_client import redis_client
+
+
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+# how long a published result stays readable for waiters that check late
+SINGLEFLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLEFLIGHT_RESULT_TTL_SECONDS", "30"))
+STATS_KEY = "singleflight:stats"
+# threads for async waiters blocked on a leader; kept apart from the loop's
+# default executor so waiters can't starve the leader's own to_thread calls
+SINGLEFLIGHT_WAIT_THREADS = int(os.getenv("SINGLEFLIGHT_WAIT_THREADS", "32"))
+
+# result marker published when the leader failed; waiters then call upstream themselves
+_FAILED = "\x00failed"
+
+# delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Cross-process coalescing of identical in-flight calls.
+    The first caller for a key takes a Redis lock and makes the call (leader);
+    concurrent callers with the same key wait for the leader's published result
+    instead of repeating the upstream call. If the leader fails, dies or takes
+    longer than wait_timeout, waiters make the call themselves.
+    Values are strings. Redis errors never fail the call, they only disable coalescing.
+    """
+
+    def __init__(self, namespace: str, lock_ttl: float, wait_timeout: float | None = None):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout if wait_timeout is not None else lock_ttl
+        self.redis = redis_client
+        self.stats = {"leaders": 0, "coalesced": 0, "fallbacks": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._release = self.redis.register_script(_RELEASE)
+        self._waiters: ThreadPoolExecutor | None = None
+        self._waiters_pid: int | None = None
+
+    def _wait_executor(self) -> ThreadPoolExecutor:
+        # created lazily, and again after a fork (threads don't survive it)
+        with self._lock:
+            if self._waiters is None or self._waiters_pid != os.getpid():
+                self._waiters = ThreadPoolExecutor(
+                    max_workers=SINGLEFLIGHT_WAIT_THREADS,
+                    thread_name_prefix=f"singleflight-{self.namespace}"
+                )
+                self._waiters_pid = os.getpid()
+            return self._waiters
+
+    def _keys(self, key: str) -> tuple[str, str, str]:
+        prefix = f"singleflight:{self.namespace}"
+        return f"{prefix}:lock:{key}", f"{prefix}:result:{key}", f"{prefix}:done:{key}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+        try:
+            # shared counters, summed over all processes
+            self.redis.hincrby(STATS_KEY, f"{self.namespace}:{name}", 1)
+        except redis.RedisError:
+            pass
+
+    def _try_lead(self, key: str) -> str | None:
+        lock, _, _ = self._keys(key)
+        token = uuid.uuid4().hex
+        if self.redis.set(lock, token, nx=True, px=int(self.lock_ttl * 1000)):
+            return token
+        return None
+
+    def _wait(self, key: str) -> str | None:
+        # the leader's result, or None if it failed, vanished or timed out
+        lock, result, channel = self._keys(key)
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            # subscribe before the first GET so a result published in between isn't missed
+            pubsub.subscribe(channel)
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                value = self.redis.get(result)
+                if value is not None:
+                    return None if value == _FAILED else value
+                if not self.redis.exists(lock):
+                    # the leader may have published and released since the GET above
+                    value = self.redis.get(result)
+                    return None if value is None or value == _FAILED else value
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                pubsub.get_message(timeout=min(remaining, 1.0))
+        finally:
+            pubsub.close()
+
+    def _follow(self, key: str) -> tuple[str | None, str | None]:
+        # wait for the current leader -> (lock token if we lead the retry, coalesced value)
+        value = self._wait(key)
+        if value is not None:
+            self._count("coalesced")
+            return None, value
+        self._count("fallbacks")
+        # lead the retry if nobody else has taken over yet
+        return self._try_lead(key), None
+
+    def _unavailable(self, error: redis.RedisError) -> tuple[None, None]:
+        print(f"[SingleFlight] {self.namespace}: coalescing unavailable, calling directly: {error}")
+        self._count("errors")
+        return None, None
+
+    def _join(self, key: str) -> tuple[str | None, str | None]:
+        # -> (lock token if we lead, coalesced value if a leader answered)
+        if not SINGLEFLIGHT_ENABLED:
+            return None, None
+        try:
+            token = self._try_lead(key)
+            if token:
+                self._count("leaders")
+                return token, None
+            return self._follow(key)
+        except redis.RedisError as e:
+            return self._unavailable(e)
+
+    async def _join_async(self, key: str) -> tuple[str | None, str | None]:
+        if not SINGLEFLIGHT_ENABLED:
+            return None, None
+        try:
+            # taking the lock never blocks, so it stays on the default executor; only
+            # waiters use the wait pool, and new leaders never queue behind them
+            token = await asyncio.to_thread(self._try_lead, key)
+            if token:
+                await asyncio.to_thread(self._count, "leaders")
+                return token, None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._wait_executor(), self._follow, key)
+        except redis.RedisError as e:
+            return await asyncio.to_thread(self._unavailable, e)
+
+    def _finish(self, key: str, token: str, value: str) -> None:
+        lock, result, channel = self._keys(key)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(result, value, ex=SINGLEFLIGHT_RESULT_TTL_SECONDS)
+            pipe.publish(channel, "done")
+            pipe.execute()
+            self._release(keys=[lock], args=[token])
+        except redis.RedisError as e:
+            print(f"[SingleFlight] {self.namespace}: could not publish result: {e}")
+
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        token, value = self._join(key)
+        if value is not None:
+            return value
+        try:
+            value = fn()
+        except BaseException:
+            if token:
+                self._finish(key, token, _FAILED)
+            raise
+        if token:
+            self._finish(key, token, value)
+        return value
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        token, value = await self._join_async(key)
+        if value is not None:
+            return value
+        try:
+            value = await fn()
+        except BaseException:
+            if token:
+                await asyncio.to_thread(self._finish, key, token, _FAILED)
+            raise
+        if token:
+            await asyncio.to_thread(self._finish, key, token, value)
+        return value
+
+
+def singleflight_stats() -> dict[str, int]:
+    # coalescing counters across all processes, e.g. {"llm:coalesced": 12, ...}
+    try:
+        return {name: int(count) for name, count in redis_client.hgetall(STATS_KEY).items()}
+    except redis.RedisError:
+        return {}
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+
+import redis
+
+from backend.common.storage.redis_client import redis_client
+
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+# results are fresh for TTL; for STALE_SECONDS after that they are still served
+# while a background refresh fetches new ones
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(24 * 3600)))
+SEARCH_CACHE_STALE_SECONDS = int(os.getenv("SEARCH_CACHE_STALE_SECONDS", str(7 * 24 * 3600)))
+# at most one background refresh per key in this window
+SEARCH_CACHE_REFRESH_LOCK_SECONDS = int(os.getenv("SEARCH_CACHE_REFRESH_LOCK_SECONDS", "60"))
+
+
+class SearchCache:
+    """
+    Redis cache of web search results, keyed by normalized query + max_results.
+    get() returns (results, stale); the caller serves stale results right away
+    and refreshes them in the background (stale-while-revalidate).
+    Hit/miss counters are kept per process and summed across processes in Redis.
+    Redis errors count as misses and never fail a search.
+    """
+
+    STATS_KEY = "search_cache:stats"
+
+    def __init__(self, ttl: int = SEARCH_CACHE_TTL_SECONDS, stale_ttl: int = SEARCH_CACHE_STALE_SECONDS):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.redis = redis_client
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+        try:
+            self.redis.hincrby(self.STATS_KEY, name, 1)
+        except redis.RedisError:
+            pass
+
+    def get(self, key: str) -> tuple[list[dict] | None, bool]:
+        if not SEARCH_CACHE_ENABLED:
+            return None, False
+        try:
+            raw = self.redis.get(f"search_cache:{key}")
+        except redis.RedisError as e:
+            print(f"[SearchCache] get failed: {e}")
+            self._count("errors")
+            raw = None
+        if raw is None:
+            self._count("misses")
+            return None, False
+
+        entry = json.loads(raw)
+        stale = time.time() - entry["fetched_at"] > self.ttl
+        self._count("stale_hits" if stale else "hits")
+        return entry["results"], stale
+
+    def set(self, key: str, results: list[dict]) -> None:
+        if not SEARCH_CACHE_ENABLED:
+            return
+        entry = json.dumps({"fetched_at": time.time(), "results": results})
+        try:
+            self.redis.set(f"search_cache:{key}", entry, ex=self.ttl + self.stale_ttl)
+        except redis.RedisError as e:
+            print(f"[SearchCache] set failed: {e}")
+            self._count("errors")
+
+    def claim_refresh(self, key: str) -> bool:
+        # true for the one caller (across processes) that should refresh a stale key
+        try:
+            claimed = bool(self.redis.set(
+                f"search_cache:refresh:{key}", "1", nx=True, ex=SEARCH_CACHE_REFRESH_LOCK_SECONDS
+            ))
+        except redis.RedisError:
+            return False
+        if claimed:
+            self._count("refreshes")
+        return claimed
+
+    def metrics(self) -> dict:
+        # counters across all processes plus the hit rate (stale hits count as hits)
+        try:
+            counts = {name: int(value) for name, value in self.redis.hgetall(self.STATS_KEY).items()}
+        except redis.RedisError:
+            return {}
+        hits = counts.get("hits", 0) + counts.get("stale_hits", 0)
+        lookups = hits + counts.get("misses", 0)
+        return {**counts, "hit_rate": round(hits / lookups, 3) if lookups else None}
+
+
+search_cache = SearchCache()
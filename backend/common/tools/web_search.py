@@ -1,20 +1,107 @@
 from duckduckgo_search import DDGS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
 import logging
+import os
+import threading
+
+from backend.common.storage.circuit_breaker import CircuitBreaker, CircuitOpenError
+from backend.common.storage.singleflight import SingleFlight
+from backend.common.tools.search_cache import search_cache
 
 logger = logging.getLogger(__name__)
 
+# per-request HTTP timeout for one DuckDuckGo call, and the cap on a whole market search
+SEARCH_QUERY_TIMEOUT = int(os.getenv("SEARCH_QUERY_TIMEOUT", "5"))
+SEARCH_TOTAL_TIMEOUT = float(os.getenv("SEARCH_TOTAL_TIMEOUT", "12"))
+# concurrent searches per process (shared by all market jobs in the worker)
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "8"))
+# market search stops waiting once this many unique results are in
+SEARCH_TARGET_RESULTS = int(os.getenv("SEARCH_TARGET_RESULTS", "10"))
+
+# identical searches in flight across workers share one DuckDuckGo request
+SEARCH_SINGLEFLIGHT_TIMEOUT = float(os.getenv("SEARCH_SINGLEFLIGHT_TIMEOUT", "30"))
+search_singleflight = SingleFlight("search", lock_ttl=SEARCH_SINGLEFLIGHT_TIMEOUT)
+
+# while DuckDuckGo is failing, searches return no results immediately
+search_breaker = CircuitBreaker("duckduckgo", probe_timeout=SEARCH_SINGLEFLIGHT_TIMEOUT)
+
+def _search_key(query: str, max_results: int) -> str:
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(f"{normalized}|{max_results}".encode("utf-8")).hexdigest()
+
+_local = threading.local()
+
+def _session() -> DDGS:
+    # one DDGS (and its HTTP connection pool) per thread, reused across queries.
+    # DDGS paces its own requests, so it isn't shared between threads.
+    ddgs = getattr(_local, "ddgs", None)
+    if ddgs is None:
+        ddgs = _local.ddgs = DDGS(timeout=SEARCH_QUERY_TIMEOUT)
+    return ddgs
+
+def _ddg_text(query: str, max_results: int) -> list[dict]:
+    try:
+        return _session().text(query, max_results=max_results)
+    except Exception:
+        # start the next query on a fresh connection
+        _local.ddgs = None
+        raise
+
+_executor: ThreadPoolExecutor | None = None
+_executor_pid: int | None = None
+_executor_lock = threading.Lock()
+
+def _search_executor() -> ThreadPoolExecutor:
+    # created lazily and again after fork (prefork children don't inherit threads)
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="web-search")
+            _executor_pid = os.getpid()
+        return _executor
+
+def _search_ddg(query: str, max_results: int) -> list[dict]:
+    try:
+        return search_breaker.call(_ddg_text, query, max_results)
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping search for '{query}': {e}")
+        return []
+    except Exception as e:
+        logger.error(f"Search failed for query '{query}': {e}")
+        return []
+
+def _fetch(query: str, max_results: int, key: str) -> list[dict]:
+    # one DuckDuckGo round-trip per key across workers; the leader fills the cache.
+    # empty results (also what failures return) aren't cached.
+    def lead() -> str:
+        results = _search_ddg(query, max_results)
+        if results:
+            search_cache.set(key, results)
+        return json.dumps(results)
+
+    return json.loads(search_singleflight.do(key, lead))
+
+def _refresh(query: str, max_results: int, key: str) -> None:
+    try:
+        _fetch(query, max_results, key)
+    except Exception as e:
+        logger.warning(f"Background refresh failed for '{query}': {e}")
+
 def search_web(query: str, max_results: int = 5) -> list[dict]:
     """
     Searches the web using DuckDuckGo.
     Returns a list of results with 'title', 'href', and 'body'.
+    Cached results are returned immediately; stale ones are refreshed in the background.
     """
-    try:
-        with DDGS() as ddgs:
-            results = [r for r in ddgs.text(query, max_results=max_results)]
-            return results
-    except Exception as e:
-        logger.error(f"Search failed for query '{query}': {e}")
-        return []
+    key = _search_key(query, max_results)
+    cached, stale = search_cache.get(key)
+    if cached is not None:
+        if stale and search_cache.claim_refresh(key):
+            _search_executor().submit(_refresh, query, max_results, key)
+        return cached
+    return _fetch(query, max_results, key)
 
 def search_market_info(molecule: str) -> str:
     """
@@ -30,32 +117,38 @@ def search_market_info(molecule: str) -> str:
         f"'{molecule}' commercial launch and peak sales projections"
     ]
     
-    all_results = []
-    # Use context managers properly and implement simple retry logic
-    for q in queries:
-        try:
-            # Adding specialized filters like site focus (optional but powerful)
-            # e.g. "site:globenewswire.com" or "site:nature.com"
-            results = search_web(q, max_results=3)
-            if results:
-                all_results.extend(results)
-        except Exception as e:
-            logger.warning(f"Search query failed: {q}. Error: {e}")
-            continue
-    
-    # Deduplicate results based on URL
+    # run all queries concurrently; merge + dedupe by URL as they finish
+    futures = {_search_executor().submit(search_web, q, 3): q for q in queries}
     seen_urls = set()
     unique_results = []
-    for r in all_results:
-        url = r.get('href')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            unique_results.append(r)
+    try:
+        for future in as_completed(futures, timeout=SEARCH_TOTAL_TIMEOUT):
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.warning(f"Search query failed: {futures[future]}. Error: {e}")
+                continue
+            for r in results:
+                url = r.get('href')
+                if url and url not in seen_urls:
+                    seen_urls.add(url)
+                    unique_results.append(r)
+            if len(unique_results) >= SEARCH_TARGET_RESULTS:
+                break
+    except TimeoutError:
+        logger.warning(
+            f"Market search for '{molecule}' hit the {SEARCH_TOTAL_TIMEOUT}s limit, "
+            f"using {len(unique_results)} results"
+        )
+    finally:
+        # queued queries are dropped; running ones finish in the background
+        for future in futures:
+            future.cancel()
 
     # Format results with high signal-to-noise ratio
     formatted = "\n---\n".join([
         f"SOURCE: {r.get('href')}\nTITLE: {r.get('title')}\nCONTENT: {r.get('body')}"
-        for r in unique_results[:10]  # Limit to top 10 high-quality results
+        for r in unique_results[:SEARCH_TARGET_RESULTS]  # Limit to the top high-quality results
     ])
     
     if not formatted:
@@ -1,10 +1,10 @@
+import uuid
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 
 from .auth import verify_worker_token
 from backend.database import SessionLocal
-from backend.common.schemas.worker_envelope import WorkerEnvelope
-from backend.master_agent.models.worker_response import WorkerResponse
+from backend.master_agent.orchestration.conductor import handle_task_result
 
 
 router = APIRouter()
@@ -22,27 +22,8 @@ def get_db():
 )
 async def worker_callback(task_id: str, request: Request, db: Session = Depends(get_db)):
     body = await request.json()
-    envelope = WorkerEnvelope(**body)
 
-    # convert typed models to JSON-safe dicts
-    sources_json = [s.model_dump(mode="json") for s in envelope.sources]
-
-    db_row = WorkerResponse(
-        task_id=envelope.task_id,
-        job_id=envelope.job_id,
-        worker=envelope.worker,
-        status=envelope.status,
-        confidence=envelope.confidence,
-        timestamp=envelope.timestamp,
-        outputs=envelope.outputs,
-        sources=sources_json,
-        notes=envelope.notes,
-        raw_envelope=body,
-    )
-
-    db.add(db_row)
-    db.commit()
-    db.refresh(db_row)
-
-    return {"status": "stored", "task_id": str(envelope.task_id)}
+    # record the envelope and advance the job's task graph
+    recorded = handle_task_result(db, uuid.UUID(task_id), body)
 
+    return {"status": "stored" if recorded else "ignored", "task_id": task_id}
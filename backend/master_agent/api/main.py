@@ -13,6 +13,7 @@ from backend.master_agent.models.base import Base
 from backend.master_agent.models import job
 from backend.master_agent.models import task
 from backend.master_agent.models import worker_response
+from backend.master_agent.models import llm_cache
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
@@ -64,6 +65,18 @@ async def debug_middleware(request: Request, call_next):
 app.include_router(research_router)
 app.include_router(internal_router)
 
+from backend.common.llm.inference import llm_breaker
+from backend.common.storage.minio_client import minio_breaker
+from backend.common.tools.search_cache import search_cache
+from backend.common.tools.web_search import search_breaker
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    # breaker state is shared in redis, so this reflects what the workers see
+    breakers = {b.name: b.state() for b in (llm_breaker, search_breaker, minio_breaker)}
+    degraded = any(b["state"] != "closed" for b in breakers.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "circuit_breakers": breakers,
+        "search_cache": search_cache.metrics()
+    }
@@ -1,4 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import uuid
+from datetime import datetime, timedelta, UTC
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse, ORJSONResponse
 import uuid6
 from sqlalchemy.orm import Session
@@ -6,14 +11,19 @@ from sqlalchemy.orm import Session
 from .auth import verify_api_key
 from backend.database import SessionLocal
 from backend.master_agent.models.job import Job
-from backend.common.schemas.api_requests import ResearchRequest
+from backend.common.schemas.api_requests import ResearchRequest, BatchResearchRequest
+from backend.master_agent.orchestration.batch import create_batch, release_bulk_jobs, batch_progress
+from backend.master_agent.orchestration.admission import evaluate as evaluate_admission
+from backend.master_agent.synthesis.progress import read_progress
 
 
-from backend.master_agent.orchestration.conductor import run_research_workflow
+from backend.master_agent.orchestration.conductor import run_research_workflow, enforce_deadline, cancel_job
 
 
 router = APIRouter()
 
+RESUMABLE_STATES = ("failed", "cancelled", "timed_out")
+
 def get_db():
     db = SessionLocal()
 
@@ -25,9 +35,21 @@ def get_db():
 @router.post("/api/research", dependencies=[Depends(verify_api_key)])
 async def create_research_job(
     request: ResearchRequest,
+    defer: bool = False,
     db: Session = Depends(get_db)
 ):
     import traceback
+
+    # admission control: reject (or defer, if asked) when the system is saturated
+    admission = evaluate_admission(db)
+    if not admission.admitted and not defer:
+        print(f"Rejecting job for {request.molecule}: {admission.reason}")
+        raise HTTPException(
+            status_code=admission.status_code,
+            detail=f"Server busy ({admission.reason}). Retry later.",
+            headers={"Retry-After": str(admission.retry_after)}
+        )
+
     try:
         print(f"Creating job for {request.molecule}...")
         job = Job(
@@ -35,17 +57,36 @@ async def create_research_job(
             prompt_original=request.prompt,
             prompt_normalized=request.prompt,
             molecule=request.molecule,
-            status="queued"
+            user_id=request.user_id,
+            lane="interactive",
+            status="queued" if admission.admitted else "deferred",
+            deadline_at=(
+                datetime.now(UTC) + timedelta(seconds=request.deadline_seconds)
+                if request.deadline_seconds else None
+            )
         )
 
         db.add(job)
         db.commit()
         db.refresh(job)
 
+        if not admission.admitted:
+            # started by release_deferred_jobs once capacity frees up
+            print(f"Deferred job {job.id}: {admission.reason}")
+            if request.deadline_seconds:
+                enforce_deadline.apply_async((str(job.id),), countdown=request.deadline_seconds)
+            return ORJSONResponse(
+                status_code=202,
+                content={"job_id": str(job.id), "status": job.status, "retry_after": admission.retry_after},
+                headers={"Retry-After": str(admission.retry_after)}
+            )
+
         # Trigger workflow
         print(f"Triggering workflow for {job.id}...")
         print(f"DEBUG: Celery Broker URL: {run_research_workflow.app.conf.broker_url}")
         run_research_workflow.delay(str(job.id), request.molecule)
+        if request.deadline_seconds:
+            enforce_deadline.apply_async((str(job.id),), countdown=request.deadline_seconds)
         print("Workflow triggered.")
 
         return {"job_id": str(job.id)}
@@ -57,6 +98,55 @@ async def create_research_job(
             content={"error": str(e), "traceback": traceback.format_exc()}
         )
 
+def _submit_batch(db: Session, prompt: str, molecules: list[str], user_id: int | None = None) -> dict:
+    # batch jobs run in the bulk lane, released fair-share across users
+    if not molecules:
+        raise HTTPException(400, "Batch contains no molecules")
+
+    batch_id, mapping = create_batch(db, prompt, molecules, user_id=user_id)
+    release_bulk_jobs(db)
+
+    return {
+        "batch_id": str(batch_id),
+        "submitted": len(mapping),
+        "unique_jobs": len(set(mapping.values())),
+        "jobs": [{"molecule": m, "job_id": str(j)} for m, j in mapping.items()]
+    }
+
+@router.post("/api/research/batch", dependencies=[Depends(verify_api_key)])
+async def create_research_batch(
+    request: BatchResearchRequest,
+    db: Session = Depends(get_db)
+):
+    return _submit_batch(db, request.prompt, request.molecules, request.user_id)
+
+@router.post("/api/research/batch/upload", dependencies=[Depends(verify_api_key)])
+async def upload_research_batch(
+    prompt: str = Form(...),
+    file: UploadFile = File(...),
+    user_id: int | None = Form(None),
+    db: Session = Depends(get_db)
+):
+    # CSV with a "molecule" column, or one molecule per row in the first column
+    text = (await file.read()).decode("utf-8-sig")
+    rows = [r for r in csv.reader(io.StringIO(text)) if r and r[0].strip()]
+
+    column = 0
+    if rows and any(c.strip().lower() == "molecule" for c in rows[0]):
+        column = [c.strip().lower() for c in rows[0]].index("molecule")
+        rows = rows[1:]
+
+    molecules = [r[column] for r in rows if len(r) > column and r[column].strip()]
+    return _submit_batch(db, prompt, molecules, user_id)
+
+@router.get("/api/research/batch/{batch_id}", dependencies=[Depends(verify_api_key)])
+async def get_research_batch(batch_id: uuid.UUID, db: Session = Depends(get_db)):
+    progress = batch_progress(db, batch_id)
+
+    if not progress["total"]:
+        raise HTTPException(404, "Batch not found")
+    return progress
+
 @router.get("/api/research/{job_id}/status", dependencies=[Depends(verify_api_key)])
 async def get_research_status(job_id: str, db: Session = Depends(get_db)):
     job = db.query(Job).filter(Job.id == job_id).first()
@@ -67,9 +157,93 @@ async def get_research_status(job_id: str, db: Session = Depends(get_db)):
         "job_id": str(job.id),
         "status": job.status,
         "canonical_result": job.canonical_result,
+        # synthesis fields finished so far, while the job is still running
+        "synthesis_progress": read_progress(job.id) if job.status == "running" else {},
         "created_at": job.created_at
     }
 
+@router.post("/api/research/{job_id}/resume", dependencies=[Depends(verify_api_key)])
+async def resume_research_job(
+    job_id: str,
+    deadline_seconds: int | None = None,
+    defer: bool = False,
+    db: Session = Depends(get_db)
+):
+    # re-run only the stages of a stopped job that have no checkpointed envelope.
+    # the old deadline is dropped; pass deadline_seconds to set a new one.
+    # goes through the same admission control as POST /api/research.
+    if deadline_seconds is not None and deadline_seconds <= 0:
+        raise HTTPException(400, "deadline_seconds must be positive")
+
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    status = "queued"
+    admission = None
+    if job.lane != "bulk":
+        admission = evaluate_admission(db)
+        if not admission.admitted and not defer:
+            print(f"Rejecting resume of {job.id}: {admission.reason}")
+            raise HTTPException(
+                status_code=admission.status_code,
+                detail=f"Server busy ({admission.reason}). Retry later.",
+                headers={"Retry-After": str(admission.retry_after)}
+            )
+        if not admission.admitted:
+            # started by release_deferred_jobs once capacity frees up
+            status = "deferred"
+
+    # check and claim in one statement, so concurrent resumes can't both start the job
+    resumed = (
+        db.query(Job)
+        .filter(Job.id == job.id, Job.status.in_(RESUMABLE_STATES))
+        .update(
+            {
+                "status": status,
+                "deadline_at": (
+                    datetime.now(UTC) + timedelta(seconds=deadline_seconds)
+                    if deadline_seconds else None
+                )
+            },
+            synchronize_session=False
+        )
+    )
+    db.commit()
+    db.refresh(job)
+    if not resumed:
+        raise HTTPException(409, f"Only failed or cancelled jobs can be resumed (status: {job.status})")
+
+    if deadline_seconds:
+        enforce_deadline.apply_async((str(job.id),), countdown=deadline_seconds)
+
+    if job.lane == "bulk":
+        # queued bulk jobs wait for a free bulk slot like the rest of their batch
+        release_bulk_jobs(db)
+    elif status == "deferred":
+        print(f"Deferred resume of {job.id}: {admission.reason}")
+        return ORJSONResponse(
+            status_code=202,
+            content={"job_id": str(job.id), "status": status, "retry_after": admission.retry_after},
+            headers={"Retry-After": str(admission.retry_after)}
+        )
+    else:
+        run_research_workflow.delay(str(job.id), job.molecule)
+
+    return {"job_id": str(job.id), "status": status}
+
+@router.delete("/api/research/{job_id}", dependencies=[Depends(verify_api_key)])
+async def cancel_research_job(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    # stop a queued or running job and revoke its in-flight tasks
+    job = db.query(Job).filter(Job.id == job_id).first()
+
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if not cancel_job(db, job_id):
+        raise HTTPException(409, f"Job already finished (status: {job.status})")
+
+    return {"job_id": str(job_id), "status": "cancelled"}
+
 @router.get("/api/jobs", dependencies=[Depends(verify_api_key)])
 async def get_all_jobs(db: Session = Depends(get_db)):
     # Fetch all jobs, ordered by creation time descending
@@ -86,7 +260,8 @@ async def get_all_jobs(db: Session = Depends(get_db)):
     ]
 
 from fastapi.responses import StreamingResponse
-from backend.common.storage.minio_client import minio_client
+from backend.common.storage.circuit_breaker import CircuitOpenError
+from backend.common.storage.minio_client import get_object
 
 @router.get("/api/research/{job_id}/download/{file_type}")
 async def download_artifact(job_id: str, file_type: str):
@@ -99,12 +274,14 @@ async def download_artifact(job_id: str, file_type: str):
     
     try:
         # Proxy stream from MinIO
-        data_stream = minio_client.get_object("artifacts", object_name)
+        data_stream = get_object("artifacts", object_name)
         return StreamingResponse(
             data_stream,
             media_type=content_type,
             headers={"Content-Disposition": f'attachment; filename="{object_name}"'}
         )
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Artifact storage unavailable: {e}")
     except Exception as e:
         print(f"Download error: {e}")
         raise HTTPException(status_code=404, detail="Artifact not found. Research might still be processing.")
\ No newline at end of file
@@ -20,6 +20,11 @@ class Job(Base):
     )
 
     user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    batch_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        index=True
+    )
 
     prompt_original: Mapped[str] = mapped_column(String, nullable=False)
     prompt_normalized: Mapped[str] = mapped_column(String, nullable=False)
@@ -27,6 +32,13 @@ class Job(Base):
     molecule: Mapped[str | None] = mapped_column(String, nullable=True)
     indications_requested: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
 
+    lane: Mapped[str] = mapped_column(
+        String,
+        server_default=text("'interactive'"),
+        default="interactive",
+        nullable=False
+    )
+
     status: Mapped[str] = mapped_column(
         String, 
         server_default=text("'queued'"), 
@@ -54,6 +66,11 @@ class Job(Base):
         nullable=True
     )
 
+    deadline_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
     synthesis_version: Mapped[str | None] = mapped_column(String, nullable=True)
     data_completeness_score: Mapped[float | None] = mapped_column(Float, nullable=True)
     confidence_overall: Mapped[float | None] = mapped_column(Float, nullable=True)
\ No newline at end of file
@@ -30,6 +30,7 @@ class LLMCall(Base):
     prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
     response: Mapped[str] = mapped_column(Text, nullable=False)
     response_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True) # provider call only; null for older rows
     
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
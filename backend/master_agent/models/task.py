@@ -51,4 +51,11 @@ class Task(Base):
         nullable=True
     )
 
-    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
\ No newline at end of file
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # celery task id of the current dispatch attempt. new on every dispatch, since
+    # workers drop ids they have seen revoked (cancel) or expired (deadline)
+    celery_task_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True
+    )
\ No newline at end of file
@@ -0,0 +1,133 @@
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+
+import redis
+from sqlalchemy.orm import Session
+
+from backend.celery_app import celery_app
+from backend.master_agent.models.job import Job
+from backend.master_agent.orchestration.batch import IN_FLIGHT_STATES
+from backend.master_agent.orchestration.task_graph import RESEARCH_GRAPH
+
+
+# thresholds for interactive submissions
+ADMISSION_MAX_QUEUE_DEPTH = int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "500"))
+ADMISSION_MAX_RUNNING_JOBS = int(os.getenv("ADMISSION_MAX_RUNNING_JOBS", "50"))
+ADMISSION_THROUGHPUT_WINDOW = timedelta(minutes=int(os.getenv("ADMISSION_THROUGHPUT_WINDOW_MINUTES", "15")))
+ADMISSION_DEFAULT_RETRY_AFTER = int(os.getenv("ADMISSION_DEFAULT_RETRY_AFTER", "60"))
+ADMISSION_MAX_RETRY_AFTER = 3600
+
+# interactive-lane queues whose backlog blocks new interactive jobs
+ADMISSION_QUEUES = ("orchestrator", "llm", "report")
+
+# kombu's redis transport keeps one list per priority step: "<queue>" and "<queue>\x06\x16<n>"
+_PRIORITY_SUFFIXES = ("", "\x06\x163", "\x06\x166", "\x06\x169")
+
+CONDUCTOR_TASK = "orchestration.conductor.run_research_workflow"
+
+_broker = redis.Redis.from_url(celery_app.conf.broker_url)
+
+
+@dataclass
+class AdmissionDecision:
+    admitted: bool
+    status_code: int = 200
+    retry_after: int = 0
+    reason: str | None = None
+
+
+def broker_queue_depth() -> int:
+    # messages waiting (not yet reserved by a worker) across the admission queues
+    pipe = _broker.pipeline()
+    for queue in ADMISSION_QUEUES:
+        for suffix in _PRIORITY_SUFFIXES:
+            pipe.llen(f"{queue}{suffix}")
+    return sum(pipe.execute())
+
+
+def running_jobs(db: Session) -> int:
+    return (
+        db.query(Job)
+        .filter(Job.lane == "interactive", Job.status.in_(IN_FLIGHT_STATES))
+        .count()
+    )
+
+
+def throughput_per_second(db: Session) -> float:
+    # jobs finished per second over the recent window
+    since = datetime.now(UTC) - ADMISSION_THROUGHPUT_WINDOW
+    completed = (
+        db.query(Job)
+        .filter(Job.status == "completed", Job.completed_at >= since)
+        .count()
+    )
+    return completed / ADMISSION_THROUGHPUT_WINDOW.total_seconds()
+
+
+def _retry_after(excess_jobs: float, throughput: float) -> int:
+    # time for the observed throughput to drain the excess
+    if throughput <= 0:
+        return ADMISSION_DEFAULT_RETRY_AFTER
+    return max(1, min(ADMISSION_MAX_RETRY_AFTER, math.ceil(excess_jobs / throughput)))
+
+
+def evaluate(db: Session) -> AdmissionDecision:
+    """
+    Decide whether a new interactive job can start now.
+    - broker unreachable          -> 503
+    - broker backlog too deep     -> 503 (system overloaded)
+    - too many jobs already running -> 429
+    """
+    try:
+        depth = broker_queue_depth()
+    except redis.RedisError as e:
+        return AdmissionDecision(False, 503, ADMISSION_DEFAULT_RETRY_AFTER, f"broker unavailable: {e}")
+
+    running = running_jobs(db)
+    if depth < ADMISSION_MAX_QUEUE_DEPTH and running < ADMISSION_MAX_RUNNING_JOBS:
+        return AdmissionDecision(True)
+
+    throughput = throughput_per_second(db)
+    if depth >= ADMISSION_MAX_QUEUE_DEPTH:
+        # queue depth counts stage tasks; convert to jobs
+        excess = (depth - ADMISSION_MAX_QUEUE_DEPTH + 1) / len(RESEARCH_GRAPH)
+        return AdmissionDecision(
+            False, 503, _retry_after(excess, throughput),
+            f"queue backlog {depth} >= {ADMISSION_MAX_QUEUE_DEPTH}"
+        )
+
+    excess = running - ADMISSION_MAX_RUNNING_JOBS + 1
+    return AdmissionDecision(
+        False, 429, _retry_after(excess, throughput),
+        f"{running} jobs running >= {ADMISSION_MAX_RUNNING_JOBS}"
+    )
+
+
+def release_deferred_jobs(db: Session) -> int:
+    """
+    Start deferred interactive jobs, oldest first, while admission allows.
+    Called whenever an interactive job finishes, and periodically by the
+    release_waiting_jobs beat task. Returns the number dispatched.
+    """
+    released = 0
+    while evaluate(db).admitted:
+        job = (
+            db.query(Job)
+            .filter(Job.lane == "interactive", Job.status == "deferred")
+            .order_by(Job.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if not job:
+            break
+        job.status = "dispatched"
+        db.commit()
+
+        celery_app.send_task(CONDUCTOR_TASK, args=(str(job.id), job.molecule))
+        released += 1
+
+    if released:
+        print(f"[Admission] Released {released} deferred jobs")
+    return released
@@ -0,0 +1,153 @@
+import os
+import uuid
+from collections import Counter, defaultdict
+
+import uuid6
+from sqlalchemy import insert, func, select
+from sqlalchemy.orm import Session
+
+from backend.celery_app import celery_app
+from backend.master_agent.models.job import Job
+
+
+# max bulk-lane jobs running at the same time across all users; the rest wait
+# as "queued" and are released fair-share by user as slots free up
+BULK_MAX_IN_FLIGHT = int(os.getenv("BULK_MAX_IN_FLIGHT", "10"))
+
+CONDUCTOR_TASK = "orchestration.conductor.run_research_workflow"
+
+# pg advisory lock serializing release_bulk_jobs across processes ("bulk")
+BULK_RELEASE_LOCK_ID = 0x62756C6B
+
+IN_FLIGHT_STATES = ("dispatched", "running", "generating_report")
+TERMINAL_STATES = ("completed", "failed", "cancelled", "timed_out")
+
+
+def normalize_molecule(molecule: str) -> str:
+    # dedupe key: "Aspirin ", "aspirin" and "ASPIRIN" are the same work
+    return " ".join(molecule.split()).casefold()
+
+
+def create_batch(
+        db: Session,
+        prompt: str,
+        molecules: list[str],
+        user_id: int | None = None
+) -> tuple[uuid.UUID, dict[str, uuid.UUID]]:
+    """
+    Create one Job per unique molecule in a single bulk insert.
+    Returns the batch id and a mapping of every submitted molecule to its job id
+    (duplicates share a job).
+    """
+    batch_id = uuid6.uuid7()
+    jobs_by_key: dict[str, uuid.UUID] = {}
+    rows = []
+
+    for molecule in molecules:
+        key = normalize_molecule(molecule)
+        if not key or key in jobs_by_key:
+            continue
+        jobs_by_key[key] = uuid6.uuid7()
+        rows.append({
+            "id": jobs_by_key[key],
+            "batch_id": batch_id,
+            "user_id": user_id,
+            "lane": "bulk",
+            "prompt_original": prompt,
+            "prompt_normalized": prompt,
+            "molecule": molecule.strip(),
+            "status": "queued",
+        })
+
+    if rows:
+        db.execute(insert(Job), rows)
+        db.commit()
+
+    mapping = {
+        m: jobs_by_key[normalize_molecule(m)]
+        for m in molecules if normalize_molecule(m)
+    }
+    return batch_id, mapping
+
+
+def release_bulk_jobs(db: Session) -> int:
+    """
+    Bounded, per-user fair-share fan-out for the bulk lane.
+    Fills free slots (BULK_MAX_IN_FLIGHT minus running bulk jobs) one job at a
+    time, always from the user with the fewest bulk jobs in flight, so one
+    large sweep cannot starve other users' batches. Called on batch
+    submission and whenever a bulk job finishes. Returns the number of jobs dispatched.
+    Releases are serialized with a transaction-scoped advisory lock, so concurrent
+    callers can't both fill the same free slots.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(BULK_RELEASE_LOCK_ID)))
+    running = (
+        db.query(Job.user_id)
+        .filter(Job.lane == "bulk", Job.status.in_(IN_FLIGHT_STATES))
+        .all()
+    )
+    slots = BULK_MAX_IN_FLIGHT - len(running)
+    if slots <= 0:
+        db.commit()  # releases the advisory lock
+        return 0
+
+    # each user's oldest queued jobs; no user can need more than `slots` of them
+    ranked = (
+        db.query(
+            Job.id,
+            func.row_number().over(partition_by=Job.user_id, order_by=Job.id).label("rank")
+        )
+        .filter(Job.lane == "bulk", Job.status == "queued")
+        .subquery()
+    )
+    queued = (
+        db.query(Job)
+        .join(ranked, Job.id == ranked.c.id)
+        .filter(ranked.c.rank <= slots)
+        .order_by(Job.id)
+        .with_for_update(of=Job, skip_locked=True)
+        .all()
+    )
+    by_user: dict[int | None, list[Job]] = defaultdict(list)
+    for job in queued:
+        by_user[job.user_id].append(job)
+
+    in_flight = Counter(r.user_id for r in running)
+    picked = []
+    while len(picked) < slots and any(by_user.values()):
+        # fewest in flight first, ties broken by who has waited longest
+        user = min(
+            (u for u, jobs in by_user.items() if jobs),
+            key=lambda u: (in_flight[u], by_user[u][0].id)
+        )
+        picked.append(by_user[user].pop(0))
+        in_flight[user] += 1
+
+    for job in picked:
+        job.status = "dispatched"
+    db.commit()
+
+    for job in picked:
+        celery_app.send_task(CONDUCTOR_TASK, args=(str(job.id), job.molecule))
+
+    if picked:
+        print(f"[Batch] Dispatched {len(picked)} bulk jobs")
+    return len(picked)
+
+
+def batch_progress(db: Session, batch_id: uuid.UUID) -> dict:
+    # aggregated progress across every job of a batch
+    jobs = db.query(Job.id, Job.molecule, Job.status).filter(Job.batch_id == batch_id).all()
+    counts = Counter(j.status for j in jobs)
+    done = sum(counts[s] for s in TERMINAL_STATES)
+
+    return {
+        "batch_id": str(batch_id),
+        "total": len(jobs),
+        "status_counts": dict(counts),
+        "progress": done / len(jobs) if jobs else 0.0,
+        "jobs": [
+            {"job_id": str(j.id), "molecule": j.molecule, "status": j.status}
+            for j in jobs
+        ]
+    }
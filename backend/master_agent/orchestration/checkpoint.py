@@ -0,0 +1,66 @@
+import uuid
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from backend.common.schemas.worker_envelope import WorkerEnvelope
+from backend.master_agent.models.task import Task
+from backend.master_agent.models.worker_response import WorkerResponse
+
+
+def save_envelope(db: Session, body: dict[str, Any]) -> WorkerResponse:
+    # checkpoint a stage's WorkerEnvelope into worker_responses. caller commits.
+    envelope = WorkerEnvelope(**body)
+
+    # convert typed models to JSON-safe dicts
+    sources_json = [s.model_dump(mode="json") for s in envelope.sources]
+
+    db_row = WorkerResponse(
+        task_id=envelope.task_id,
+        job_id=envelope.job_id,
+        worker=envelope.worker,
+        status=envelope.status,
+        confidence=envelope.confidence,
+        timestamp=envelope.timestamp,
+        outputs=envelope.outputs,
+        sources=sources_json,
+        notes=envelope.notes,
+        raw_envelope=envelope.model_dump(mode="json"),
+    )
+
+    db.add(db_row)
+    return db_row
+
+
+def load_outputs(db: Session, task_ids: list[uuid.UUID]) -> dict[uuid.UUID, dict]:
+    # latest successful outputs per task, for feeding downstream stages
+    rows = (
+        db.query(WorkerResponse)
+        .filter(WorkerResponse.task_id.in_(task_ids), WorkerResponse.status == "ok")
+        .order_by(WorkerResponse.created_at)
+        .all()
+    )
+    return {row.task_id: row.outputs for row in rows}
+
+
+def reset_incomplete_tasks(db: Session, job_id: uuid.UUID) -> list[Task]:
+    """
+    Prepare a job's task graph for resume: completed tasks that have a
+    checkpointed envelope are kept, everything else goes back to pending.
+    Returns the tasks that will be re-run. Caller commits.
+    """
+    tasks = db.query(Task).filter(Task.job_id == job_id).all()
+    checkpointed = load_outputs(db, [t.id for t in tasks])
+
+    rerun = []
+    for task in tasks:
+        if task.status == "completed" and task.id in checkpointed:
+            continue
+        task.status = "pending"
+        task.retries = 0
+        task.started_at = None
+        task.finished_at = None
+        task.error_message = None
+        rerun.append(task)
+
+    return rerun
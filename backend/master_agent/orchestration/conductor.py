@@ -1,20 +1,16 @@
 from backend.celery_app import celery_app
 import uuid
-import uuid6
 from datetime import datetime, UTC
 from sqlalchemy.orm import Session
 
 from backend.database import SessionLocal
 from backend.master_agent.models.job import Job
-from backend.workers.market_worker.worker import run_market_worker
-# NEW: Import other workers
-from backend.workers.clinical_trials.worker import run_clinical_trials_worker
-from backend.workers.patent_worker.worker import run_patent_worker
-from backend.workers.report.worker import run_report_worker
-from backend.master_agent.synthesis.engine import run_synthesis
-
-from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
-from backend.common.schemas.canonical_result import CanonicalResult, PatentOutputs
+from backend.master_agent.models.task import Task
+from backend.master_agent.orchestration.task_graph import build_task_graph, create_tasks
+from backend.master_agent.orchestration.scheduler import run_scheduler, record_result, record_failure
+from backend.master_agent.orchestration.checkpoint import reset_incomplete_tasks
+from backend.master_agent.orchestration.batch import release_bulk_jobs, TERMINAL_STATES as JOB_TERMINAL_STATES
+from backend.master_agent.orchestration.admission import release_deferred_jobs
 
 def _update_job_status(job_id: uuid.UUID, status: str, result: dict | None = None):
     db: Session = SessionLocal()
@@ -30,80 +26,205 @@ def _update_job_status(job_id: uuid.UUID, status: str, result: dict | None = Non
     finally:
         db.close()
 
+def _on_task_complete(task: Task, envelope: dict):
+    # job-level side effects of individual graph nodes finishing
+    if task.worker_type == "synthesis":
+        print(f"[Conductor] Synthesis Complete. Confidence: {envelope['outputs'].get('confidence_overall')}")
+        _update_job_status(task.job_id, "generating_report", result=envelope["outputs"])
+    elif task.worker_type == "report":
+        print("[Conductor] Report Generation Complete.")
+
+def _release_capacity(db: Session, job_id: uuid.UUID):
+    # a job finished: start the next waiting job of the same lane
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        return
+    if job.lane == "bulk":
+        release_bulk_jobs(db)
+    else:
+        release_deferred_jobs(db)
+
+def _advance(db: Session, job_id: uuid.UUID) -> str:
+    # dispatch whatever became ready and close out the job once the graph is done
+    state = run_scheduler(db, job_id)
+    if state == "completed":
+        _update_job_status(job_id, "completed")
+        print(f"[Conductor] Job {job_id} Finished Successfully.")
+    elif state == "failed":
+        for t in db.query(Task).filter(Task.job_id == job_id, Task.status != "completed"):
+            print(f"[Conductor] Stage '{t.worker_type}' did not complete: {t.error_message}")
+        _update_job_status(job_id, "failed")
+        print(f"[Conductor] Job {job_id} Failed.")
+
+    if state not in ("running", "cancelled"):
+        _release_capacity(db, job_id)
+    return state
+
+def cancel_job(db: Session, job_id: uuid.UUID, status: str = "cancelled") -> bool:
+    """
+    Stop a job: mark it cancelled / timed_out, cancel its unfinished tasks and
+    revoke (terminating where the pool supports it) their celery tasks.
+    Returns False if the job does not exist or already finished.
+    """
+    job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+    if not job or job.status in JOB_TERMINAL_STATES:
+        db.rollback()
+        return False
+
+    tasks = (
+        db.query(Task)
+        .filter(Task.job_id == job_id, Task.status.in_(("pending", "running")))
+        .with_for_update()
+        .all()
+    )
+    running = [str(t.celery_task_id or t.id) for t in tasks if t.status == "running"]
+    for task in tasks:
+        task.status = "cancelled"
+        task.finished_at = datetime.now(UTC)
+        task.error_message = f"job {status}"
+
+    job.status = status
+    db.commit()
+
+    if running:
+        celery_app.control.revoke(running, terminate=True)
+    print(f"[Conductor] Job {job_id} {status}. Revoked: {', '.join(running) or 'nothing'}")
+
+    _release_capacity(db, job_id)
+    return True
+
+def _running_task(db: Session, task_id: uuid.UUID, attempt_id: uuid.UUID | None) -> Task | None:
+    # the task, locked, if it is still running the given dispatch attempt.
+    # callbacks from an earlier attempt (before a cancel / resume) don't match.
+    query = db.query(Task).filter(Task.id == task_id)
+    if attempt_id is not None:
+        query = query.filter(Task.celery_task_id == attempt_id)
+    task = query.with_for_update().first()
+    if not task or task.status != "running":
+        db.rollback()
+        return None
+    return task
+
+def handle_task_result(db: Session, task_id: uuid.UUID, envelope: dict, attempt_id: uuid.UUID | None = None) -> bool:
+    """
+    Record a finished task's envelope and advance its job.
+    Shared by the celery success callback and /internal/task/{task_id}/complete.
+    Returns False if the task was not awaiting a result (duplicate delivery).
+    """
+    task = _running_task(db, task_id, attempt_id)
+    if not task:
+        return False
+
+    ok = record_result(db, task, envelope)
+    db.commit()
+    if ok:
+        _on_task_complete(task, envelope)
+
+    _advance(db, task.job_id)
+    return True
+
+def handle_task_failure(db: Session, task_id: uuid.UUID, message: str, attempt_id: uuid.UUID | None = None) -> bool:
+    # a dispatched task raised instead of returning an envelope
+    task = _running_task(db, task_id, attempt_id)
+    if not task:
+        return False
+
+    record_failure(task, message)
+    db.commit()
+
+    _advance(db, task.job_id)
+    return True
+
 @celery_app.task(name="orchestration.conductor.run_research_workflow")
 def run_research_workflow(job_id_str: str, molecule: str):
     """
     The Main Conductor.
-    Executes the Prototype Flow: Clinical -> Patent -> Market -> Synthesis -> Report
+    Builds the job's task graph (see task_graph.RESEARCH_GRAPH), persists one Task
+    row per stage and dispatches the stages that are ready, then returns.
+    The job is advanced by on_task_success / on_task_failure as each stage
+    finishes, so no worker slot is held while stages run.
+
+    If the job already has a task graph (resume), stages with a checkpointed
+    envelope are kept and only the missing stages are re-run.
     """
     print(f"[Conductor] Starting Job {job_id_str} for {molecule}")
     job_uuid = uuid.UUID(job_id_str)
-    
-    # 1. Update Status
-    _update_job_status(job_uuid, "running")
 
+    db: Session = SessionLocal()
     try:
-        # 2. Run Clinical Trials Worker
-        print("[Conductor] Running Clinical Trials Worker...")
-        ct_task_id = str(uuid6.uuid7())
-        ct_result_raw = run_clinical_trials_worker(
-            job_id=job_id_str,
-            task_id=ct_task_id,
-            params={"molecule": molecule}
-        )
-        ct_outputs = ClinicalTrialsOutputs.model_validate(ct_result_raw["outputs"])
-        print(f"[Conductor] Clinical Trials Found: {len(ct_outputs.trials)}")
-
-        # 3. NEW: Run Patent Worker
-        print("[Conductor] Running Patent Worker...")
-        pat_task_id = str(uuid6.uuid7())
-        pat_result_raw = run_patent_worker(
-            job_id=job_id_str,
-            task_id=pat_task_id,
-            params={"molecule": molecule}
-        )
-        pat_outputs = PatentOutputs.model_validate(pat_result_raw["outputs"])
-        print(f"[Conductor] Patents Found: {len(pat_outputs.patents)}")
-
-        # 4. Run Market Intelligence Worker
-        print("[Conductor] Running Market Intelligence Worker...")
-        market_task_id = str(uuid6.uuid7())
-        market_result_raw = run_market_worker(
-            job_id=job_id_str,
-            task_id=market_task_id,
-            params={"molecule": molecule}
-        )
-        market_outputs = MarketIntelligenceOutputs.model_validate(market_result_raw["outputs"])
-
-        # 5. Run Synthesis (LLM)
-        print("[Conductor] Running Synthesis Engine...")
-        canonical_result: CanonicalResult = run_synthesis(
-            job_id=job_uuid,
-            molecule=molecule,
-            ct_outputs=ct_outputs,
-            pat_outputs=pat_outputs, # Pass Patent Data
-            market_outputs=market_outputs
-        )
-        print(f"[Conductor] Synthesis Complete. Confidence: {canonical_result.confidence_overall}")
-
-        # 6. Save Synthesis Result to DB
-        _update_job_status(job_uuid, "generating_report", result=canonical_result.model_dump())
-
-        # 7. Run Report Worker
-        print("[Conductor] Generating PDF/PPT artifacts...")
-        rep_task_id = str(uuid6.uuid7())
-        rep_result_raw = run_report_worker(
-            job_id=job_id_str,
-            task_id=rep_task_id,
-            params={"canonical_result": canonical_result.model_dump()}
-        )
-        print("[Conductor] Report Generation Complete.")
+        # 1. Update Status (unless the job was cancelled while queued)
+        job = db.query(Job).filter(Job.id == job_uuid).first()
+        if job and job.status in JOB_TERMINAL_STATES:
+            print(f"[Conductor] Job {job_id_str} is {job.status}, not starting.")
+            return
+        _update_job_status(job_uuid, "running")
 
-        # 8. Final Completion
-        _update_job_status(job_uuid, "completed")
-        print(f"[Conductor] Job {job_id_str} Finished Successfully.")
+        # 2. Persist the task graph, or reuse it when resuming
+        if db.query(Task).filter(Task.job_id == job_uuid).count():
+            rerun = reset_incomplete_tasks(db, job_uuid)
+            db.commit()
+            print(f"[Conductor] Resuming Job. Re-running: {', '.join(t.worker_type for t in rerun) or 'nothing'}")
+        else:
+            tasks = create_tasks(db, build_task_graph(job_uuid, molecule))
+            print(f"[Conductor] Task graph: {', '.join(t.worker_type for t in tasks)}")
+
+        # 3. Dispatch the root stages
+        _advance(db, job_uuid)
 
     except Exception as e:
         print(f"[Conductor] Job Failed: {e}")
+        db.rollback()
         _update_job_status(job_uuid, "failed")
+        try:
+            _release_capacity(db, job_uuid)
+        except Exception as release_error:
+            # the beat sweep picks the waiting jobs up later
+            print(f"[Conductor] Could not release capacity: {release_error}")
         raise e
+    finally:
+        db.close()
+
+@celery_app.task(name="orchestration.conductor.on_task_success")
+def on_task_success(envelope: dict, task_id_str: str, attempt_id_str: str | None = None):
+    # link callback: receives the worker's return value
+    db: Session = SessionLocal()
+    try:
+        attempt_id = uuid.UUID(attempt_id_str) if attempt_id_str else None
+        handle_task_result(db, uuid.UUID(task_id_str), envelope, attempt_id)
+    finally:
+        db.close()
+
+@celery_app.task(name="orchestration.conductor.on_task_failure")
+def on_task_failure(request, exc, traceback, task_id_str: str, attempt_id_str: str | None = None):
+    # link_error callback: the worker raised
+    db: Session = SessionLocal()
+    try:
+        attempt_id = uuid.UUID(attempt_id_str) if attempt_id_str else None
+        handle_task_failure(db, uuid.UUID(task_id_str), str(exc), attempt_id)
+    finally:
+        db.close()
+
+@celery_app.task(name="orchestration.conductor.release_waiting_jobs")
+def release_waiting_jobs():
+    # periodic (celery beat) sweep: jobs are otherwise only released when another
+    # job of their lane finishes, so a job deferred while that lane is idle would wait forever
+    db: Session = SessionLocal()
+    try:
+        release_deferred_jobs(db)
+        release_bulk_jobs(db)
+    finally:
+        db.close()
+
+@celery_app.task(name="orchestration.conductor.enforce_deadline")
+def enforce_deadline(job_id_str: str):
+    # scheduled with countdown=deadline_seconds when the job is created or resumed.
+    # a resume clears or moves the deadline, so stale countdowns are ignored.
+    db: Session = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == uuid.UUID(job_id_str)).first()
+        if not job or job.deadline_at is None or job.deadline_at > datetime.now(UTC):
+            return
+        if cancel_job(db, job.id, status="timed_out"):
+            print(f"[Conductor] Job {job_id_str} exceeded its deadline.")
+    finally:
+        db.close()
@@ -1,12 +1,164 @@
+import os
+import uuid
+from datetime import datetime, UTC
+
+import uuid6
 from sqlalchemy.orm import Session
 
+from backend.celery_app import celery_app, queue_for
+from backend.master_agent.models.job import Job
+from backend.master_agent.models.task import Task
+from backend.master_agent.orchestration.task_graph import WORKER_TASKS
+from backend.master_agent.orchestration.checkpoint import save_envelope, load_outputs
+
+
+MAX_TASK_RETRIES = int(os.getenv("TASK_MAX_RETRIES", "1"))
+
+TERMINAL_STATES = {"completed", "failed", "skipped", "cancelled"}
+
+# conductor callbacks that advance the job when a dispatched task finishes
+ON_SUCCESS_TASK = "orchestration.conductor.on_task_success"
+ON_FAILURE_TASK = "orchestration.conductor.on_task_failure"
+
+
+def broker_priority(priority: int | None) -> int:
+    # Task.priority is higher = more urgent; kombu's redis transport serves 0 first
+    return 9 - max(0, min(9, priority or 0))
+
+
+def _upstream_outputs(db: Session, task: Task, by_id: dict[uuid.UUID, Task]) -> dict:
+    # checkpointed outputs of every dependency, keyed by worker type
+    outputs = load_outputs(db, list(task.depends_on))
+    return {by_id[dep_id].worker_type: outputs.get(dep_id, {}) for dep_id in task.depends_on}
+
+
+def _claim(db: Session, task: Task) -> bool:
+    # atomically move pending -> running so concurrent callbacks never double-dispatch.
+    # each claim is a new dispatch attempt with its own celery task id.
+    now = datetime.now(UTC)
+    attempt_id = uuid6.uuid7()
+    claimed = (
+        db.query(Task)
+        .filter(Task.id == task.id, Task.status == "pending")
+        .update(
+            {"status": "running", "started_at": now, "finished_at": None, "celery_task_id": attempt_id},
+            synchronize_session=False
+        )
+    )
+    db.commit()
+    if claimed:
+        task.status = "running"
+        task.started_at = now
+        task.finished_at = None
+        task.celery_task_id = attempt_id
+    return bool(claimed)
+
+
+def _dispatch(
+        db: Session,
+        task: Task,
+        by_id: dict[uuid.UUID, Task],
+        job: Job | None = None
+) -> None:
+    params = dict(task.params or {})
+    # read by the rate limiter, so bulk calls stay within their share of the budget
+    params["lane"] = job.lane if job else "interactive"
+    if task.depends_on:
+        params["upstream"] = _upstream_outputs(db, task, by_id)
+
+    task_name = WORKER_TASKS[task.worker_type]
+    celery_app.send_task(
+        task_name,
+        kwargs={
+            "job_id": str(task.job_id),
+            "task_id": str(task.id),
+            "params": params
+        },
+        task_id=str(task.celery_task_id),
+        priority=broker_priority(task.priority),
+        queue=queue_for(task_name, job.lane if job else "interactive"),
+        expires=job.deadline_at if job else None,
+        link=celery_app.signature(ON_SUCCESS_TASK, args=(str(task.id), str(task.celery_task_id))),
+        link_error=celery_app.signature(ON_FAILURE_TASK, args=(str(task.id), str(task.celery_task_id)))
+    )
+    print(f"[Scheduler] Dispatched {task.worker_type} ({task.id})")
 
-def run_scheduler(db: Session) -> None:
-    # stub
+
+def record_failure(task: Task, message: str) -> None:
+    # failed attempt: back to pending while retries remain, else permanently failed
+    if (task.retries or 0) < MAX_TASK_RETRIES:
+        print(f"[Scheduler] {task.worker_type} failed, retrying: {message}")
+        task.retries = (task.retries or 0) + 1
+        task.status = "pending"
+    else:
+        print(f"[Scheduler] {task.worker_type} failed permanently: {message}")
+        task.status = "failed"
+        task.finished_at = datetime.now(UTC)
+    task.error_message = message
+
+
+def record_result(db: Session, task: Task, envelope: dict) -> bool:
+    """
+    Checkpoint a finished task's envelope and update its state.
+    Returns True if the task completed successfully. Caller commits.
+    """
+    save_envelope(db, envelope)
+
+    if envelope.get("status") != "ok":
+        record_failure(task, envelope.get("notes") or "worker returned non-ok status")
+        return False
+
+    task.status = "completed"
+    task.finished_at = datetime.now(UTC)
+    task.error_message = None
+    print(f"[Scheduler] {task.worker_type} completed ({task.id})")
+    return True
+
+
+def graph_state(tasks: list[Task]) -> str:
+    # overall state of a job's graph: running | completed | failed | cancelled
+    if any(t.status == "cancelled" for t in tasks):
+        return "cancelled"
+    if any(t.status not in TERMINAL_STATES for t in tasks):
+        return "running"
+    if all(t.status == "completed" for t in tasks):
+        return "completed"
+    return "failed"
+
+
+def run_scheduler(db: Session, job_id: uuid.UUID) -> str:
     """
-    - Query db for tasks with "pending" status
-    - check dependencies
-    - celery tasks
-    - update task state
+    One scheduling pass over a job's task graph:
+    - skip tasks whose dependencies failed
+    - claim and dispatch every pending task whose dependencies are all completed
+    Completion is reported back through the ON_SUCCESS/ON_FAILURE callbacks,
+    which call run_scheduler again; nothing here waits on a worker.
+    Returns the graph state (running | completed | failed | cancelled).
     """
-    pass
\ No newline at end of file
+    job = db.query(Job).filter(Job.id == job_id).first()
+    tasks = db.query(Task).filter(Task.job_id == job_id).all()
+    by_id = {t.id: t for t in tasks}
+
+    # propagate permanent failures downstream until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for task in tasks:
+            if task.status == "pending" and any(
+                    by_id[d].status in ("failed", "skipped") for d in task.depends_on or []):
+                task.status = "skipped"
+                task.finished_at = datetime.now(UTC)
+                task.error_message = "upstream dependency failed"
+                changed = True
+    db.commit()
+
+    ready = [
+        t for t in tasks
+        if t.status == "pending"
+        and all(by_id[d].status == "completed" for d in t.depends_on or [])
+    ]
+    for task in sorted(ready, key=lambda t: t.priority or 0, reverse=True):
+        if _claim(db, task):
+            _dispatch(db, task, by_id, job)
+
+    return graph_state(tasks)
@@ -1,8 +1,113 @@
 from typing import List, Dict, Any
 from uuid import UUID
 
+import uuid6
+from sqlalchemy.orm import Session
 
-def build_task_graph(job_id: UUID) -> List[Dict[str, Any]]:
-    # stub
-    # returns list[dict] representing graph nodes
-    return []
\ No newline at end of file
+from backend.master_agent.models.task import Task
+
+
+class TaskGraphError(Exception): pass
+
+
+# worker_type -> registered celery task name
+WORKER_TASKS: Dict[str, str] = {
+    "clinical_trials": "workers.clinical_trials.worker.run",
+    "patent_worker": "workers.patent_worker.worker.run",
+    "market_worker": "workers.market_worker.worker.run",
+    "synthesis": "master_agent.synthesis.engine.run",
+    "report": "workers.report.worker.run",
+}
+
+# default research pipeline. new workers (web_worker, internal_summarizer, ...)
+# are added as nodes here instead of editing the conductor.
+# priority 0-9, higher = more urgent: later stages go first so nearly finished
+# jobs aren't stuck behind new jobs' discovery calls (see scheduler.broker_priority)
+RESEARCH_GRAPH: List[Dict[str, Any]] = [
+    {"worker_type": "clinical_trials", "depends_on": [], "priority": 5},
+    {"worker_type": "patent_worker", "depends_on": [], "priority": 5},
+    {"worker_type": "market_worker", "depends_on": [], "priority": 5},
+    {
+        "worker_type": "synthesis",
+        "depends_on": ["clinical_trials", "patent_worker", "market_worker"],
+        "priority": 7
+    },
+    {"worker_type": "report", "depends_on": ["synthesis"], "priority": 9},
+]
+
+
+def _topological_order(stages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # kahn's algorithm. raises on unknown dependencies and cycles.
+    by_type = {s["worker_type"]: s for s in stages}
+    if len(by_type) != len(stages):
+        raise TaskGraphError("Duplicate worker_type in task graph")
+
+    indegree = {t: 0 for t in by_type}
+    for s in stages:
+        for dep in s.get("depends_on", []):
+            if dep not in by_type:
+                raise TaskGraphError(f"Stage '{s['worker_type']}' depends on unknown stage '{dep}'")
+            indegree[s["worker_type"]] += 1
+
+    ready = [t for t, d in indegree.items() if d == 0]
+    ordered = []
+    while ready:
+        current = ready.pop(0)
+        ordered.append(by_type[current])
+        for s in stages:
+            if current in s.get("depends_on", []):
+                indegree[s["worker_type"]] -= 1
+                if indegree[s["worker_type"]] == 0:
+                    ready.append(s["worker_type"])
+
+    if len(ordered) != len(stages):
+        raise TaskGraphError("Task graph contains a cycle")
+    return ordered
+
+
+def build_task_graph(
+        job_id: UUID,
+        molecule: str,
+        stages: List[Dict[str, Any]] = RESEARCH_GRAPH
+) -> List[Dict[str, Any]]:
+    # returns list[dict] representing graph nodes, in topological order,
+    # with depends_on resolved from worker types to task ids
+    ids: Dict[str, UUID] = {}
+    nodes = []
+
+    for stage in _topological_order(stages):
+        worker_type = stage["worker_type"]
+        if worker_type not in WORKER_TASKS:
+            raise TaskGraphError(f"No celery task registered for worker type '{worker_type}'")
+
+        ids[worker_type] = uuid6.uuid7()
+        nodes.append({
+            "id": ids[worker_type],
+            "job_id": job_id,
+            "worker_type": worker_type,
+            "params": {"molecule": molecule, **stage.get("params", {})},
+            "depends_on": [ids[dep] for dep in stage.get("depends_on", [])],
+            "priority": stage.get("priority", 0),
+        })
+
+    return nodes
+
+
+def create_tasks(db: Session, nodes: List[Dict[str, Any]]) -> List[Task]:
+    # persist one Task row per graph node
+    tasks = [
+        Task(
+            id=node["id"],
+            job_id=node["job_id"],
+            worker_type=node["worker_type"],
+            params=node["params"],
+            depends_on=node["depends_on"],
+            priority=node["priority"],
+            status="pending",
+            retries=0
+        )
+        for node in nodes
+    ]
+    db.add_all(tasks)
+    db.commit()
+    return tasks
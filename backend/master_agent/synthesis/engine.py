@@ -1,9 +1,20 @@
-import json
+import os
 import uuid
+from datetime import datetime, UTC
 
-from backend.common.llm.inference import llm_structured
+from celery import shared_task
+
+from backend.common.llm.inference import llm_structured, run_sync
 from backend.common.schemas.canonical_result import CanonicalResult, SynthesisOutput, PatentOutputs
 from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+from backend.common.schemas.worker_envelope import WorkerEnvelope
+from backend.master_agent.synthesis.progress import publish_field, clear_progress
+from backend.master_agent.synthesis.prompts import build_synthesis_prompt
+from backend.master_agent.synthesis.map_reduce import run_map_reduce
+from backend.master_agent.synthesis.sections import run_sections
+
+# single | sections | map_reduce | auto (map-reduce only when the evidence exceeds the prompt budget)
+SYNTHESIS_MODE = os.getenv("SYNTHESIS_MODE", "auto")
 
 def run_synthesis(
         job_id: uuid.UUID,
@@ -14,99 +25,32 @@ def run_synthesis(
 ) -> CanonicalResult:
     # take raw clinical trial output, produce structured CanonicalResult
 
-    trials_json = json.dumps([t.model_dump() for t in ct_outputs.trials], indent=2)
-    patents_json = json.dumps([p.model_dump() for p in pat_outputs.patents], indent=2)
-
-    prompt = f"""
-You are a biomedical evidence synthesis engine with expertise in clinical trial
-interpretation, drug development, intellectual property, and risk/benefit evaluation.
-
-Your job is to analyze and synthesize clinical trial and patent evidence for the molecule:
-
-    Molecule: {molecule}
-
-You are given the normalized clinical trial dataset (JSON list):
-{trials_json}
-
-You are given the patent and IP landscape data:
-{patents_json}
-
-You are also given the market and competitor intelligence data:
-{market_outputs.model_dump_json(indent=2)}
-
-Your output MUST strictly follow the SynthesisOutput schema.
-Do NOT output the raw data. Just the analysis.
-
--------------------------
-TASKS YOU MUST COMPLETE:
--------------------------
-
-1. **Summarize the overall trial landscape**, including:
-   - trial phases represented
-   - statuses (Completed, Recruiting, Terminated, Withdrawn)
-   - conditions and therapeutic focus areas
-   - geographical distribution
-   - sponsor patterns
-
-2. **Summarize the Patent Landscape**:
-   - Key assignees and holders
-   - Patent expiry horizons (if inferable)
-   - Competitive crowding in IP
-
-3. **Extract evidence-based key findings**, such as:
-   - efficacy signals
-   - safety observations
-   - patterns across trials
-   - contradictory or inconclusive evidence
-
-4. **Identify trends or anomalies**, e.g.:
-   - early stoppage or terminations
-   - missing results
-   - unusual phase transitions
-   - clustering in certain regions or conditions
-
-5. **Assess data completeness**, considering:
-   - missing fields
-   - incomplete results
-   - trial dropouts
-   - limited sample size
-
-   Output a score between **0 and 1** for `data_completeness_score`.
-
-6. **Suggest follow-up research actions**, such as:
-   - recommended next-phase trials
-   - populations that need more data
-   - endpoints requiring deeper investigation
-
-7. **Assess Risks**:
-   - Provide a detailed Risk Assessment paragraph (Clinical + IP Risks)
-
-8. **Provide an overall confidence score** (0 to 1) reflecting:
-   - quality of evidence
-   - consistency across trials
-   - robustness of results
-
---------------------------------------------
-RULES FOR THE OUTPUT:
---------------------------------------------
-
-Return ONLY ONE JSON OBJECT.
-Do NOT wrap the result in a list or array.
-Do NOT return an array.
-Do NOT return multiple objects.
-Return exactly ONE dictionary matching the SynthesisOutput schema.
-No markdown. No text. No code fences.
-
-Begin.
-"""
-    
-    # 1. Get Analysis from LLM
-    analysis: SynthesisOutput = llm_structured(
-        prompt=prompt,
-        schema=SynthesisOutput,
-        job_id=job_id,
-        stage="synthesis"
-    )
+    prompt, report = build_synthesis_prompt(molecule, ct_outputs, pat_outputs, market_outputs)
+    mode = SYNTHESIS_MODE
+    if mode == "auto":
+        # one call while the evidence fits the budget, map-reduce once it would be truncated
+        mode = "map_reduce" if report["records_dropped"] else "single"
+
+    # 1. Get Analysis from LLM (finished sections show up in the UI as they arrive; see LLM_STREAMING)
+    clear_progress(job_id)
+    on_progress = lambda field, value: publish_field(job_id, field, value)
+    if mode == "map_reduce":
+        print(f"[Synthesis] Map-reduce for {molecule} ({len(ct_outputs.trials)} trials, {len(pat_outputs.patents)} patents)")
+        analysis: SynthesisOutput = run_sync(
+            run_map_reduce(job_id, molecule, ct_outputs, pat_outputs, market_outputs, on_progress)
+        )
+    elif mode == "sections":
+        analysis: SynthesisOutput = run_sync(
+            run_sections(job_id, molecule, ct_outputs, pat_outputs, market_outputs, on_progress)
+        )
+    else:
+        analysis: SynthesisOutput = llm_structured(
+            prompt=prompt,
+            schema=SynthesisOutput,
+            job_id=job_id,
+            stage="synthesis",
+            on_progress=on_progress
+        )
 
     # 2. Construct Full Canonical Result (Data + Analysis)
     canonical_result = CanonicalResult(
@@ -124,3 +68,47 @@ Begin.
     )
 
     return canonical_result
+
+@shared_task(name="master_agent.synthesis.engine.run")
+def run_synthesis_worker(job_id: str, task_id: str, params: dict):
+    # Synthesis as a task graph node. Reads discovery outputs from params["upstream"].
+
+    job_uuid = uuid.UUID(job_id)
+    task_uuid = uuid.UUID(task_id)
+
+    molecule = params.get("molecule")
+    upstream = params.get("upstream", {})
+
+    try:
+        canonical_result = run_synthesis(
+            job_id=job_uuid,
+            molecule=molecule,
+            ct_outputs=ClinicalTrialsOutputs.model_validate(upstream["clinical_trials"]),
+            pat_outputs=PatentOutputs.model_validate(upstream["patent_worker"]),
+            market_outputs=MarketIntelligenceOutputs.model_validate(upstream["market_worker"])
+        )
+    except Exception as e:
+        print(f"[Synthesis] Failed for {molecule}: {e}")
+        return WorkerEnvelope(
+            job_id= job_uuid,
+            task_id= task_uuid,
+            worker= "synthesis",
+            status= "error",
+            confidence= 0.0,
+            timestamp= datetime.now(UTC),
+            outputs= {},
+            notes= f"Error: {str(e)}"
+        ).model_dump(mode='json')
+
+    envelope = WorkerEnvelope(
+        job_id= job_uuid,
+        task_id= task_uuid,
+        worker= "synthesis",
+        status= "ok",
+        confidence= canonical_result.confidence_overall or 0.0,
+        timestamp= datetime.now(UTC),
+        outputs= canonical_result.model_dump(mode='json'),
+        notes= f"Synthesized evidence for {molecule}."
+    )
+
+    return envelope.model_dump(mode='json')
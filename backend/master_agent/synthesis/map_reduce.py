@@ -0,0 +1,203 @@
+import asyncio
+import os
+import uuid
+from collections import Counter
+from typing import Any, Callable
+
+from backend.common.llm.inference import llm_structured_async
+from backend.common.llm.prompt_budget import (
+    budget_for, chunk_records, compact_json, key_legend, report_tokens, schema_text
+)
+from backend.common.llm.rate_limiter import estimate_tokens
+from backend.common.schemas.canonical_result import EvidenceDigest, PatentOutputs, SynthesisOutput
+from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+from backend.master_agent.synthesis.prompts import (
+    PATENT_KEYS, SYNTHESIS_TASKS, TRIAL_KEYS, INSTRUCTION_OVERHEAD_TOKENS
+)
+
+
+# max chunk summaries in flight per synthesis (the llm client adds its own global limit)
+SYNTHESIS_MAP_CONCURRENCY = int(os.getenv("SYNTHESIS_MAP_CONCURRENCY", "8"))
+
+MAP_PROMPT = """
+You are summarizing one part of the {kind} evidence for the molecule {molecule}
+(part {index} of {count}, {size} records). Compact JSON list; keys: {keys}:
+{records_json}
+
+Write a dense digest of this part only:
+- summary: phases/statuses/conditions/assignees and what they indicate
+- key_findings: evidence-based findings (efficacy, safety, IP position)
+- risks: clinical or IP risks visible in these records
+- notable_records: IDs of the most significant records
+Return ONLY ONE JSON object matching the EvidenceDigest schema.
+"""
+
+COMBINE_PROMPT = """
+Merge these digests of the {kind} evidence for the molecule {molecule} into a
+single digest. Keep every distinct finding and risk, drop duplicates.
+{digests_json}
+
+Return ONLY ONE JSON object matching the EvidenceDigest schema.
+"""
+
+REDUCE_PROMPT = """
+You are a biomedical evidence synthesis engine with expertise in clinical trial
+interpretation, drug development, intellectual property, and risk/benefit evaluation.
+
+Your job is to analyze and synthesize clinical trial and patent evidence for the molecule:
+
+    Molecule: {molecule}
+
+The evidence set was too large for one pass, so it was summarized in parts.
+
+Clinical trial statistics over all {trial_count} trials:
+{trial_stats}
+
+Digests of the clinical trial evidence:
+{trial_digests}
+
+Digests of the patent and IP landscape ({patent_count} patents):
+{patent_digests}
+
+You are also given the market and competitor intelligence data:
+{market_json}
+""" + SYNTHESIS_TASKS
+
+
+def _trial_stats(ct_outputs: ClinicalTrialsOutputs) -> str:
+    # exact counts computed locally; the digests only carry the interpretation
+    trials = ct_outputs.trials
+    return compact_json({
+        "phases": Counter(t.phase for t in trials).most_common(),
+        "statuses": Counter(t.status for t in trials).most_common(),
+        "top_conditions": Counter(t.condition for t in trials).most_common(10),
+        "with_results": sum(1 for t in trials if t.results_summary),
+    })
+
+
+async def _summarize_chunks(
+        job_id: uuid.UUID,
+        molecule: str,
+        kind: str,
+        records: list,
+        key_map: dict[str, str],
+        semaphore: asyncio.Semaphore
+) -> list[EvidenceDigest]:
+    # map step: one digest per chunk, chunk size fitted to the map budget
+    overhead = estimate_tokens(MAP_PROMPT) + estimate_tokens(schema_text(EvidenceDigest)) + INSTRUCTION_OVERHEAD_TOKENS
+    chunks = chunk_records(records, max(1, budget_for("synthesis_map") - overhead), key_map)
+    print(f"[Synthesis] Map: {len(records)} {kind} records in {len(chunks)} chunks")
+
+    async def summarize(index: int, chunk: list) -> EvidenceDigest:
+        async with semaphore:
+            return await llm_structured_async(
+                prompt=MAP_PROMPT.format(
+                    kind=kind,
+                    molecule=molecule,
+                    index=index + 1,
+                    count=len(chunks),
+                    size=len(chunk),
+                    keys=key_legend(key_map),
+                    records_json=compact_json(chunk, key_map)
+                ),
+                schema=EvidenceDigest,
+                job_id=job_id,
+                stage="synthesis_map"
+            )
+
+    return list(await asyncio.gather(*(summarize(i, c) for i, c in enumerate(chunks))))
+
+
+async def _fit_digests(
+        job_id: uuid.UUID,
+        molecule: str,
+        kind: str,
+        digests: list[EvidenceDigest],
+        budget: int,
+        semaphore: asyncio.Semaphore
+) -> str:
+    # combine digests level by level until they fit the reduce budget
+    while len(digests) > 1 and estimate_tokens(compact_json(digests)) > budget:
+        groups = chunk_records(digests, max(1, budget_for("synthesis_map") - estimate_tokens(COMBINE_PROMPT)))
+        if len(groups) >= len(digests):
+            # every digest alone fills the map budget; pair them up to make progress
+            groups = [digests[i:i + 2] for i in range(0, len(digests), 2)]
+        print(f"[Synthesis] Combining {len(digests)} {kind} digests into {len(groups)}")
+
+        async def combine(group: list[EvidenceDigest]) -> EvidenceDigest:
+            if len(group) == 1:
+                return group[0]
+            async with semaphore:
+                return await llm_structured_async(
+                    prompt=COMBINE_PROMPT.format(kind=kind, molecule=molecule, digests_json=compact_json(group)),
+                    schema=EvidenceDigest,
+                    job_id=job_id,
+                    stage="synthesis_map"
+                )
+
+        digests = list(await asyncio.gather(*(combine(g) for g in groups)))
+    return compact_json(digests)
+
+
+async def run_map_reduce(
+        job_id: uuid.UUID,
+        molecule: str,
+        ct_outputs: ClinicalTrialsOutputs,
+        pat_outputs: PatentOutputs,
+        market_outputs: MarketIntelligenceOutputs,
+        on_progress: Callable[[str, Any], None] | None = None
+) -> SynthesisOutput:
+    """
+    Hierarchical synthesis for evidence sets too large for one prompt:
+    map     - trials and patents are split into budget-sized chunks and
+              summarized in parallel into EvidenceDigests
+    combine - if the digests still exceed the reduce budget, they are merged
+              in groups until they fit
+    reduce  - one call turns the digests (plus exact trial counts and the
+              market data) into the SynthesisOutput
+    """
+    semaphore = asyncio.Semaphore(SYNTHESIS_MAP_CONCURRENCY)
+    trial_digests, patent_digests = await asyncio.gather(
+        _summarize_chunks(job_id, molecule, "clinical trial", ct_outputs.trials, TRIAL_KEYS, semaphore),
+        _summarize_chunks(job_id, molecule, "patent", pat_outputs.patents, PATENT_KEYS, semaphore)
+    )
+
+    trial_stats = _trial_stats(ct_outputs)
+    market_json = compact_json(market_outputs)
+    sections = {
+        "instructions": estimate_tokens(REDUCE_PROMPT) + INSTRUCTION_OVERHEAD_TOKENS,
+        "schema": estimate_tokens(schema_text(SynthesisOutput)),
+        "market": estimate_tokens(market_json),
+        "trial_stats": estimate_tokens(trial_stats),
+    }
+    budget = budget_for("synthesis")
+    available = max(1, budget - sum(sections.values()))
+
+    # split the remaining budget in proportion to each side's digests
+    trial_need = estimate_tokens(compact_json(trial_digests))
+    patent_need = estimate_tokens(compact_json(patent_digests))
+    trial_share = max(1, available * trial_need // max(1, trial_need + patent_need))
+    trials_json, patents_json = await asyncio.gather(
+        _fit_digests(job_id, molecule, "clinical trial", trial_digests, trial_share, semaphore),
+        _fit_digests(job_id, molecule, "patent", patent_digests, available - trial_share, semaphore)
+    )
+    sections["trial_digests"] = estimate_tokens(trials_json)
+    sections["patent_digests"] = estimate_tokens(patents_json)
+    report_tokens("synthesis_reduce", sections, budget)
+
+    prompt = REDUCE_PROMPT.format(
+        molecule=molecule,
+        trial_count=len(ct_outputs.trials),
+        trial_stats=trial_stats,
+        trial_digests=trials_json,
+        patent_count=len(pat_outputs.patents),
+        patent_digests=patents_json,
+        market_json=market_json
+    )
+    return await llm_structured_async(
+        prompt=prompt,
+        schema=SynthesisOutput,
+        job_id=job_id,
+        stage="synthesis",
+        on_progress=on_progress
+    )
@@ -0,0 +1,43 @@
+import json
+import os
+import uuid
+from typing import Any
+
+import redis
+
+from backend.common.storage.redis_client import redis_client
+
+
+# partial synthesis fields, shown by the UI while the LLM is still generating
+SYNTHESIS_PROGRESS_TTL_SECONDS = int(os.getenv("SYNTHESIS_PROGRESS_TTL_SECONDS", "3600"))
+
+
+def _key(job_id: uuid.UUID | str) -> str:
+    return f"synthesis_progress:{job_id}"
+
+
+def publish_field(job_id: uuid.UUID, field: str, value: Any) -> None:
+    # progress is best-effort; never fail the synthesis over it
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hset(_key(job_id), field, json.dumps(value, default=str))
+        pipe.expire(_key(job_id), SYNTHESIS_PROGRESS_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[Synthesis] Could not publish progress for {job_id}: {e}")
+
+
+def read_progress(job_id: uuid.UUID | str) -> dict[str, Any]:
+    try:
+        fields = redis_client.hgetall(_key(job_id))
+    except redis.RedisError as e:
+        print(f"[Synthesis] Could not read progress for {job_id}: {e}")
+        return {}
+    return {field: json.loads(value) for field, value in fields.items()}
+
+
+def clear_progress(job_id: uuid.UUID) -> None:
+    try:
+        redis_client.delete(_key(job_id))
+    except redis.RedisError:
+        pass
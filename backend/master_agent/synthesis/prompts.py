@@ -0,0 +1,206 @@
+from typing import Type
+
+from pydantic import BaseModel
+
+from backend.common.llm.prompt_budget import (
+    budget_for, compact_json, fit_records, key_legend, report_tokens, schema_text
+)
+from backend.common.llm.rate_limiter import estimate_tokens
+from backend.common.schemas.canonical_result import SynthesisOutput, PatentOutputs, PatentRecord, TrialRecord
+from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+
+
+# short keys for the compact evidence payload (legend goes into the prompt)
+TRIAL_KEYS = {
+    "nct_id": "id",
+    "phase": "ph",
+    "status": "st",
+    "condition": "cond",
+    "region": "reg",
+    "results_summary": "res",
+}
+PATENT_KEYS = {
+    "patent_id": "id",
+    "title": "t",
+    "assignee": "asg",
+    "status": "st",
+    "filing_date": "filed",
+    "summary": "sum",
+}
+
+# tokens of llm_structured's fixed instructions around the schema
+INSTRUCTION_OVERHEAD_TOKENS = 60
+
+SYNTHESIS_CONTEXT = """
+You are a biomedical evidence synthesis engine with expertise in clinical trial
+interpretation, drug development, intellectual property, and risk/benefit evaluation.
+
+Your job is to analyze and synthesize clinical trial and patent evidence for the molecule:
+
+    Molecule: {molecule}
+
+You are given the normalized clinical trial dataset (compact JSON list; keys: {trial_keys}):
+{trials_json}
+{trials_note}
+You are given the patent and IP landscape data (compact JSON list; keys: {patent_keys}):
+{patents_json}
+{patents_note}
+You are also given the market and competitor intelligence data:
+{market_json}
+"""
+
+# tasks for the single-call prompt, also used by the map-reduce reduce step
+SYNTHESIS_TASKS = """
+Your output MUST strictly follow the SynthesisOutput schema.
+Do NOT output the raw data. Just the analysis.
+
+-------------------------
+TASKS YOU MUST COMPLETE:
+-------------------------
+
+1. **Summarize the overall trial landscape**, including:
+   - trial phases represented
+   - statuses (Completed, Recruiting, Terminated, Withdrawn)
+   - conditions and therapeutic focus areas
+   - geographical distribution
+   - sponsor patterns
+
+2. **Summarize the Patent Landscape**:
+   - Key assignees and holders
+   - Patent expiry horizons (if inferable)
+   - Competitive crowding in IP
+
+3. **Extract evidence-based key findings**, such as:
+   - efficacy signals
+   - safety observations
+   - patterns across trials
+   - contradictory or inconclusive evidence
+
+4. **Identify trends or anomalies**, e.g.:
+   - early stoppage or terminations
+   - missing results
+   - unusual phase transitions
+   - clustering in certain regions or conditions
+
+5. **Assess data completeness**, considering:
+   - missing fields
+   - incomplete results
+   - trial dropouts
+   - limited sample size
+
+   Output a score between **0 and 1** for `data_completeness_score`.
+
+6. **Suggest follow-up research actions**, such as:
+   - recommended next-phase trials
+   - populations that need more data
+   - endpoints requiring deeper investigation
+
+7. **Assess Risks**:
+   - Provide a detailed Risk Assessment paragraph (Clinical + IP Risks)
+
+8. **Provide an overall confidence score** (0 to 1) reflecting:
+   - quality of evidence
+   - consistency across trials
+   - robustness of results
+
+--------------------------------------------
+RULES FOR THE OUTPUT:
+--------------------------------------------
+
+Return ONLY ONE JSON OBJECT.
+Do NOT wrap the result in a list or array.
+Do NOT return an array.
+Do NOT return multiple objects.
+Return exactly ONE dictionary matching the SynthesisOutput schema.
+No markdown. No text. No code fences.
+
+Begin.
+"""
+
+def _trial_rank(trial: TrialRecord) -> tuple:
+    # most informative first: reported results, later phase, finished or stopped early
+    phases = [int(c) for c in trial.phase if c.isdigit()]
+    status = trial.status.lower()
+    return (
+        bool(trial.results_summary),
+        max(phases, default=0),
+        status.startswith(("completed", "terminated", "withdrawn")),
+    )
+
+def _patent_rank(patent: PatentRecord) -> tuple:
+    # granted/active with a summary first, newest filings first
+    status = patent.status.lower()
+    return (
+        status.startswith(("granted", "active")),
+        bool(patent.summary),
+        patent.filing_date or "",
+    )
+
+def _split_budget(available: int, trials_need: int, patents_need: int) -> tuple[int, int]:
+    # everything if it fits; otherwise the smaller side keeps what it needs (up to half)
+    if trials_need + patents_need <= available:
+        return trials_need, patents_need
+    half = available // 2
+    if trials_need <= half:
+        return trials_need, available - trials_need
+    if patents_need <= half:
+        return available - patents_need, patents_need
+    return half, available - half
+
+def build_synthesis_prompt(
+        molecule: str,
+        ct_outputs: ClinicalTrialsOutputs,
+        pat_outputs: PatentOutputs,
+        market_outputs: MarketIntelligenceOutputs,
+        budget: int | None = None,
+        tasks: str = SYNTHESIS_TASKS,
+        schema: Type[BaseModel] = SynthesisOutput,
+        stage: str = "synthesis"
+) -> tuple[str, dict[str, int]]:
+    """
+    Compact evidence context + `tasks`, fitted to the stage's token budget
+    (including the `schema` llm_structured will inject).
+    Trials and patents are dropped lowest-ranked first when over budget.
+    Returns the prompt and its per-section token counts.
+    """
+    budget = budget or budget_for(stage)
+    market_json = compact_json(market_outputs)
+
+    def render(trials_json="", patents_json="", trials_note="", patents_note=""):
+        return SYNTHESIS_CONTEXT.format(
+            molecule=molecule,
+            trial_keys=key_legend(TRIAL_KEYS),
+            trials_json=trials_json,
+            trials_note=trials_note,
+            patent_keys=key_legend(PATENT_KEYS),
+            patents_json=patents_json,
+            patents_note=patents_note,
+            market_json=market_json
+        ) + tasks
+
+    sections = {
+        "instructions": estimate_tokens(render()) - estimate_tokens(market_json) + INSTRUCTION_OVERHEAD_TOKENS,
+        "schema": estimate_tokens(schema_text(schema)),
+        "market": estimate_tokens(market_json),
+    }
+    available = max(0, budget - sum(sections.values()))
+    trials_budget, patents_budget = _split_budget(
+        available,
+        estimate_tokens(compact_json(ct_outputs.trials, TRIAL_KEYS)),
+        estimate_tokens(compact_json(pat_outputs.patents, PATENT_KEYS))
+    )
+
+    trials_json, trials_kept, trials_total = fit_records(ct_outputs.trials, trials_budget, TRIAL_KEYS, _trial_rank)
+    patents_json, patents_kept, patents_total = fit_records(pat_outputs.patents, patents_budget, PATENT_KEYS, _patent_rank)
+    sections["trials"] = estimate_tokens(trials_json)
+    sections["patents"] = estimate_tokens(patents_json)
+
+    trials_note = patents_note = ""
+    if trials_kept < trials_total:
+        trials_note = f"(Showing the {trials_kept} most informative of {trials_total} trials.)\n"
+    if patents_kept < patents_total:
+        patents_note = f"(Showing the {patents_kept} most relevant of {patents_total} patents.)\n"
+
+    report = report_tokens(stage, sections, budget)
+    report["records_dropped"] = (trials_total - trials_kept) + (patents_total - patents_kept)
+    return render(trials_json, patents_json, trials_note, patents_note), report
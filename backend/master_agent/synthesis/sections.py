@@ -0,0 +1,112 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Callable, Type
+
+from pydantic import BaseModel
+
+from backend.common.llm.inference import llm_structured_async, LLMResponseFormatError, LLMServiceError
+from backend.common.schemas.canonical_result import (
+    FollowUpSection, PatentOutputs, RiskSection, ScoresSection, SwotSection, SynthesisOutput, TrialSummarySection
+)
+from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+from backend.master_agent.synthesis.prompts import build_synthesis_prompt
+
+
+# extra attempts for a section whose llm_structured call failed; other sections are kept
+SYNTHESIS_SECTION_RETRIES = int(os.getenv("SYNTHESIS_SECTION_RETRIES", "1"))
+
+_SECTION_HEADER = """
+Your output MUST strictly follow the {schema} schema.
+Do NOT output the raw data. Just the analysis.
+
+TASK:
+"""
+
+# section name -> (sub-schema, task text)
+SECTIONS: dict[str, tuple[Type[BaseModel], str]] = {
+    "trial_summary": (TrialSummarySection, """
+1. trial_summary: summarize the overall trial landscape (phases, statuses, conditions
+   and therapeutic focus areas, geographical distribution, sponsor patterns) and the
+   patent landscape (key assignees, expiry horizons, IP crowding).
+2. key_findings: evidence-based findings (efficacy signals, safety observations,
+   patterns across trials, contradictory or inconclusive evidence, early terminations,
+   missing results, unusual phase transitions).
+"""),
+    "swot": (SwotSection, """
+swot_analysis: a SWOT analysis of the molecule with the keys strengths, weaknesses,
+opportunities and threats, each a list of short evidence-based points covering the
+clinical, IP and market position.
+"""),
+    "risk": (RiskSection, """
+risk_assessment: a detailed risk assessment paragraph covering clinical risks
+(safety, efficacy uncertainty, trial failures) and IP risks (expiry, crowding, litigation).
+"""),
+    "scores": (ScoresSection, """
+1. data_completeness_score (0 to 1): missing fields, incomplete results, trial
+   dropouts, limited sample size.
+2. confidence_overall (0 to 1): quality of evidence, consistency across trials,
+   robustness of results.
+"""),
+    "follow_up": (FollowUpSection, """
+suggested_follow_up: follow-up research actions (recommended next-phase trials,
+populations that need more data, endpoints requiring deeper investigation).
+"""),
+}
+
+
+async def _run_section(
+        job_id: uuid.UUID,
+        name: str,
+        prompt: str,
+        schema: Type[BaseModel],
+        on_progress: Callable[[str, Any], None] | None
+) -> BaseModel:
+    for attempt in range(SYNTHESIS_SECTION_RETRIES + 1):
+        try:
+            result = await llm_structured_async(
+                prompt=prompt,
+                schema=schema,
+                job_id=job_id,
+                stage=f"synthesis_{name}"
+            )
+        except (LLMResponseFormatError, LLMServiceError) as e:
+            if attempt == SYNTHESIS_SECTION_RETRIES:
+                raise
+            print(f"[Synthesis] Section {name} failed, retrying only this section: {e}")
+            continue
+
+        if on_progress:
+            for field, value in result.model_dump(mode="json").items():
+                await asyncio.to_thread(on_progress, field, value)
+        return result
+
+
+async def run_sections(
+        job_id: uuid.UUID,
+        molecule: str,
+        ct_outputs: ClinicalTrialsOutputs,
+        pat_outputs: PatentOutputs,
+        market_outputs: MarketIntelligenceOutputs,
+        on_progress: Callable[[str, Any], None] | None = None
+) -> SynthesisOutput:
+    """
+    Decomposed synthesis: every SECTIONS entry is a separate, smaller structured
+    call over the same evidence, run concurrently and merged into SynthesisOutput.
+    A failing section is retried on its own; finished sections are served from
+    the LLM cache if the whole task is retried.
+    """
+    calls = []
+    for name, (schema, task) in SECTIONS.items():
+        prompt, _ = build_synthesis_prompt(
+            molecule, ct_outputs, pat_outputs, market_outputs,
+            tasks=_SECTION_HEADER.format(schema=schema.__name__) + task,
+            schema=schema,
+            stage="synthesis_section"
+        )
+        calls.append(_run_section(job_id, name, prompt, schema, on_progress))
+
+    merged: dict[str, Any] = {}
+    for result in await asyncio.gather(*calls):
+        merged.update(result.model_dump())
+    return SynthesisOutput(**merged)
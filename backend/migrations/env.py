@@ -25,7 +25,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from master_agent.models.base import Base
-from master_agent.models import job, artifact, llm_call, task, worker_response
+from master_agent.models import job, artifact, llm_call, llm_cache, task, worker_response
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,28 @@
+"""add llm_calls latency_ms
+
+Revision ID: a4d7f2e91b36
+Revises: e5b0c2a8f613
+Create Date: 2026-10-18 16:05:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7f2e91b36'
+down_revision: Union[str, Sequence[str], None] = 'e5b0c2a8f613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('llm_calls', sa.Column('latency_ms', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('llm_calls', 'latency_ms')
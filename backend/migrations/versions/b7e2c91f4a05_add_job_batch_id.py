@@ -0,0 +1,30 @@
+"""add job batch_id
+
+Revision ID: b7e2c91f4a05
+Revises: 601a3b8ab070
+Create Date: 2026-10-18 10:12:41.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c91f4a05'
+down_revision: Union[str, Sequence[str], None] = '601a3b8ab070'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('batch_id', sa.UUID(), nullable=True))
+    op.create_index('ix_jobs_batch_id', 'jobs', ['batch_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_batch_id', table_name='jobs')
+    op.drop_column('jobs', 'batch_id')
@@ -0,0 +1,28 @@
+"""add job deadline_at
+
+Revision ID: c3f81d6e2b17
+Revises: b7e2c91f4a05
+Create Date: 2026-10-18 11:03:12.574920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f81d6e2b17'
+down_revision: Union[str, Sequence[str], None] = 'b7e2c91f4a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('deadline_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'deadline_at')
@@ -0,0 +1,30 @@
+"""add job lane
+
+Revision ID: d91a5f0c7e42
+Revises: c3f81d6e2b17
+Create Date: 2026-10-18 11:48:55.031276
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a5f0c7e42'
+down_revision: Union[str, Sequence[str], None] = 'c3f81d6e2b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('lane', sa.String(), server_default=sa.text("'interactive'"), nullable=False))
+    op.create_index('idx_jobs_lane_status', 'jobs', ['lane', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_jobs_lane_status', table_name='jobs')
+    op.drop_column('jobs', 'lane')
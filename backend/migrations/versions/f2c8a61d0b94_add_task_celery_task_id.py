@@ -0,0 +1,28 @@
+"""add tasks celery_task_id
+
+Revision ID: f2c8a61d0b94
+Revises: a4d7f2e91b36
+Create Date: 2026-10-18 18:12:09.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a61d0b94'
+down_revision: Union[str, Sequence[str], None] = 'a4d7f2e91b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('celery_task_id', sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tasks', 'celery_task_id')
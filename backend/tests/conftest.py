@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture
+def fake_redis():
+    # in-memory redis with lua scripting, for the redis-backed helpers (needs fakeredis[lua])
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def fake_llm(fake_redis, monkeypatch):
+    # llm_structured against the offline FakeProvider: no latency, a fresh in-memory
+    # cache, redis-backed helpers on fakeredis and no llm_calls writes
+    from unittest.mock import MagicMock
+    from backend.common.llm import call_log, inference, providers, rate_limiter
+    from backend.common.llm.cache import LLMCache, MemoryCacheBackend
+    from backend.common.storage import circuit_breaker, singleflight
+
+    monkeypatch.setattr(providers, "LLM_FAKE_LATENCY_MS", 0)
+    monkeypatch.setattr(providers, "LLM_FAKE_JITTER_MS", 0)
+    provider = providers.FakeProvider(recordings_path=None)
+    monkeypatch.setattr(providers, "_provider", provider)
+    monkeypatch.setattr(inference, "get_provider", lambda: provider)
+
+    for module in (circuit_breaker, singleflight, rate_limiter):
+        monkeypatch.setattr(module, "redis_client", fake_redis)
+    monkeypatch.setattr(inference, "llm_breaker", circuit_breaker.CircuitBreaker("fake"))
+    monkeypatch.setattr(inference, "llm_singleflight", singleflight.SingleFlight("llm", lock_ttl=30))
+    monkeypatch.setattr(inference, "rate_limiter", rate_limiter.RateLimiter(enabled=False))
+    monkeypatch.setattr(inference, "llm_cache", LLMCache(MemoryCacheBackend()))
+    monkeypatch.setattr(inference, "llm_call_logger", MagicMock(spec=call_log.LLMCallLogger))
+    return provider
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+import redis
+from backend.master_agent.orchestration import admission
+from backend.master_agent.orchestration.admission import (
+    ADMISSION_DEFAULT_RETRY_AFTER, ADMISSION_MAX_RETRY_AFTER, _retry_after
+)
+
+def test_retry_after_drains_excess_at_observed_throughput():
+    assert _retry_after(10, 0.5) == 20
+    assert _retry_after(0.1, 1.0) == 1
+    assert _retry_after(1e6, 0.001) == ADMISSION_MAX_RETRY_AFTER
+    # nothing finished recently: no estimate
+    assert _retry_after(5, 0) == ADMISSION_DEFAULT_RETRY_AFTER
+
+def test_evaluate_decisions():
+    db = object()
+
+    def decide(depth=0, running=0, throughput=0.1, broker_error=None):
+        with patch.object(admission, "broker_queue_depth", return_value=depth, side_effect=broker_error), \
+                patch.object(admission, "running_jobs", return_value=running), \
+                patch.object(admission, "throughput_per_second", return_value=throughput):
+            return admission.evaluate(db)
+
+    assert decide().admitted
+
+    # backlog too deep -> 503, retry once the excess jobs have drained
+    backlog = decide(depth=admission.ADMISSION_MAX_QUEUE_DEPTH + 9)
+    assert (backlog.admitted, backlog.status_code) == (False, 503)
+    assert backlog.retry_after == _retry_after(10 / len(admission.RESEARCH_GRAPH), 0.1)
+
+    # too many running -> 429
+    busy = decide(running=admission.ADMISSION_MAX_RUNNING_JOBS + 1)
+    assert (busy.admitted, busy.status_code, busy.retry_after) == (False, 429, 20)
+
+    down = decide(broker_error=redis.ConnectionError("refused"))
+    assert (down.admitted, down.status_code) == (False, 503)
+    assert down.retry_after == ADMISSION_DEFAULT_RETRY_AFTER
@@ -0,0 +1,42 @@
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from backend.master_agent.orchestration.batch import batch_progress, create_batch
+
+def test_create_batch_inserts_one_job_per_unique_molecule():
+    db = MagicMock()
+    molecules = ["Aspirin", " aspirin ", "Metformin", "", "ASPIRIN"]
+
+    batch_id, mapping = create_batch(db, "find trials", molecules, user_id=7)
+
+    rows = db.execute.call_args.args[1]
+    assert [r["molecule"] for r in rows] == ["Aspirin", "Metformin"]
+    assert all(r["batch_id"] == batch_id and r["lane"] == "bulk" and r["status"] == "queued" for r in rows)
+    db.commit.assert_called_once()
+
+    # every submitted spelling maps to its shared job; blanks are dropped
+    assert set(mapping) == {"Aspirin", " aspirin ", "Metformin", "ASPIRIN"}
+    assert mapping["Aspirin"] == mapping[" aspirin "] == mapping["ASPIRIN"] == rows[0]["id"]
+    assert mapping["Metformin"] == rows[1]["id"]
+
+def test_create_batch_of_blanks_inserts_nothing():
+    db = MagicMock()
+    _, mapping = create_batch(db, "find trials", ["  ", ""])
+    assert mapping == {}
+    db.execute.assert_not_called()
+
+def test_batch_progress_counts_terminal_jobs():
+    statuses = ["completed", "failed", "running", "queued"]
+    jobs = [SimpleNamespace(id=uuid.uuid4(), molecule=f"m{i}", status=s) for i, s in enumerate(statuses)]
+    db = MagicMock()
+    db.query.return_value.filter.return_value.all.return_value = jobs
+
+    progress = batch_progress(db, uuid.uuid4())
+
+    assert progress["total"] == 4
+    assert progress["progress"] == 0.5
+    assert progress["status_counts"] == {"completed": 1, "failed": 1, "running": 1, "queued": 1}
+    assert [j["status"] for j in progress["jobs"]] == statuses
+
+    db.query.return_value.filter.return_value.all.return_value = []
+    assert batch_progress(db, uuid.uuid4())["progress"] == 0.0
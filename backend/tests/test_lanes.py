@@ -0,0 +1,16 @@
+from backend.celery_app import queue_for
+from backend.master_agent.orchestration.batch import normalize_molecule
+
+def test_normalize_molecule_dedupes_case_and_whitespace():
+    assert normalize_molecule("  Aspirin ") == "aspirin"
+    assert normalize_molecule("ASPIRIN") == normalize_molecule("aspirin")
+    assert normalize_molecule("acetylsalicylic   acid") == "acetylsalicylic acid"
+    assert normalize_molecule("   ") == ""
+
+def test_queue_for_routes_lanes():
+    assert queue_for("workers.clinical_trials.worker.run") == "llm"
+    assert queue_for("master_agent.synthesis.engine.run", "bulk") == "llm_bulk"
+    assert queue_for("workers.report.worker.run", "bulk") == "report_bulk"
+    # the orchestrator has no bulk twin, and unknown tasks default to it
+    assert queue_for("orchestration.conductor.run_research_workflow", "bulk") == "orchestrator"
+    assert queue_for("something.else") == "orchestrator"
@@ -0,0 +1,63 @@
+import time
+from unittest.mock import patch
+from pydantic import BaseModel
+from backend.common.llm import cache as cache_module
+from backend.common.llm.cache import LLMCache, MemoryCacheBackend, RedisCacheBackend, make_cache_key
+
+class Schema(BaseModel):
+    answer: str
+
+def test_cache_key_is_deterministic_and_input_sensitive():
+    key = make_cache_key("model-a", "instr", "prompt", Schema)
+
+    assert key == make_cache_key("model-a", "instr", "prompt", Schema)
+    assert key != make_cache_key("model-b", "instr", "prompt", Schema)
+    assert key != make_cache_key("model-a", "instr", "other prompt", Schema)
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", "1", ttl=60)
+    backend.set("b", "2", ttl=60)
+    backend.get("a")  # touch a, so b is the LRU entry
+    backend.set("c", "3", ttl=60)
+
+    assert backend.get("a") == "1"
+    assert backend.get("b") is None
+    assert backend.get("c") == "3"
+
+def test_memory_backend_respects_byte_budget_and_ttl():
+    backend = MemoryCacheBackend(max_bytes=10)
+    backend.set("a", "x" * 6, ttl=60)
+    backend.set("b", "y" * 6, ttl=60)
+    assert backend.get("a") is None
+    assert backend.get("b") == "y" * 6
+
+    backend.set("c", "z", ttl=0)
+    time.sleep(0.01)
+    assert backend.get("c") is None
+
+def test_redis_backend_prunes_expired_index_entries_before_trimming(fake_redis):
+    with patch.object(cache_module, "redis_client", fake_redis):
+        backend = RedisCacheBackend(max_entries=2)
+    index = RedisCacheBackend.INDEX_KEY
+    # values expired long ago, but their index entries linger
+    fake_redis.zadd(index, {"stale1": time.time() - 120, "stale2": time.time() - 90})
+
+    backend.set("a", "1", ttl=60)
+    assert fake_redis.zrange(index, 0, -1) == ["a"]
+
+    backend.set("b", "2", ttl=60)
+    backend.set("c", "3", ttl=60)
+    assert fake_redis.zrange(index, 0, -1) == ["b", "c"]
+    assert backend.get("a") is None
+    assert backend.get("c") == "3"
+
+def test_llm_cache_counts_hits_and_misses():
+    cache = LLMCache(MemoryCacheBackend())
+    assert cache.get("k") is None
+    cache.set("k", '{"answer": "42"}')
+    assert cache.get("k") == '{"answer": "42"}'
+
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["sets"] == 1
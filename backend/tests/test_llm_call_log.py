@@ -0,0 +1,59 @@
+import time
+import uuid
+from unittest.mock import MagicMock, patch
+from backend.common.llm import call_log
+from backend.common.llm.call_log import LLMCallLogger
+
+def _record(logger: LLMCallLogger, n: int) -> None:
+    for i in range(n):
+        logger.record(
+            job_id=uuid.uuid4(), stage="synthesis", model="m", prompt=f"p{i}", response="{}",
+            prompt_tokens=10, completion_tokens=5, latency_ms=100
+        )
+
+def test_flush_writes_in_batches_with_short_lived_sessions():
+    logger = LLMCallLogger(batch_size=2, flush_interval=60)
+    sessions = []
+
+    def session():
+        sessions.append(MagicMock())
+        return sessions[-1]
+
+    with patch.object(logger, "_ensure_thread"), patch.object(call_log, "SessionLocal", side_effect=session):
+        _record(logger, 5)
+        assert sessions == []  # record() never touches the database
+
+        assert logger.flush() == 5
+
+    assert [len(s.execute.call_args.args[1]) for s in sessions] == [2, 2, 1]
+    assert all(s.commit.called and s.close.called for s in sessions)
+    assert logger.stats["written"] == 5
+    assert logger.flush() == 0
+
+def test_full_buffer_drops_rows_instead_of_blocking():
+    logger = LLMCallLogger(buffer_size=2, batch_size=10, flush_interval=60)
+    with patch.object(logger, "_ensure_thread"):
+        _record(logger, 3)
+    assert logger.stats["dropped"] == 1
+
+def test_failed_write_is_counted_and_rolled_back():
+    logger = LLMCallLogger(batch_size=10, flush_interval=60)
+    db = MagicMock()
+    db.execute.side_effect = RuntimeError("db down")
+    with patch.object(logger, "_ensure_thread"), patch.object(call_log, "SessionLocal", return_value=db):
+        _record(logger, 3)
+        assert logger.flush() == 0
+
+    db.rollback.assert_called_once()
+    db.close.assert_called_once()
+    assert logger.stats["failed"] == 3
+
+def test_background_thread_flushes_a_full_batch_early():
+    logger = LLMCallLogger(batch_size=2, flush_interval=60)
+    with patch.object(call_log, "SessionLocal", return_value=MagicMock()):
+        _record(logger, 2)
+        deadline = time.monotonic() + 2
+        while logger.stats["written"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    # well before the 60s interval
+    assert logger.stats["written"] == 2
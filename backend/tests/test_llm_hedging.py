@@ -0,0 +1,50 @@
+import asyncio
+from unittest.mock import patch
+import pytest
+from backend.common.llm import inference
+from backend.common.llm.providers import ProviderError
+from backend.common.llm.routing import LatencyTracker
+
+def _fake_generate(latency: dict[str, float], failing: set[str], cancelled: list[str]):
+    # stands in for inference._generate: (validated, json_text, usage, model, seconds)
+    async def generate(model, instructions, input_text, schema, route, started=None):
+        if started:
+            started.set()
+        try:
+            await asyncio.sleep(latency[model])
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        if model in failing:
+            raise ProviderError(f"{model} failed")
+        return model, "{}", None, model, latency[model]
+    return generate
+
+def _hedged(latency: dict[str, float], failing: set[str] = frozenset()):
+    cancelled: list[str] = []
+    with patch.object(inference, "_generate", _fake_generate(latency, set(failing), cancelled)), \
+            patch.object(inference, "latency_tracker", LatencyTracker(min_samples=1)), \
+            patch.object(inference, "HEDGE_DEFAULT_DELAY", 0.05), \
+            patch.object(inference, "HEDGE_MODEL", None):
+        result = asyncio.run(inference._generate_hedged("synthesis", ["primary", "backup"], "i", "p", None, None))
+    return result[3], cancelled
+
+def test_fast_primary_is_not_hedged():
+    # the backup would win if it were ever started
+    winner, cancelled = _hedged({"primary": 0.01, "backup": 0.0})
+    assert winner == "primary"
+    assert cancelled == []
+
+def test_slow_primary_loses_to_the_hedge_and_is_cancelled():
+    winner, cancelled = _hedged({"primary": 5.0, "backup": 0.01})
+    assert winner == "backup"
+    assert cancelled == ["primary"]
+
+def test_failed_hedge_falls_back_to_the_primary():
+    winner, cancelled = _hedged({"primary": 0.2, "backup": 0.01}, failing={"backup"})
+    assert winner == "primary"
+    assert cancelled == []
+
+def test_both_failing_raises():
+    with pytest.raises(ProviderError):
+        _hedged({"primary": 0.1, "backup": 0.01}, failing={"primary", "backup"})
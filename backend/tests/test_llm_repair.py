@@ -0,0 +1,58 @@
+import json
+import pytest
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from backend.common.schemas.worker_outputs import MarketIntelligenceOutputs
+from backend.common.llm.repair import apply_local_fixes, build_repair_prompt
+
+class Strict(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    count: int
+    label: str
+
+class Bounded(BaseModel):
+    score: float = Field(lt=1)
+    rank: int = Field(gt=0)
+
+def _error(schema, data) -> ValidationError:
+    with pytest.raises(ValidationError) as exc:
+        schema.model_validate(data)
+    return exc.value
+
+def test_local_fixes_coerce_clamp_and_drop_unknown_keys():
+    data = {"competitors": [
+        {"name": "A", "confidence_score": 1.7},
+        {"name": "B", "confidence_score": "85%"},
+    ]}
+    assert apply_local_fixes(data, _error(MarketIntelligenceOutputs, data))
+    result = MarketIntelligenceOutputs.model_validate(data)
+    assert [c.confidence_score for c in result.competitors] == [1.0, 0.85]
+
+    strict = {"count": "about 3", "label": 7, "extra": True}
+    assert apply_local_fixes(strict, _error(Strict, strict))
+    assert strict == {"count": 3, "label": "7"}
+
+def test_unfixable_errors_build_a_compact_repair_prompt():
+    data = {"count": "many"}
+    error = _error(Strict, data)
+
+    assert not apply_local_fixes(data, error)
+    prompt = build_repair_prompt(json.dumps(data), error)
+    assert '{"count": "many"}' in prompt
+    assert "- count: " in prompt
+    assert "- label: Field required" in prompt
+
+def test_exclusive_bounds_are_left_to_the_llm():
+    # clamping to the bound itself would still fail validation
+    data = {"score": 1.5, "rank": 0}
+    assert not apply_local_fixes(data, _error(Bounded, data))
+    assert data == {"score": 1.5, "rank": 0}
+
+def test_repair_prompt_includes_schema_only_for_missing_fields():
+    missing = {"count": 3}
+    prompt = build_repair_prompt(json.dumps(missing), _error(Strict, missing), Strict)
+    assert "- label: Field required" in prompt
+    assert '"label":{"title":"Label","type":"string"}' in prompt
+
+    wrong = {"count": "many", "label": "x"}
+    prompt = build_repair_prompt(json.dumps(wrong), _error(Strict, wrong), Strict)
+    assert "Schema:" not in prompt
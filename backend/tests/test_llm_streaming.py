@@ -0,0 +1,18 @@
+import pytest
+from backend.common.llm.streaming import IncrementalJSONParser, StreamAbort
+
+def test_parser_emits_fields_as_they_complete():
+    parser = IncrementalJSONParser()
+    chunks = ['```json\n{"summ', 'ary": "a, {b}", "fin', 'dings": ["x", "y"]', ', "score": 0.5}', ' trailing text']
+
+    events = [parser.feed(c) for c in chunks]
+
+    assert events == [[], [("summary", "a, {b}")], [], [("findings", ["x", "y"]), ("score", 0.5)], []]
+    assert parser.done
+    assert parser.text == '{"summary": "a, {b}", "findings": ["x", "y"], "score": 0.5}'
+
+@pytest.mark.parametrize("start", ["Sure! Here is the JSON", '[{"a": 1}]'])
+def test_parser_aborts_on_prose_or_wrong_top_level_type(start):
+    parser = IncrementalJSONParser()
+    with pytest.raises(StreamAbort):
+        parser.feed(start)
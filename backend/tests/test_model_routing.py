@@ -0,0 +1,42 @@
+from unittest.mock import patch
+import pytest
+from backend.common.llm import routing
+from backend.common.llm.routing import ModelRouter, StageRoute
+
+def _router():
+    return ModelRouter({
+        "synthesis": StageRoute("strong", ("fast",), latency_slo=1.0),
+        "market_analysis": StageRoute("fast"),
+    })
+
+def test_routes_fall_back_to_stage_prefix():
+    router = _router()
+    assert router.route("synthesis_swot").model == "strong"
+    assert router.route("unknown_stage") == routing.DEFAULT_ROUTE
+    assert router.models("market_analysis", overloaded=True) == ["fast"]
+
+def test_downgrades_under_load():
+    router = _router()
+    assert router.models("synthesis") == ["strong", "fast"]
+    assert router.models("synthesis", overloaded=True) == ["fast"]
+    assert router.stats["synthesis"].downgraded == 1
+
+def test_downgrades_while_latency_breaches_slo():
+    router = _router()
+    for _ in range(routing.LLM_ROUTE_MIN_SAMPLES):
+        router.record("synthesis", "strong", 2.0, 100, 50)
+
+    with patch.object(routing, "LLM_ROUTE_PROBE_RATE", 0):
+        assert router.models("synthesis") == ["fast"]
+
+    # recovers once the primary is back under the SLO
+    for _ in range(200):
+        router.record("synthesis", "strong", 0.5, 100, 50)
+    assert router.models("synthesis") == ["strong", "fast"]
+
+def test_strong_tier_is_opt_in():
+    if routing.LLM_MODEL_STRONG != routing.LLM_MODEL_FAST:
+        pytest.skip("a strong model is configured in this environment")
+    # nothing configured: every stage stays on the deployment's default model
+    for route in routing.DEFAULT_ROUTES.values():
+        assert route.chain == [routing.LLM_MODEL_FAST]
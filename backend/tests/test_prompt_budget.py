@@ -0,0 +1,70 @@
+import asyncio
+import json
+import uuid
+from backend.common.llm import inference
+from backend.common.llm.prompt_budget import chunk_records, compact_json, fit_records
+from backend.common.llm.rate_limiter import estimate_tokens
+from backend.common.schemas.canonical_result import PatentOutputs, PatentRecord, SynthesisOutput, TrialRecord
+from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+from backend.master_agent.synthesis.prompts import TRIAL_KEYS, _trial_rank, build_synthesis_prompt
+
+def _trial(i: int, phase: str = "Phase 2", results: str | None = None) -> TrialRecord:
+    return TrialRecord(nct_id=f"NCT{i:08d}", phase=phase, status="Completed", condition=f"condition {i}", results_summary=results)
+
+def _evidence(trials: int, patents: int):
+    ct = ClinicalTrialsOutputs(
+        trials=[_trial(i, results="reduced HbA1c" if i % 5 == 0 else None) for i in range(trials)],
+        summary_text="", research_confidence=0.5, key_findings=[], suggested_follow_up=[]
+    )
+    pat = PatentOutputs(patents=[
+        PatentRecord(patent_id=f"US{i}", title=f"formulation {i}", status="Granted", summary="extended release")
+        for i in range(patents)
+    ])
+    return ct, pat, MarketIntelligenceOutputs(market_size_global="$1B")
+
+def test_compact_json_drops_empty_values_and_shortens_keys():
+    row = compact_json(_trial(1), TRIAL_KEYS)
+    assert json.loads(row) == {"id": "NCT00000001", "ph": "Phase 2", "st": "Completed", "cond": "condition 1"}
+    assert ", " not in row and ": " not in row
+
+def test_fit_records_keeps_everything_in_order_when_it_fits():
+    trials = [_trial(i) for i in range(3)]
+    text, kept, total = fit_records(trials, 10_000, TRIAL_KEYS, _trial_rank)
+    assert (kept, total) == (3, 3)
+    assert [t["id"] for t in json.loads(text)] == [t.nct_id for t in trials]
+
+def test_fit_records_keeps_highest_ranked_within_budget():
+    trials = [_trial(0), _trial(1, "Phase 3", "met primary endpoint"), _trial(2), _trial(3, "Phase 1")]
+    budget = estimate_tokens(compact_json(trials[1], TRIAL_KEYS)) + estimate_tokens(compact_json(trials[0], TRIAL_KEYS)) + 3
+
+    text, kept, total = fit_records(trials, budget, TRIAL_KEYS, _trial_rank)
+
+    assert (kept, total) == (2, 4)
+    assert estimate_tokens(text) <= budget
+    # the result-bearing phase 3 trial survives; source order is kept in the prompt
+    assert [t["id"] for t in json.loads(text)] == ["NCT00000000", "NCT00000001"]
+
+def test_chunk_records_splits_evenly_within_budget():
+    trials = [_trial(i) for i in range(11)]
+    size = estimate_tokens(compact_json(trials[0], TRIAL_KEYS)) + 1
+    # a bit over one budget: two even chunks, not a full one and a sliver
+    chunks = chunk_records(trials, size * 10, TRIAL_KEYS)
+
+    assert [len(c) for c in chunks] == [6, 5]
+    assert [t for c in chunks for t in c] == trials
+    assert chunk_records([], 100) == []
+
+def test_oversized_evidence_is_truncated_to_the_budget(fake_llm):
+    ct, pat, market = _evidence(trials=400, patents=100)
+    prompt, report = build_synthesis_prompt("metformin", ct, pat, market, budget=4000)
+
+    assert report["records_dropped"] > 0
+    assert report["total"] <= 4000
+    assert "most informative of 400 trials" in prompt
+
+    result = asyncio.run(inference.llm_structured_async(
+        prompt=prompt, schema=SynthesisOutput, job_id=uuid.uuid4(), stage="synthesis"
+    ))
+    assert isinstance(result, SynthesisOutput)
+    # what was actually sent (instructions + schema + prompt) stays within the budget
+    assert inference.llm_call_logger.record.call_args.kwargs["prompt_tokens"] <= 4000
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+import pytest
+import redis
+from backend.common.llm import rate_limiter as rl
+from backend.common.llm.rate_limiter import RateLimiter, retry_after_seconds
+
+@pytest.fixture
+def limiter(fake_redis):
+    with patch.object(rl, "redis_client", fake_redis):
+        yield RateLimiter(rpm=6, tpm=1000, enabled=True)
+
+def _limits(limiter, model="m"):
+    rpm, tpm = limiter.redis.hmget(limiter._keys(model)[2], "rpm", "tpm")
+    return float(rpm), float(tpm)
+
+def test_acquire_deducts_requests_and_tokens(limiter):
+    for _ in range(6):
+        assert limiter.try_acquire("m", 10) == 0
+    # rpm bucket empty: one request refills in 60 / rpm seconds
+    assert 0 < limiter.try_acquire("m", 10) <= 10
+
+    assert limiter.try_acquire("other", 900) == 0
+    wait = limiter.try_acquire("other", 200)
+    assert wait == pytest.approx(100 * 60 / 1000, abs=0.1)
+
+def test_settle_returns_overestimated_tokens(limiter):
+    assert limiter.try_acquire("m", 900) == 0
+    assert limiter.try_acquire("m", 500) > 0
+    limiter.on_success("m", estimated=900, actual=100)
+    assert limiter.try_acquire("m", 500) == 0
+
+def test_429_halves_limits_and_blocks_for_retry_after(limiter):
+    limiter.on_rate_limited("m", retry_after=3.0)
+    assert _limits(limiter) == (3.0, 500.0)
+    assert 2.5 < limiter.try_acquire("m", 10) <= 3.0
+
+    # floor at LLM_RATE_MIN_FRACTION of the configured limit
+    for _ in range(10):
+        limiter.on_rate_limited("m", retry_after=None)
+    assert _limits(limiter) == (6 * rl.LLM_RATE_MIN_FRACTION, 1000 * rl.LLM_RATE_MIN_FRACTION)
+
+def test_success_recovers_limits_additively(limiter):
+    limiter.on_rate_limited("m", retry_after=None)
+    limiter.on_success("m", estimated=10, actual=0)
+    step = rl.LLM_RATE_AIMD_INCREASE
+    assert _limits(limiter) == pytest.approx((3 + 6 * step, 500 + 1000 * step))
+
+    for _ in range(100):
+        limiter.on_success("m", estimated=10, actual=0)
+    assert _limits(limiter) == (6.0, 1000.0)
+
+def test_redis_errors_fail_open(limiter):
+    with patch.object(limiter, "_acquire", side_effect=redis.ConnectionError("down")):
+        assert limiter.try_acquire("m", 10) == 0
+
+def test_retry_after_headers():
+    assert retry_after_seconds({"retry-after-ms": "1500"}) == 1.5
+    assert retry_after_seconds({"retry-after": "2"}) == 2.0
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+    assert retry_after_seconds(None) is None
+
+def test_bulk_calls_cannot_take_the_interactive_reserve(fake_redis):
+    with patch.object(rl, "redis_client", fake_redis):
+        limiter = RateLimiter(rpm=10, tpm=10_000, enabled=True, bulk_fraction=0.4)
+
+    # a batch drains its 40% share, then waits
+    for _ in range(4):
+        assert limiter.try_acquire("m", 100, lane="bulk") == 0
+    assert limiter.try_acquire("m", 100, lane="bulk") > 0
+
+    # interactive calls still get the other 60% right away
+    for _ in range(6):
+        assert limiter.try_acquire("m", 100, lane="interactive") == 0
+    assert limiter.try_acquire("m", 100, lane="interactive") > 0
+
+    # the reserve also holds for tokens, and a huge bulk call is capped to its share
+    assert limiter.try_acquire("t", 7_000, lane="bulk") == 0
+    assert limiter.try_acquire("t", 100, lane="bulk") > 0
+    assert limiter.try_acquire("t", 6_000, lane="interactive") == 0
@@ -0,0 +1,54 @@
+import asyncio
+import uuid
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi import HTTPException
+from backend.master_agent.api import research
+from backend.master_agent.models.job import Job
+from backend.master_agent.orchestration.admission import AdmissionDecision
+
+ADMITTED = AdmissionDecision(True)
+BUSY = AdmissionDecision(False, 429, 30, "50 jobs running >= 50")
+
+def _job() -> Job:
+    return Job(id=uuid.uuid4(), molecule="Aspirin", status="failed", lane="interactive")
+
+def _db(job: Job, updated: int) -> MagicMock:
+    db = MagicMock()
+    db.query.return_value.filter.return_value.update.return_value = updated
+    db.query.return_value.filter.return_value.first.return_value = job
+    return db
+
+def _resume(job: Job, db: MagicMock, admission: AdmissionDecision = ADMITTED, **kwargs):
+    with patch.object(research, "evaluate_admission", return_value=admission):
+        return asyncio.run(research.resume_research_job(str(job.id), db=db, **kwargs))
+
+def test_resume_claims_the_job_in_one_conditional_update():
+    job = _job()
+
+    with patch.object(research.run_research_workflow, "delay") as delay:
+        result = _resume(job, _db(job, updated=1))
+        assert result["status"] == "queued"
+        delay.assert_called_once_with(str(job.id), "Aspirin")
+
+        # a concurrent resume that lost the update must not start the job again
+        with pytest.raises(HTTPException) as exc:
+            _resume(job, _db(job, updated=0))
+        assert exc.value.status_code == 409
+        delay.assert_called_once()
+
+def test_resume_goes_through_admission_control():
+    job = _job()
+    db = _db(job, updated=1)
+
+    with patch.object(research.run_research_workflow, "delay") as delay:
+        with pytest.raises(HTTPException) as exc:
+            _resume(job, db, BUSY)
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "30"
+        db.query.return_value.filter.return_value.update.assert_not_called()
+
+        response = _resume(job, db, BUSY, defer=True)
+        assert response.status_code == 202
+        assert db.query.return_value.filter.return_value.update.call_args.args[0]["status"] == "deferred"
+        delay.assert_not_called()
@@ -0,0 +1,71 @@
+import uuid
+from unittest.mock import MagicMock, patch
+from backend.master_agent.models.task import Task
+from backend.master_agent.orchestration import checkpoint
+from backend.master_agent.orchestration.scheduler import MAX_TASK_RETRIES, record_failure
+
+def _tasks(*statuses):
+    return [Task(id=uuid.uuid4(), worker_type=f"stage{i}", status=s) for i, s in enumerate(statuses)]
+
+def test_record_failure_retries_then_fails():
+    task = Task(worker_type="synthesis", status="running", retries=0)
+
+    for attempt in range(MAX_TASK_RETRIES):
+        record_failure(task, "boom")
+        assert task.status == "pending"
+        assert task.retries == attempt + 1
+
+    record_failure(task, "boom again")
+    assert task.status == "failed"
+    assert task.error_message == "boom again"
+    assert task.finished_at is not None
+
+def test_reset_incomplete_tasks_keeps_checkpointed_stages():
+    done, lost, failed = _tasks("completed", "completed", "failed")
+    failed.retries = 1
+    db = MagicMock()
+    db.query.return_value.filter.return_value.all.return_value = [done, lost, failed]
+
+    with patch.object(checkpoint, "load_outputs", return_value={done.id: {}}):
+        rerun = checkpoint.reset_incomplete_tasks(db, uuid.uuid4())
+
+    # a completed stage without its envelope is re-run too
+    assert rerun == [lost, failed]
+    assert done.status == "completed"
+    assert all(t.status == "pending" and t.retries == 0 for t in rerun)
+
+def test_resumed_tasks_are_dispatched_under_a_new_celery_id():
+    from backend.master_agent.models.job import Job
+    from backend.master_agent.orchestration import conductor, scheduler
+
+    job = Job(id=uuid.uuid4(), status="running", lane="interactive")
+    task = Task(id=uuid.uuid4(), job_id=job.id, worker_type="synthesis", status="pending", params={}, depends_on=[])
+    db = MagicMock()
+    db.query.return_value.filter.return_value.update.return_value = 1
+
+    with patch.object(scheduler.celery_app, "send_task") as send:
+        assert scheduler._claim(db, task)
+        scheduler._dispatch(db, task, {task.id: task}, job)
+    first_attempt = task.celery_task_id
+    assert send.call_args.kwargs["task_id"] == str(first_attempt)
+
+    # cancel revokes the attempt's celery id
+    db.query.return_value.filter.return_value.with_for_update.return_value.first.return_value = job
+    db.query.return_value.filter.return_value.with_for_update.return_value.all.return_value = [task]
+    with patch.object(conductor.celery_app.control, "revoke") as revoke, \
+            patch.object(conductor, "_release_capacity"):
+        assert conductor.cancel_job(db, job.id)
+    revoke.assert_called_once_with([str(first_attempt)], terminate=True)
+
+    # resume: the same Task row goes back to pending and is dispatched again.
+    # workers drop revoked ids, so the new attempt must not reuse it
+    with patch.object(checkpoint, "load_outputs", return_value={}):
+        db.query.return_value.filter.return_value.all.return_value = [task]
+        checkpoint.reset_incomplete_tasks(db, job.id)
+    with patch.object(scheduler.celery_app, "send_task") as send:
+        assert scheduler._claim(db, task)
+        scheduler._dispatch(db, task, {task.id: task}, job)
+
+    assert task.celery_task_id != first_attempt
+    assert send.call_args.kwargs["task_id"] == str(task.celery_task_id)
+    assert send.call_args.kwargs["link"].args == (str(task.id), str(task.celery_task_id))
@@ -0,0 +1,69 @@
+import json
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+from backend.common.storage import singleflight
+from backend.common.tools import search_cache as sc, web_search
+
+OLD = [{"href": "https://old", "title": "old", "body": "old"}]
+NEW = [{"href": "https://new", "title": "new", "body": "new"}]
+
+@pytest.fixture
+def search(fake_redis):
+    # search_web over fakeredis with DuckDuckGo replaced by a mock
+    with patch.object(sc, "redis_client", fake_redis), patch.object(singleflight, "redis_client", fake_redis):
+        cache = sc.SearchCache(ttl=60, stale_ttl=600)
+        flight = singleflight.SingleFlight("search", lock_ttl=5)
+    ddg = MagicMock(return_value=NEW)
+    executor = MagicMock()
+    with patch.object(web_search, "search_cache", cache), \
+            patch.object(web_search, "search_singleflight", flight), \
+            patch.object(web_search, "_search_ddg", ddg), \
+            patch.object(web_search, "_search_executor", return_value=executor):
+        yield cache, ddg, executor
+
+def _store(cache, query: str, results: list[dict], age: float) -> None:
+    entry = {"fetched_at": time.time() - age, "results": results}
+    cache.redis.set(f"search_cache:{web_search._search_key(query, 5)}", json.dumps(entry))
+
+def test_miss_fetches_and_caches(search):
+    cache, ddg, _ = search
+
+    assert web_search.search_web("Metformin market") == NEW
+    # normalized query: same cache entry, no second fetch
+    assert web_search.search_web("  metformin   MARKET ") == NEW
+    ddg.assert_called_once()
+    assert (cache.stats["misses"], cache.stats["hits"]) == (1, 1)
+    assert cache.metrics()["hit_rate"] == 0.5
+
+def test_fresh_hit_skips_the_search(search):
+    cache, ddg, executor = search
+    _store(cache, "metformin", OLD, age=10)
+
+    assert web_search.search_web("metformin") == OLD
+    ddg.assert_not_called()
+    executor.submit.assert_not_called()
+
+def test_stale_hit_is_served_and_refreshed_once_in_the_background(search):
+    cache, ddg, executor = search
+    _store(cache, "metformin", OLD, age=120)
+
+    assert web_search.search_web("metformin") == OLD
+    assert web_search.search_web("metformin") == OLD
+    # served without waiting on the search; only one caller claims the refresh
+    ddg.assert_not_called()
+    executor.submit.assert_called_once()
+    assert cache.stats["stale_hits"] == 2
+
+    fn, *args = executor.submit.call_args.args
+    fn(*args)
+    assert web_search.search_web("metformin") == NEW
+    assert cache.stats["hits"] == 1
+
+def test_empty_results_are_not_cached(search):
+    cache, ddg, _ = search
+    ddg.return_value = []
+
+    assert web_search.search_web("unknown molecule") == []
+    assert web_search.search_web("unknown molecule") == []
+    assert ddg.call_count == 2
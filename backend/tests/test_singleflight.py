@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+import pytest
+import redis
+from backend.common.storage import singleflight
+from backend.common.storage.singleflight import SingleFlight
+
+@pytest.fixture
+def flight(fake_redis):
+    with patch.object(singleflight, "redis_client", fake_redis):
+        yield SingleFlight("test", lock_ttl=5)
+
+def _run_together(n, target):
+    results = [None] * n
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)  # the first thread takes the lock
+    for t in threads:
+        t.join()
+    return results
+
+def test_followers_share_the_leaders_result(flight):
+    calls = []
+    def upstream():
+        calls.append(1)
+        time.sleep(0.3)
+        return "answer"
+
+    assert _run_together(4, lambda: flight.do("k", upstream)) == ["answer"] * 4
+    assert len(calls) == 1
+    assert flight.stats["leaders"] == 1 and flight.stats["coalesced"] == 3
+
+def test_followers_call_upstream_when_the_leader_fails(flight):
+    calls = []
+    def upstream():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise RuntimeError("leader failed")
+        return "retried"
+
+    results = _run_together(3, lambda: flight.do("k", upstream))
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == ["retried", "retried"]
+    assert flight.stats["fallbacks"] == 2
+
+def test_calls_directly_when_redis_is_down():
+    down = MagicMock()
+    down.set.side_effect = redis.ConnectionError("refused")
+    with patch.object(singleflight, "redis_client", down):
+        flight = SingleFlight("test", lock_ttl=5)
+
+    assert flight.do("k", lambda: "direct") == "direct"
+    assert flight.stats["errors"] == 1
+
+def test_waiting_followers_do_not_block_new_leaders(flight):
+    # a single wait thread, held by a follower of a slow call
+    with patch.object(singleflight, "SINGLEFLIGHT_WAIT_THREADS", 1):
+        async def slow():
+            await asyncio.sleep(1.0)
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        async def main():
+            leader = asyncio.create_task(flight.do_async("a", slow))
+            await asyncio.sleep(0.05)
+            follower = asyncio.create_task(flight.do_async("a", slow))
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            assert await flight.do_async("b", fast) == "fast"
+            elapsed = time.monotonic() - start
+            assert await leader == await follower == "slow"
+            return elapsed
+
+        assert asyncio.run(main()) < 0.5
@@ -0,0 +1,77 @@
+import asyncio
+import uuid
+from collections import Counter
+from unittest.mock import patch
+from backend.common.llm import inference
+from backend.common.llm.providers import ProviderError
+from backend.common.schemas.canonical_result import PatentOutputs, PatentRecord, SynthesisOutput, TrialRecord
+from backend.common.schemas.worker_outputs import ClinicalTrialsOutputs, MarketIntelligenceOutputs
+from backend.master_agent.synthesis import engine, progress
+from backend.master_agent.synthesis.map_reduce import run_map_reduce
+from backend.master_agent.synthesis.sections import SECTIONS, run_sections
+
+def _evidence(trials: int, patents: int):
+    ct = ClinicalTrialsOutputs(
+        trials=[
+            TrialRecord(nct_id=f"NCT{i:08d}", phase="Phase 2", status="Completed", condition=f"condition {i}")
+            for i in range(trials)
+        ],
+        summary_text="", research_confidence=0.5, key_findings=[], suggested_follow_up=[]
+    )
+    pat = PatentOutputs(patents=[
+        PatentRecord(patent_id=f"US{i}", title=f"formulation {i}", status="Granted") for i in range(patents)
+    ])
+    return ct, pat, MarketIntelligenceOutputs(market_size_global="$1B")
+
+def _stages() -> list[str]:
+    return [c.kwargs["stage"] for c in inference.llm_call_logger.record.call_args_list]
+
+def test_map_reduce_summarizes_chunks_then_reduces_once(fake_llm):
+    ct, pat, market = _evidence(trials=800, patents=40)
+
+    result = asyncio.run(run_map_reduce(uuid.uuid4(), "metformin", ct, pat, market))
+
+    assert isinstance(result, SynthesisOutput)
+    stages = _stages()
+    # trials need several map chunks, the patents one; the reduce call comes last
+    assert stages.count("synthesis_map") >= 3
+    assert stages[-1] == "synthesis" and stages.count("synthesis") == 1
+    reduce_prompt = inference.llm_call_logger.record.call_args.kwargs["prompt"]
+    assert "over all 800 trials" in reduce_prompt
+    assert "NCT00000000" not in reduce_prompt
+
+def test_auto_mode_switches_to_map_reduce_only_when_evidence_is_truncated(fake_llm, fake_redis):
+    with patch.object(engine, "SYNTHESIS_MODE", "auto"), patch.object(progress, "redis_client", fake_redis):
+        small = engine.run_synthesis(uuid.uuid4(), "metformin", *_evidence(trials=5, patents=2))
+        assert _stages() == ["synthesis"]
+        assert len(small.trials) == 5
+
+        inference.llm_call_logger.record.reset_mock()
+        large = engine.run_synthesis(uuid.uuid4(), "metformin", *_evidence(trials=800, patents=40))
+        assert "synthesis_map" in _stages()
+        # the raw evidence is passed through untouched either way
+        assert len(large.trials) == 800
+
+def test_a_failed_section_is_retried_on_its_own(fake_llm):
+    calls = Counter()
+    complete = fake_llm.complete
+
+    async def flaky(model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        section = next(s.__name__ for s, _ in SECTIONS.values() if f"the {s.__name__} schema" in prompt)
+        calls[section] += 1
+        # RiskSection fails every attempt of its first llm_structured call
+        if section == "RiskSection" and calls[section] <= 3:
+            raise ProviderError("injected")
+        return await complete(model, messages, **kwargs)
+
+    fields = []
+    with patch.object(fake_llm, "complete", flaky):
+        result = asyncio.run(run_sections(
+            uuid.uuid4(), "metformin", *_evidence(trials=5, patents=2), on_progress=lambda f, v: fields.append(f)
+        ))
+
+    assert isinstance(result, SynthesisOutput)
+    assert calls["RiskSection"] == 4
+    assert all(calls[schema.__name__] == 1 for schema, _ in SECTIONS.values() if schema.__name__ != "RiskSection")
+    assert sorted(fields) == sorted(f for schema, _ in SECTIONS.values() for f in schema.model_fields)
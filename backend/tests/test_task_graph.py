@@ -0,0 +1,62 @@
+import uuid
+import pytest
+from backend.master_agent.models.task import Task
+from backend.master_agent.orchestration.task_graph import build_task_graph, TaskGraphError, RESEARCH_GRAPH
+from backend.master_agent.orchestration.scheduler import broker_priority, graph_state
+
+JOB_ID = uuid.UUID("00000000-0000-0000-0000-000000000000")
+
+def test_build_task_graph_resolves_dependencies():
+    nodes = build_task_graph(JOB_ID, "Aspirin")
+
+    assert len(nodes) == len(RESEARCH_GRAPH)
+    by_type = {n["worker_type"]: n for n in nodes}
+
+    # discovery stages have no dependencies and run in parallel
+    for stage in ("clinical_trials", "patent_worker", "market_worker"):
+        assert by_type[stage]["depends_on"] == []
+        assert by_type[stage]["params"] == {"molecule": "Aspirin"}
+
+    assert set(by_type["synthesis"]["depends_on"]) == {
+        by_type["clinical_trials"]["id"],
+        by_type["patent_worker"]["id"],
+        by_type["market_worker"]["id"],
+    }
+    assert by_type["report"]["depends_on"] == [by_type["synthesis"]["id"]]
+
+    # topological order: every dependency appears before its dependents
+    seen = set()
+    for node in nodes:
+        assert all(dep in seen for dep in node["depends_on"])
+        seen.add(node["id"])
+
+def test_build_task_graph_rejects_cycles():
+    stages = [
+        {"worker_type": "synthesis", "depends_on": ["report"]},
+        {"worker_type": "report", "depends_on": ["synthesis"]},
+    ]
+    with pytest.raises(TaskGraphError):
+        build_task_graph(JOB_ID, "Aspirin", stages)
+
+def test_build_task_graph_rejects_unknown_dependency():
+    stages = [{"worker_type": "report", "depends_on": ["web_worker"]}]
+    with pytest.raises(TaskGraphError):
+        build_task_graph(JOB_ID, "Aspirin", stages)
+
+def _tasks(*statuses):
+    return [Task(id=uuid.uuid4(), worker_type=f"stage{i}", status=s) for i, s in enumerate(statuses)]
+
+def test_graph_state():
+    assert graph_state(_tasks("completed", "running", "pending")) == "running"
+    assert graph_state(_tasks("completed", "completed")) == "completed"
+    # a failure only ends the job once nothing else can still run
+    assert graph_state(_tasks("failed", "running")) == "running"
+    assert graph_state(_tasks("completed", "failed", "skipped")) == "failed"
+    assert graph_state(_tasks("cancelled", "running")) == "cancelled"
+
+def test_broker_priority_puts_later_stages_first():
+    # kombu's redis transport serves 0 first; Task.priority is higher = more urgent
+    assert broker_priority(9) == 0
+    assert broker_priority(5) > broker_priority(7)
+    assert broker_priority(None) == 9
+    assert broker_priority(42) == 0
@@ -0,0 +1,50 @@
+import threading
+import time
+from unittest.mock import patch
+from backend.common.tools import web_search
+
+def _results(query: str) -> list[dict]:
+    # two results per query, plus one URL every query shares
+    return [
+        {"href": f"https://{query}/a", "title": query, "body": "a"},
+        {"href": f"https://{query}/b", "title": query, "body": "b"},
+        {"href": "https://shared", "title": "shared", "body": "s"},
+    ]
+
+def _market_search(slow_queries: int, **settings):
+    release = threading.Event()
+    lock = threading.Lock()
+    calls = []
+
+    def search_web(query, max_results):
+        with lock:
+            calls.append(query)
+            n = len(calls)
+        if n > 5 - slow_queries:
+            release.wait(10)
+        return _results(f"q{n}")
+
+    try:
+        with patch.object(web_search, "search_web", search_web), \
+                patch.multiple(web_search, **settings):
+            start = time.monotonic()
+            text = web_search.search_market_info("metformin")
+            return text, time.monotonic() - start
+    finally:
+        release.set()
+
+def test_market_search_returns_once_enough_results_are_in():
+    text, seconds = _market_search(slow_queries=3, SEARCH_TARGET_RESULTS=5, SEARCH_TOTAL_TIMEOUT=10)
+    # two fast queries give 5 unique URLs; the slow ones aren't waited for
+    assert seconds < 2
+    assert text.count("SOURCE: ") == 5
+    assert text.count("https://shared") == 1
+
+def test_market_search_uses_partial_results_at_the_total_timeout():
+    text, seconds = _market_search(slow_queries=4, SEARCH_TARGET_RESULTS=10, SEARCH_TOTAL_TIMEOUT=0.3)
+    assert seconds < 2
+    assert text.count("SOURCE: ") == 3
+
+def test_market_search_without_results():
+    text, _ = _market_search(slow_queries=5, SEARCH_TARGET_RESULTS=10, SEARCH_TOTAL_TIMEOUT=0.1)
+    assert text == "No market data found for the specified molecule."
@@ -29,12 +29,26 @@ def run_clinical_trials_worker(job_id: str, task_id: str, params: dict):
         "Provide a list of trials including NCT IDs (if known), phases, statuses, and conditions."
     )
     
-    outputs = llm_structured(
-        prompt=prompt,
-        schema=ClinicalTrialsOutputs,
-        job_id=job_uuid,
-        stage="clinical_trial_discovery"
-    )
+    try:
+        outputs = llm_structured(
+            prompt=prompt,
+            schema=ClinicalTrialsOutputs,
+            job_id=job_uuid,
+            stage="clinical_trial_discovery"
+        )
+    except Exception as e:
+        # return a failure envelope so the conductor can record the stage
+        print(f"[ClinicalTrials] Discovery failed for {molecule}: {e}")
+        return WorkerEnvelope(
+            job_id= job_uuid,
+            task_id= task_uuid,
+            worker= "clinical_trials",
+            status= "error",
+            confidence= 0.0,
+            timestamp= datetime.now(UTC),
+            outputs= {},
+            notes= f"Error: {str(e)}"
+        ).model_dump(mode='json')
 
     envelope = WorkerEnvelope(
         job_id= job_uuid,
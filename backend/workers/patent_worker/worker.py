@@ -25,12 +25,26 @@ def run_patent_worker(job_id: str, task_id: str, params: dict):
         "Provide a list of patents including Patent IDs, titles, assignees, status, and summaries."
     )
     
-    outputs = llm_structured(
-        prompt=prompt,
-        schema=PatentOutputs,
-        job_id=job_uuid,
-        stage="patent_discovery"
-    )
+    try:
+        outputs = llm_structured(
+            prompt=prompt,
+            schema=PatentOutputs,
+            job_id=job_uuid,
+            stage="patent_discovery"
+        )
+    except Exception as e:
+        # return a failure envelope so the conductor can record the stage
+        print(f"[Patent] Discovery failed for {molecule}: {e}")
+        return WorkerEnvelope(
+            job_id= job_uuid,
+            task_id= task_uuid,
+            worker= "patent_worker",
+            status= "error",
+            confidence= 0.0,
+            timestamp= datetime.now(UTC),
+            outputs= {},
+            notes= f"Error: {str(e)}"
+        ).model_dump(mode='json')
 
     envelope = WorkerEnvelope(
         job_id= job_uuid,
@@ -316,8 +316,9 @@ def run_report_worker(job_id: str, task_id: str, params: dict):
     job_uuid = uuid.UUID(job_id)
     task_uuid = uuid.UUID(task_id)
 
-    # 1. load CanonicalResult
-    result = CanonicalResult.model_validate(params["canonical_result"])
+    # 1. load CanonicalResult (directly, or from the synthesis node of the task graph)
+    canonical_result = params.get("canonical_result") or params.get("upstream", {}).get("synthesis")
+    result = CanonicalResult.model_validate(canonical_result)
 
     # 2. generate files locally
     pdf_name = f"{job_id}_report.pdf"
@@ -367,4 +368,4 @@ def run_report_worker(job_id: str, task_id: str, params: dict):
         notes=None
     )
 
-    return envelope.model_dump()
\ No newline at end of file
+    return envelope.model_dump(mode='json')
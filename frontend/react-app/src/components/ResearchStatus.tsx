@@ -5,6 +5,9 @@ import { researchApi } from '../api/client';
 import type { ResearchStatusResponse } from '../types';
 import clsx from 'clsx';
 
+// Backend states after which the job no longer changes
+const TERMINAL_STATES = ['completed', 'failed', 'cancelled', 'timed_out'];
+
 interface ResearchStatusProps {
     jobId: string;
     onComplete: (data: ResearchStatusResponse) => void;
@@ -12,6 +15,7 @@ interface ResearchStatusProps {
 
 export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplete }) => {
     const [status, setStatus] = useState<string>('queued');
+    const [synthesisFields, setSynthesisFields] = useState<string[]>([]);
     // const [error, setError] = useState<string | null>(null);
 
     // Polling Logic
@@ -22,7 +26,8 @@ export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplet
                 const data = await researchApi.getStatus(jobId);
                 if (isMounted) {
                     setStatus(data.status);
-                    if (data.status === 'completed' || data.status === 'failed') {
+                    setSynthesisFields(Object.keys(data.synthesis_progress ?? {}));
+                    if (TERMINAL_STATES.includes(data.status)) {
                         onComplete(data);
                         return; // Stop polling
                     }
@@ -32,7 +37,7 @@ export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplet
                 // if (isMounted) setError("Failed to fetch status");
             }
 
-            if (isMounted && status !== 'completed' && status !== 'failed') {
+            if (isMounted && !TERMINAL_STATES.includes(status)) {
                 setTimeout(poll, 2000); // Poll every 2s
             }
         };
@@ -66,7 +71,7 @@ export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplet
             className="bg-pharma-card rounded-xl p-8 border border-slate-700 shadow-xl relative overflow-hidden"
         >
             {/* Background Pulse */}
-            {status !== 'completed' && status !== 'failed' && (
+            {!TERMINAL_STATES.includes(status) && (
                 <div className="absolute top-0 right-0 w-32 h-32 bg-pharma-accent/20 rounded-full blur-3xl -mr-10 -mt-10 animate-pulse"></div>
             )}
 
@@ -74,7 +79,7 @@ export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplet
                 <div className={clsx("w-3 h-3 rounded-full", {
                     'bg-pharma-accent animate-ping': status === 'running' || status === 'generating_report',
                     'bg-pharma-success': status === 'completed',
-                    'bg-pharma-error': status === 'failed',
+                    'bg-pharma-error': status === 'failed' || status === 'cancelled' || status === 'timed_out',
                     'bg-slate-500': status === 'queued'
                 })}></div>
                 <span>Research Status: <span className="text-pharma-accent capitalize">{status.replace('_', ' ')}</span></span>
@@ -106,6 +111,11 @@ export const ResearchStatus: React.FC<ResearchStatusProps> = ({ jobId, onComplet
                                     {stepState === 'completed' ? 'Completed successfully' :
                                         stepState === 'active' ? 'Processing...' : 'Waiting...'}
                                 </p>
+                                {step.id === 'synthesis' && stepState === 'active' && synthesisFields.length > 0 && (
+                                    <p className="text-xs text-pharma-accent">
+                                        Drafted: {synthesisFields.map(f => f.replace(/_/g, ' ')).join(', ')}
+                                    </p>
+                                )}
                             </div>
                         </div>
                     )
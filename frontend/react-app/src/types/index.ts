@@ -20,7 +20,7 @@ export interface CanonicalResult {
 export interface Job {
     id: string;
     molecule: string;
-    status: 'queued' | 'running' | 'generating_report' | 'completed' | 'failed';
+    status: 'queued' | 'deferred' | 'dispatched' | 'running' | 'generating_report' | 'completed' | 'failed' | 'cancelled' | 'timed_out';
     created_at: string;
     canonical_result?: CanonicalResult;
 }
@@ -34,5 +34,7 @@ export interface ResearchStatusResponse {
     job_id: string;
     status: string;
     canonical_result?: CanonicalResult;
+    // synthesis fields already generated while the job is running
+    synthesis_progress?: Record<string, unknown>;
     created_at: string;
 }